@@ -22,7 +22,14 @@ import DiagramaRelaciones from "@/components/diagrama-relaciones"
 import TablaCompletaUnificada from "@/components/tabla-completa-unificada"
 import type { ResultadoAnual, PasoSimulacion, ResultadoMonteCarloComplete } from "@/lib/types"
 import { ESCENARIOS_SHOCKS } from "@/lib/escenarios"
-import { simularFiscal, simularMonteCarlo, exportarExcel, exportarPDF, obtenerParametrosDefault } from "@/lib/api"
+import {
+  simularFiscal,
+  simularMonteCarlo,
+  exportarExcel,
+  exportarPDF,
+  obtenerParametrosDefault,
+  SimulacionReemplazada,
+} from "@/lib/api"
 import { EditorParametrosAvanzados, type ParametrosModelo } from "@/components/editor-parametros-avanzados"
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs"
 import { Label } from "@/components/ui/label"
@@ -112,6 +119,8 @@ export default function Page() {
         return { resultados: resultadoMC.simulacion_representativa, pasos: [] }
       }
     } catch (error) {
+      // Una simulación más reciente ya reemplazó a esta: no es un error para el usuario
+      if (error instanceof SimulacionReemplazada) return
       console.error("Error en simulación:", error)
       alert("Error al ejecutar la simulación. Verifica que el backend esté funcionando.")
     } finally {
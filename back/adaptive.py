@@ -0,0 +1,101 @@
+"""
+Criterio de parada para Monte Carlo adaptativo.
+
+La corrida agrega lotes de trayectorias hasta que los intervalos de confianza
+de las métricas pedidas tienen el semiancho objetivo. Los intervalos se
+calculan sobre los acumuladores en línea (streaming_stats):
+
+- promedio: asintótico, z·σ/√n (con pares antitéticos, la varianza de la media de los pares)
+- percentiles: por estadísticos de orden (sin supuestos de distribución), entre
+  los cuantiles p ± z·√(p(1-p)/n) del t-digest
+"""
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from scipy.special import ndtri
+from schemas import ToleranciaMonteCarlo, IntervaloConfianza
+from streaming_stats import EstadisticasOnline, MomentosOnline
+
+# Trayectorias por lote (par, para no partir pares antitéticos)
+TAMANO_LOTE_ADAPTATIVO = 1000
+
+PROBABILIDAD_ESTADISTICO = {
+    'mediana': 0.5,
+    'percentil_5': 0.05,
+    'percentil_25': 0.25,
+    'percentil_75': 0.75,
+    'percentil_95': 0.95,
+}
+
+
+def _intervalo(
+    acumulador: EstadisticasOnline,
+    estadistico: str,
+    ano_idx: int,
+    z: float,
+    momentos_pares: Optional[MomentosOnline] = None
+):
+    """
+    (estimación, semiancho) del estadístico en un año
+    """
+    n = acumulador.n
+    if estadistico == 'promedio':
+        estimacion = float(acumulador.momentos.media[ano_idx])
+        if momentos_pares is not None and momentos_pares.n >= 2:
+            # Las medias de los pares son independientes entre sí
+            varianza_media = float(momentos_pares.varianza[ano_idx]) / momentos_pares.n
+        else:
+            varianza_media = float(acumulador.momentos.varianza[ano_idx]) / n
+        return estimacion, z * float(np.sqrt(varianza_media))
+
+    p = PROBABILIDAD_ESTADISTICO[estadistico]
+    desplazamiento = z * np.sqrt(p * (1 - p) / n)
+    inferior, estimacion, superior = acumulador.cuantiles(
+        ano_idx, [max(p - desplazamiento, 0.0), p, min(p + desplazamiento, 1.0)]
+    )
+    return float(estimacion), float(superior - inferior) / 2
+
+
+def evaluar_tolerancias(
+    tolerancias: Sequence[ToleranciaMonteCarlo],
+    acumuladores: Dict[str, EstadisticasOnline],
+    anos: int,
+    nivel_confianza: float = 0.95,
+    momentos_pares: Optional[Dict[str, MomentosOnline]] = None,
+    ano_inicial: int = 2020
+) -> List[IntervaloConfianza]:
+    """
+    Intervalos de confianza actuales de cada tolerancia (una entrada por año cubierto)
+
+    Args:
+        tolerancias: Objetivos pedidos por el cliente
+        acumuladores: Variable -> EstadisticasOnline de la corrida
+        anos: Años simulados
+        nivel_confianza: Nivel de los intervalos (bilateral)
+        momentos_pares: Variable -> momentos de las medias de pares antitéticos (si aplica)
+        ano_inicial: Año del índice 0
+
+    Returns:
+        Lista de IntervaloConfianza
+    """
+    z = float(ndtri(0.5 + nivel_confianza / 2))
+    intervalos: List[IntervaloConfianza] = []
+    for tolerancia in tolerancias:
+        indices = range(anos) if tolerancia.ano is None else [tolerancia.ano - ano_inicial]
+        for ano_idx in indices:
+            estimacion, semiancho = _intervalo(
+                acumuladores[tolerancia.variable],
+                tolerancia.estadistico,
+                ano_idx,
+                z,
+                (momentos_pares or {}).get(tolerancia.variable)
+            )
+            intervalos.append(IntervaloConfianza(
+                variable=tolerancia.variable,
+                estadistico=tolerancia.estadistico,
+                ano=ano_inicial + ano_idx,
+                estimacion=estimacion,
+                semiancho=semiancho,
+                objetivo=tolerancia.semiancho,
+                cumple=semiancho <= tolerancia.semiancho
+            ))
+    return intervalos
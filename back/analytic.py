@@ -0,0 +1,167 @@
+"""
+Estadísticas exactas de los componentes lineales del modelo fiscal.
+
+Cada año, los impuestos (salvo el IDH, que depende del gas), el gasto corriente
+y el subsidio de alimentos son afines en la Z común: X = base + coef_z*Z, con
+Z ~ N(0,1). Su media, desviación y cuantiles tienen forma cerrada, así que no
+hace falta muestrearlos. El tipo de cambio es una normal truncada en 0 con el
+shock aplicado como factor de escala.
+
+En Monte Carlo con analitico=true estos campos salen de la forma cerrada y no
+del muestreo: si todas las variables pedidas son lineales no se simula nada;
+si no, solo se siguen y resumen las trayectorias de las variables no lineales
+(commodities Vg·Pg·TC, truncamientos y la recursión de la deuda).
+"""
+from typing import Dict, List, Tuple
+import numpy as np
+from scipy.special import ndtri
+from scipy.stats import truncnorm
+from schemas import ParametrosSimulacion, EstadisticasVariable
+
+# Componente -> prefijos de los parámetros (base, coef_z) que suma
+COMPONENTES_LINEALES: Dict[str, List[str]] = {
+    # Líneas tributarias
+    'iva_mercado_interno': ['iva_mi'],
+    'iue': ['iue'],
+    'it': ['it'],
+    'ice_mercado_interno': ['ice_mi'],
+    'rc_iva': ['rc_iva'],
+    'itf': ['itf'],
+    'ij': ['ij'],
+    'conceptos_varios': ['conceptos_varios'],
+    'ga': ['ga'],
+    'iva_importaciones': ['iva_i'],
+    'ice_importaciones': ['ice_i'],
+    'iehd_mercado_interno': ['iehd_mi'],
+    'iehd_importaciones': ['iehd_i'],
+    'tributarios_sin_idh': [
+        'iva_mi', 'iue', 'it', 'ice_mi', 'rc_iva', 'itf', 'ij',
+        'conceptos_varios', 'ga', 'iva_i', 'ice_i', 'iehd_mi', 'iehd_i'
+    ],
+    # Campos de ResultadoAnual
+    'ing_iva': ['iva_mi', 'iva_i'],
+    'ing_iue': ['iue'],
+    'ing_it': ['it'],
+    'ing_itf': ['itf'],
+    'ing_rc_iva': ['rc_iva'],
+    'ing_ice': ['ice_mi', 'ice_i'],
+    'ing_ga': ['ga'],
+    'gasto_inversion': ['corriente'],
+    'gasto_subsidio_alimentos': ['subsidio_alimentos'],
+}
+
+# Campos de ResultadoMonteCarloAnual que son exactamente lineales en Z
+CAMPOS_MONTE_CARLO_LINEALES = [
+    'ing_iva', 'ing_iue', 'ing_it', 'ing_itf', 'ing_rc_iva', 'ing_ice', 'ing_ga',
+    'gasto_inversion', 'gasto_subsidio_alimentos',
+]
+
+# Campos de ResultadoMonteCarloAnual que solo se reportan en modo analítico
+CAMPOS_SOLO_ANALITICOS = [
+    'ing_it', 'ing_itf', 'ing_rc_iva', 'ing_ice', 'ing_ga',
+    'gasto_inversion', 'gasto_subsidio_alimentos', 'tipo_cambio',
+]
+
+_PERCENTILES = (0.05, 0.25, 0.75, 0.95)
+
+
+def coeficientes_lineales(parametros: ParametrosSimulacion, prefijos: List[str]) -> Tuple[float, float]:
+    """
+    Suma (base, coef_z) de los componentes indicados
+    """
+    base = sum(getattr(parametros, f"{prefijo}_base") for prefijo in prefijos)
+    coef_z = sum(getattr(parametros, f"{prefijo}_coef_z") for prefijo in prefijos)
+    return base, coef_z
+
+
+def _extremos_esperados(num_simulaciones: int) -> Tuple[float, float]:
+    # Posiciones esperadas del mínimo y el máximo de N muestras: p = 1/(N+1), N/(N+1)
+    return 1 / (num_simulaciones + 1), num_simulaciones / (num_simulaciones + 1)
+
+
+def estadisticas_normal(base: float, coef_z: float, num_simulaciones: int) -> EstadisticasVariable:
+    """
+    Estadísticas exactas de X = base + coef_z*Z
+
+    El mínimo y el máximo no están acotados; se reportan los cuantiles donde
+    caen en promedio el mínimo y el máximo de num_simulaciones muestras.
+    """
+    sigma = abs(coef_z)
+    p5, p25, p75, p95 = (base + sigma * float(ndtri(p)) for p in _PERCENTILES)
+    p_min, p_max = _extremos_esperados(num_simulaciones)
+    return EstadisticasVariable(
+        promedio=base,
+        mediana=base,
+        desviacion_estandar=sigma,
+        percentil_5=p5,
+        percentil_25=p25,
+        percentil_75=p75,
+        percentil_95=p95,
+        minimo=base + sigma * float(ndtri(p_min)),
+        maximo=base + sigma * float(ndtri(p_max))
+    )
+
+
+def estadisticas_normal_truncada(
+    mu: float,
+    sigma: float,
+    num_simulaciones: int,
+    escala: float = 1.0,
+    limite_inferior: float = 0.0
+) -> EstadisticasVariable:
+    """
+    Estadísticas exactas de escala * X, con X ~ Normal(μ, σ) truncada en X > limite_inferior
+    """
+    sigma = abs(sigma)
+    if sigma == 0:
+        valor = escala * max(mu, limite_inferior)
+        return estadisticas_normal(valor, 0.0, num_simulaciones)
+
+    distribucion = truncnorm((limite_inferior - mu) / sigma, np.inf, loc=mu, scale=sigma)
+    p_min, p_max = _extremos_esperados(num_simulaciones)
+    cuantiles = distribucion.ppf([0.5, *_PERCENTILES, p_min, p_max]) * escala
+    # Con escala negativa (shock < -100%) el orden de los cuantiles se invierte
+    if escala < 0:
+        cuantiles = cuantiles[[0, 4, 3, 2, 1, 6, 5]]
+    return EstadisticasVariable(
+        promedio=float(distribucion.mean() * escala),
+        mediana=float(cuantiles[0]),
+        desviacion_estandar=float(distribucion.std() * abs(escala)),
+        percentil_5=float(cuantiles[1]),
+        percentil_25=float(cuantiles[2]),
+        percentil_75=float(cuantiles[3]),
+        percentil_95=float(cuantiles[4]),
+        minimo=float(cuantiles[5]),
+        maximo=float(cuantiles[6])
+    )
+
+
+def componentes_analiticos(parametros: ParametrosSimulacion, num_simulaciones: int = 1000) -> Dict[str, EstadisticasVariable]:
+    """
+    Estadísticas exactas (por año) de todos los componentes lineales y del tipo de cambio
+
+    Son iguales todos los años: el modelo no tiene tendencia en estos componentes.
+    """
+    estadisticas = {
+        nombre: estadisticas_normal(*coeficientes_lineales(parametros, prefijos), num_simulaciones)
+        for nombre, prefijos in COMPONENTES_LINEALES.items()
+    }
+    if not parametros.subsidio_combustibles_activo:
+        # Sin subsidio a combustibles el gasto total es corriente + alimentos
+        estadisticas['gastos_totales'] = estadisticas_normal(
+            *coeficientes_lineales(parametros, ['corriente', 'subsidio_alimentos']), num_simulaciones
+        )
+    estadisticas['tipo_cambio'] = estadisticas_normal_truncada(
+        parametros.tc_base, parametros.tc_coef_z, num_simulaciones, 1 + parametros.shock_tc / 100
+    )
+    return estadisticas
+
+
+def campos_monte_carlo_analiticos(parametros: ParametrosSimulacion) -> List[str]:
+    """
+    Campos de ResultadoMonteCarloAnual cuyas estadísticas se pueden calcular exactamente
+    """
+    campos = list(CAMPOS_MONTE_CARLO_LINEALES) + ['tipo_cambio']
+    if not parametros.subsidio_combustibles_activo:
+        campos.append('gastos_totales')
+    return campos
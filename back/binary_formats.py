@@ -0,0 +1,122 @@
+"""
+Formatos binarios columnares para los resultados de Monte Carlo.
+
+En lugar de armar ResultadoMonteCarloComplete (modelos Pydantic, listas de
+Python y JSON), las estadísticas por año y las distribuciones se devuelven como
+arrays tipados que salen directamente de los arrays de seguimiento:
+
+- NumPy .npz (application/x-npz): un array por columna
+- Arrow IPC stream (application/vnd.apache.arrow.stream): una tabla con una
+  fila por año; las distribuciones son columnas de listas de tamaño fijo.
+  Necesita pyarrow (opcional).
+
+Columnas (primera dimensión: años):
+- `ano`
+- `{variable}.{estadistico}`: promedio, mediana, desviacion_estandar, percentil_5, ...
+- `analitico.{componente}.{estadistico}`: con analitico=true
+- `histograma.{variable}` (anos, num_bins), `cuantiles.{variable}` (anos, 101),
+  `distribucion.{variable}` (anos, N) según el formato de distribuciones
+- `riesgo.{regla}.{probabilidad|probabilidad_acumulada|primera_violacion}` y
+  `var.{variable}.{nivel}`, `cvar.{variable}.{nivel}` (ver tail_risk)
+
+Los arrays que no son por año (`bordes.{variable}`, `probabilidades_cuantiles`)
+van como arrays en el .npz y en los metadatos del esquema en Arrow, junto con
+num_simulaciones, semilla, método, etc.
+"""
+import importlib.util
+import io
+import json
+from typing import Dict, List
+import numpy as np
+from schemas import ResultadoRiesgo
+
+TIPO_NPZ = "application/x-npz"
+TIPO_ARROW = "application/vnd.apache.arrow.stream"
+
+ESTADISTICOS = [
+    'promedio',
+    'mediana',
+    'desviacion_estandar',
+    'percentil_5',
+    'percentil_25',
+    'percentil_75',
+    'percentil_95',
+    'minimo',
+    'maximo',
+]
+
+
+def arrow_disponible() -> bool:
+    """
+    True si pyarrow está instalado
+    """
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+class ColumnasMonteCarlo:
+    """
+    Resultado de Monte Carlo en columnas: arrays por año, arrays globales y metadatos JSON
+    """
+
+    def __init__(self, anos: int, ano_inicial: int = 2020):
+        self.columnas: Dict[str, np.ndarray] = {'ano': np.arange(ano_inicial, ano_inicial + anos)}
+        self.globales: Dict[str, np.ndarray] = {}
+        self.metadatos: Dict[str, object] = {}
+
+    def agregar_estadisticas(self, prefijo: str, valores: np.ndarray) -> None:
+        """
+        Agrega las columnas `{prefijo}.{estadistico}` a partir de un array (anos, len(ESTADISTICOS))
+        """
+        for indice, estadistico in enumerate(ESTADISTICOS):
+            self.columnas[f"{prefijo}.{estadistico}"] = valores[:, indice]
+
+    def agregar_riesgo(self, riesgo: ResultadoRiesgo) -> None:
+        """
+        Agrega las columnas de riesgo de cola; las reglas y la fracción sin violaciones van en los metadatos
+        """
+        for violacion in riesgo.violaciones:
+            for serie in ('probabilidad', 'probabilidad_acumulada', 'primera_violacion'):
+                self.columnas[f"riesgo.{violacion.nombre}.{serie}"] = np.array(getattr(violacion, serie))
+        for valor in riesgo.valor_en_riesgo:
+            self.columnas[f"var.{valor.variable}.{valor.nivel}"] = np.array(valor.var)
+            self.columnas[f"cvar.{valor.variable}.{valor.nivel}"] = np.array(valor.cvar)
+        self.metadatos['riesgo'] = {
+            violacion.nombre: {'regla': violacion.regla, 'sin_violacion': violacion.sin_violacion}
+            for violacion in riesgo.violaciones
+        }
+
+    def a_npz(self) -> bytes:
+        """
+        Archivo .npz (sin comprimir): columnas, globales y `metadatos` (JSON en un array de texto)
+        """
+        buffer = io.BytesIO()
+        np.savez(buffer, **self.columnas, **self.globales, metadatos=np.array(json.dumps(self.metadatos)))
+        return buffer.getvalue()
+
+    def a_arrow(self) -> bytes:
+        """
+        Arrow IPC stream con una fila por año; globales y metadatos en los metadatos del esquema
+
+        Raises:
+            ImportError: Si pyarrow no está instalado
+        """
+        import pyarrow as pa
+
+        arrays: List = []
+        for valores in self.columnas.values():
+            if valores.ndim == 1:
+                arrays.append(pa.array(valores))
+            else:
+                # (anos, k) -> lista de tamaño k por fila, sobre un solo buffer contiguo
+                arrays.append(pa.FixedSizeListArray.from_arrays(
+                    pa.array(np.ascontiguousarray(valores).reshape(-1)), valores.shape[1]
+                ))
+        metadatos = {
+            'metadatos': json.dumps(self.metadatos),
+            'globales': json.dumps({nombre: valores.tolist() for nombre, valores in self.globales.items()}),
+        }
+        tabla = pa.Table.from_arrays(arrays, names=list(self.columnas), metadata=metadatos)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+        return sink.getvalue().to_pybytes()
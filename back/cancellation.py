@@ -0,0 +1,87 @@
+"""
+Cancelación cooperativa de corridas Monte Carlo.
+
+La corrida verifica un TokenCancelacion entre bloques de trayectorias y, si
+fue cancelado, se interrumpe con CorridaCancelada (los bloques pendientes del
+pool de procesos se cancelan). La capa HTTP cancela el token cuando el cliente
+se desconecta o cuando una petición más reciente de la misma sesión la
+reemplaza (SesionesActivas).
+"""
+import threading
+from typing import Callable, Dict, List, Optional
+
+
+class CorridaCancelada(Exception):
+    """La corrida se interrumpió porque su token fue cancelado"""
+
+
+class TokenCancelacion:
+    """
+    Señal de cancelación compartida entre la capa HTTP y el hilo de la corrida
+    """
+
+    def __init__(self):
+        self._evento = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.motivo: Optional[str] = None
+
+    @property
+    def cancelado(self) -> bool:
+        return self._evento.is_set()
+
+    def cancelar(self, motivo: str = "cancelada") -> None:
+        """
+        Cancela el token (solo la primera vez tiene efecto) y avisa a los interesados
+        """
+        with self._lock:
+            if self._evento.is_set():
+                return
+            self.motivo = motivo
+            self._evento.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def al_cancelar(self, callback: Callable[[], None]) -> None:
+        """
+        Registra un callback para cuando se cancele (se llama de inmediato si ya lo está)
+        """
+        with self._lock:
+            if not self._evento.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def verificar(self) -> None:
+        """
+        Raises:
+            CorridaCancelada: Si el token fue cancelado
+        """
+        if self._evento.is_set():
+            raise CorridaCancelada(self.motivo)
+
+
+class SesionesActivas:
+    """
+    Petición vigente por sesión: registrar una nueva cancela la anterior de la misma sesión
+    """
+
+    def __init__(self):
+        self._tokens: Dict[str, TokenCancelacion] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, sesion: str, token: TokenCancelacion) -> None:
+        with self._lock:
+            anterior = self._tokens.get(sesion)
+            self._tokens[sesion] = token
+        if anterior is not None and anterior is not token:
+            anterior.cancelar("reemplazada por una petición más reciente de la misma sesión")
+
+    def liberar(self, sesion: str, token: TokenCancelacion) -> None:
+        with self._lock:
+            if self._tokens.get(sesion) is token:
+                del self._tokens[sesion]
+
+
+sesiones_activas = SesionesActivas()
@@ -0,0 +1,87 @@
+"""
+Almacenamiento columnar de resultados de Monte Carlo.
+
+Un array float64 preasignado de forma (trayectorias, anos) por cada campo
+numérico de ResultadoAnual. El motor vectorizado escribe cada año directamente
+en su columna; los modelos Pydantic solo se construyen para las trayectorias
+que se devuelven al cliente.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+import numpy as np
+from schemas import ResultadoAnual
+from fiscal_model import generar_alertas
+
+# Campos numéricos de ResultadoAnual (todos salvo el año y las alertas)
+CAMPOS_RESULTADO_ANUAL = [
+    campo for campo, info in ResultadoAnual.model_fields.items() if info.annotation is float
+]
+
+
+class ResultadosColumnares:
+    """
+    Resultados de N trayectorias: campo -> array (N, anos)
+    """
+
+    def __init__(
+        self,
+        num_trayectorias: int,
+        anos: int,
+        campos: Sequence[str] = CAMPOS_RESULTADO_ANUAL,
+        columnas: Optional[Dict[str, np.ndarray]] = None
+    ):
+        self.num_trayectorias = num_trayectorias
+        self.anos = anos
+        if columnas is None:
+            columnas = {campo: np.zeros((num_trayectorias, anos)) for campo in campos}
+        self.columnas = columnas
+
+    @property
+    def campos(self) -> List[str]:
+        return list(self.columnas)
+
+    def __getitem__(self, campo: str) -> np.ndarray:
+        return self.columnas[campo]
+
+    def __contains__(self, campo: str) -> bool:
+        return campo in self.columnas
+
+    def anio(self, ano_idx: int) -> Dict[str, np.ndarray]:
+        """
+        Vistas (N,) de todos los campos en un año (sin copiar); el motor vectorizado
+        calcula cada año directamente en ellas
+        """
+        return {campo: columna[:, ano_idx] for campo, columna in self.columnas.items()}
+
+    def seleccionar(self, campos: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Subconjunto de columnas (sin copiar)
+        """
+        return {campo: self.columnas[campo] for campo in campos}
+
+    def trayectoria(self, indice: int, ano_inicial: int = 2020) -> List[ResultadoAnual]:
+        """
+        Materializa una trayectoria como lista de ResultadoAnual (con sus alertas)
+        """
+        resultados: List[ResultadoAnual] = []
+        for ano_idx in range(self.anos):
+            valores = {campo: float(columna[indice, ano_idx]) for campo, columna in self.columnas.items()}
+            cambios = generar_alertas(
+                valores['deuda_pib_ratio'],
+                valores['deficit_pib_ratio'],
+                valores['gasto_subsidio_combustibles'],
+                valores['ing_gas'],
+                valores['rin_meses_importacion']
+            )
+            resultados.append(ResultadoAnual(ano=ano_inicial + ano_idx, cambios=cambios, **valores))
+        return resultados
+
+    @classmethod
+    def concatenar(cls, bloques: Sequence['ResultadosColumnares']) -> 'ResultadosColumnares':
+        """
+        Une bloques de trayectorias contiguas (en orden)
+        """
+        columnas = {
+            campo: np.concatenate([bloque.columnas[campo] for bloque in bloques])
+            for campo in bloques[0].columnas
+        }
+        return cls(sum(b.num_trayectorias for b in bloques), bloques[0].anos, columnas=columnas)
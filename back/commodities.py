@@ -0,0 +1,108 @@
+"""
+Registro de commodities de exportación.
+
+Cada commodity se describe con datos: el prefijo de sus parámetros
+({nombre}_volumen_base, {nombre}_volumen_coef_z, {nombre}_precio_base,
+{nombre}_precio_coef_z, {nombre}_tasa_regalias), el parámetro de shock de
+precio y el campo de ResultadoAnual donde se reporta. Todos se evalúan juntos
+como una sola operación sobre arrays (trayectorias × commodities):
+
+    ingresos brutos = V * P * TC,   regalías = brutos * tasa_regalias,   IDH = brutos * tasa_idh
+
+Agregar un commodity (p. ej. litio, hoy ing_litio = 0) es agregar su entrada
+aquí junto con sus parámetros en ParametrosSimulacion. El orden del registro
+define el orden de los factores aleatorios, así que las entradas nuevas van al
+final (cambian las normales generadas para una misma semilla).
+"""
+from typing import Dict, NamedTuple, Optional, Tuple
+import numpy as np
+from schemas import ParametrosSimulacion
+from stochastic import normal_truncada_array
+
+
+class Commodity(NamedTuple):
+    nombre: str                              # Prefijo de los parámetros
+    campo_resultado: Optional[str]           # Campo de ResultadoAnual (None si no se desagrega)
+    parametro_shock: str                     # Shock de precio (%)
+    parametro_tasa_idh: Optional[str] = None  # Solo hidrocarburos
+
+
+REGISTRO_COMMODITIES: Tuple[Commodity, ...] = (
+    Commodity('gas', 'ing_gas', 'shock_precio_gas', 'gas_tasa_idh'),
+    Commodity('oro', 'ing_oro', 'shock_precio_oro'),
+    Commodity('plata', 'ing_plata', 'shock_precio_plata'),
+    Commodity('zinc', 'ing_zinc', 'shock_precio_zinc'),
+    Commodity('estano', 'ing_estano', 'shock_precio_estano'),
+    Commodity('plomo', None, 'shock_precio_plomo'),
+)
+
+COMMODITIES = tuple(commodity.nombre for commodity in REGISTRO_COMMODITIES)
+INDICE_COMMODITY = {nombre: k for k, nombre in enumerate(COMMODITIES)}
+
+# Parámetros por commodity que lee coeficientes_commodities ({nombre}_{sufijo})
+_SUFIJOS_PARAMETROS = ('volumen_base', 'volumen_coef_z', 'precio_base', 'precio_coef_z', 'tasa_regalias')
+
+# Campos de ParametrosSimulacion que leen los commodities
+CAMPOS_COMMODITIES: Tuple[str, ...] = tuple(
+    f"{c.nombre}_{sufijo}" for c in REGISTRO_COMMODITIES for sufijo in _SUFIJOS_PARAMETROS
+) + tuple(c.parametro_shock for c in REGISTRO_COMMODITIES) + tuple(
+    c.parametro_tasa_idh for c in REGISTRO_COMMODITIES if c.parametro_tasa_idh
+)
+
+
+def coeficientes_commodities(parametros: ParametrosSimulacion) -> Dict[str, np.ndarray]:
+    """
+    Parámetros de todos los commodities como arrays (K,) en el orden del registro
+
+    Returns:
+        Dict con volumen_base, volumen_coef_z, precio_base, precio_coef_z,
+        multiplicador_precio (1 + shock/100), tasa_regalias y tasa_idh (tasas en fracción, no en %)
+    """
+    coeficientes = {
+        sufijo: np.array([getattr(parametros, f"{c.nombre}_{sufijo}") for c in REGISTRO_COMMODITIES], dtype=float)
+        for sufijo in ('volumen_base', 'volumen_coef_z', 'precio_base', 'precio_coef_z')
+    }
+    coeficientes['multiplicador_precio'] = np.array(
+        [1 + getattr(parametros, c.parametro_shock) / 100 for c in REGISTRO_COMMODITIES]
+    )
+    coeficientes['tasa_regalias'] = np.array(
+        [getattr(parametros, f"{c.nombre}_tasa_regalias") / 100 for c in REGISTRO_COMMODITIES]
+    )
+    coeficientes['tasa_idh'] = np.array([
+        getattr(parametros, c.parametro_tasa_idh) / 100 if c.parametro_tasa_idh else 0.0
+        for c in REGISTRO_COMMODITIES
+    ])
+    return coeficientes
+
+
+def calcular_commodities_vectorizado(
+    coeficientes: Dict[str, np.ndarray],
+    TC: np.ndarray,
+    Z_volumen: np.ndarray,
+    Z_precio: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Ingresos de exportación de todos los commodities en un solo paso
+
+    Args:
+        coeficientes: Resultado de coeficientes_commodities
+        TC: Tipo de cambio, forma (N,)
+        Z_volumen: Normales de los volúmenes, forma (N, K)
+        Z_precio: Normales de los precios, forma (N, K)
+
+    Returns:
+        Dict con volumen, precio_usd, ingresos_brutos, regalias e idh, cada uno de forma (N, K)
+    """
+    volumen = normal_truncada_array(coeficientes['volumen_base'], coeficientes['volumen_coef_z'], Z_volumen)
+    precio = normal_truncada_array(coeficientes['precio_base'], coeficientes['precio_coef_z'], Z_precio)
+    precio = precio * coeficientes['multiplicador_precio']
+    ingresos_brutos = volumen * precio * TC[:, np.newaxis]
+    regalias = ingresos_brutos * coeficientes['tasa_regalias']
+    idh = ingresos_brutos * coeficientes['tasa_idh']
+    return {
+        'volumen': volumen,
+        'precio_usd': precio,
+        'ingresos_brutos': ingresos_brutos,
+        'regalias': regalias,
+        'idh': idh,
+    }
@@ -0,0 +1,166 @@
+"""
+Compilación de ParametrosSimulacion a coeficientes listos para el motor vectorizado.
+
+El motor no lee atributos de Pydantic en el ciclo principal: usa un paquete
+inmutable con los vectores base/coef_z, las tasas ya divididas por 100 y los
+shocks como multiplicadores. Los paquetes se guardan en un LRU cuya clave es un
+hash estable (SHA-256) de los campos que usa el modelo, así que los campos
+"[No usado]" no afectan la clave y repetir parámetros no recompila nada.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Tuple, Union
+import numpy as np
+from schemas import ParametrosSimulacion
+from commodities import CAMPOS_COMMODITIES, coeficientes_commodities
+
+# Tamaño del LRU de parámetros compilados
+TAMANO_CACHE_COMPILADOS = 128
+
+# Impuestos lineales en la Z común, en el orden de fiscal_model.calcular_ingresos
+# (el IDH va entre ice_i e iehd_mi y depende del gas, no de Z)
+TRIBUTARIOS_LINEALES = (
+    'iva_mi', 'iue', 'it', 'ice_mi', 'rc_iva', 'itf', 'ij',
+    'conceptos_varios', 'ga', 'iva_i', 'ice_i', 'iehd_mi', 'iehd_i'
+)
+
+# Precios y volúmenes de importación de combustibles (lineales en Z)
+COMBUSTIBLES = (
+    'subsidio_gasolina_precio', 'subsidio_diesel_precio',
+    'subsidio_gasolina_volumen', 'subsidio_diesel_volumen'
+)
+
+_CAMPOS_GENERALES = (
+    'tc_base', 'tc_coef_z', 'shock_tc',
+    'corriente_base', 'corriente_coef_z',
+    'subsidio_alimentos_base', 'subsidio_alimentos_coef_z',
+    'pib_inicial', 'crecimiento_pib',
+    'deuda_externa_inicial', 'deuda_interna_inicial',
+    'tasa_interes_externa', 'tasa_interes_interna',
+    'rin_inicial',
+    'subsidio_combustibles_activo', 'subsidio_gasolina_venta', 'subsidio_diesel_venta',
+)
+
+# Campos de ParametrosSimulacion que lee _compilar (los únicos que entran en la clave):
+# un campo nuevo del modelo se agrega aquí o en las tuplas de las que se deriva
+CAMPOS_MODELO: Tuple[str, ...] = tuple(sorted(
+    set(_CAMPOS_GENERALES)
+    | {f"{t}_{sufijo}" for t in TRIBUTARIOS_LINEALES + COMBUSTIBLES for sufijo in ('base', 'coef_z')}
+    | set(CAMPOS_COMMODITIES)
+))
+
+
+class ParametrosCompilados(NamedTuple):
+    clave: str
+    # Tipo de cambio
+    tc_base: float
+    tc_coef_z: float
+    multiplicador_tc: float
+    # Commodities (arrays (K,) en el orden del registro)
+    commodities: Dict[str, np.ndarray]
+    # Impuestos lineales (arrays (T,) en el orden de TRIBUTARIOS_LINEALES)
+    tributarios_base: np.ndarray
+    tributarios_coef_z: np.ndarray
+    # Gastos
+    corriente_base: float
+    corriente_coef_z: float
+    subsidio_alimentos_base: float
+    subsidio_alimentos_coef_z: float
+    subsidio_combustibles_activo: bool
+    combustibles_base: np.ndarray
+    combustibles_coef_z: np.ndarray
+    subsidio_gasolina_venta: float
+    subsidio_diesel_venta: float
+    # Deuda, RIN y PIB (tasas en fracción)
+    tasa_interes_externa: float
+    tasa_interes_interna: float
+    crecimiento_pib: float
+    factor_crecimiento_pib: float
+    pib_inicial: float
+    deuda_externa_inicial: float
+    deuda_interna_inicial: float
+    rin_inicial: float
+
+
+_cache: 'OrderedDict[str, ParametrosCompilados]' = OrderedDict()
+_lock = threading.Lock()
+
+
+def clave_parametros(parametros: ParametrosSimulacion) -> str:
+    """
+    Hash estable (SHA-256) de los campos que usa el modelo
+    """
+    valores = {campo: getattr(parametros, campo) for campo in CAMPOS_MODELO}
+    return hashlib.sha256(json.dumps(valores, sort_keys=True).encode()).hexdigest()
+
+
+def _solo_lectura(valores) -> np.ndarray:
+    array = np.array(valores, dtype=float)
+    array.flags.writeable = False
+    return array
+
+
+def _compilar(parametros: ParametrosSimulacion, clave: str) -> ParametrosCompilados:
+    commodities = {nombre: _solo_lectura(valores) for nombre, valores in coeficientes_commodities(parametros).items()}
+    return ParametrosCompilados(
+        clave=clave,
+        tc_base=parametros.tc_base,
+        tc_coef_z=parametros.tc_coef_z,
+        multiplicador_tc=1 + parametros.shock_tc / 100,
+        commodities=commodities,
+        tributarios_base=_solo_lectura([getattr(parametros, f"{t}_base") for t in TRIBUTARIOS_LINEALES]),
+        tributarios_coef_z=_solo_lectura([getattr(parametros, f"{t}_coef_z") for t in TRIBUTARIOS_LINEALES]),
+        corriente_base=parametros.corriente_base,
+        corriente_coef_z=parametros.corriente_coef_z,
+        subsidio_alimentos_base=parametros.subsidio_alimentos_base,
+        subsidio_alimentos_coef_z=parametros.subsidio_alimentos_coef_z,
+        subsidio_combustibles_activo=parametros.subsidio_combustibles_activo,
+        combustibles_base=_solo_lectura([getattr(parametros, f"{c}_base") for c in COMBUSTIBLES]),
+        combustibles_coef_z=_solo_lectura([getattr(parametros, f"{c}_coef_z") for c in COMBUSTIBLES]),
+        subsidio_gasolina_venta=parametros.subsidio_gasolina_venta,
+        subsidio_diesel_venta=parametros.subsidio_diesel_venta,
+        tasa_interes_externa=parametros.tasa_interes_externa / 100,
+        tasa_interes_interna=parametros.tasa_interes_interna / 100,
+        crecimiento_pib=float(parametros.crecimiento_pib),
+        factor_crecimiento_pib=1 + parametros.crecimiento_pib / 100,
+        pib_inicial=parametros.pib_inicial,
+        deuda_externa_inicial=parametros.deuda_externa_inicial,
+        deuda_interna_inicial=parametros.deuda_interna_inicial,
+        rin_inicial=parametros.rin_inicial,
+    )
+
+
+def compilar_parametros(
+    parametros: Union[ParametrosSimulacion, ParametrosCompilados]
+) -> ParametrosCompilados:
+    """
+    Coeficientes compilados de los parámetros, desde el LRU si ya se compilaron
+
+    Args:
+        parametros: ParametrosSimulacion (o un paquete ya compilado, que se devuelve tal cual)
+
+    Returns:
+        ParametrosCompilados inmutable
+    """
+    if isinstance(parametros, ParametrosCompilados):
+        return parametros
+    clave = clave_parametros(parametros)
+    with _lock:
+        compilados = _cache.get(clave)
+        if compilados is not None:
+            _cache.move_to_end(clave)
+            return compilados
+    compilados = _compilar(parametros, clave)
+    with _lock:
+        _cache[clave] = compilados
+        _cache.move_to_end(clave)
+        while len(_cache) > TAMANO_CACHE_COMPILADOS:
+            _cache.popitem(last=False)
+    return compilados
+
+
+def limpiar_cache_compilados() -> None:
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,143 @@
+"""
+Resúmenes compactos de las distribuciones de Monte Carlo.
+
+En lugar de devolver las N trayectorias de cada variable y año, el resultado
+lleva por variable:
+
+- histograma: fracción de trayectorias en cada intervalo; los bordes son los
+  mismos para todos los años (del mínimo al máximo de la corrida), así que los
+  histogramas de distintos años se comparan directamente
+- cuantiles: valores en una grilla fija de probabilidades (0, 0.01, ..., 1)
+
+En modo exacto salen de todas las trayectorias; en modo streaming, de los
+acumuladores en línea (t-digest, ver streaming_stats), es decir, de la
+corrida completa y no solo de la muestra del primer bloque.
+"""
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+from streaming_stats import EstadisticasOnline
+from stats_kernel import EstadisticasVectorizadas
+
+# 'muestras' devuelve las trayectorias completas (distribucion_*), como antes
+FORMATOS_DISTRIBUCIONES = ('histograma', 'cuantiles', 'histograma_cuantiles', 'muestras')
+
+NUM_BINS_HISTOGRAMA = 50
+MAX_BINS_HISTOGRAMA = 500
+
+# Grilla de probabilidades de los cuantiles: 0 (mínimo), 0.01, ..., 0.99, 1 (máximo)
+PROBABILIDADES_CUANTILES = [round(i / 100, 2) for i in range(101)]
+
+
+class ResumenDistribuciones:
+    """
+    Histogramas y cuantiles de una corrida por variable: bordes compartidos
+    (num_bins + 1), frecuencias (anos, num_bins) y cuantiles (anos, len(PROBABILIDADES_CUANTILES))
+    """
+
+    def __init__(self):
+        self.bordes: Optional[Dict[str, np.ndarray]] = None
+        self.histogramas: Optional[Dict[str, np.ndarray]] = None
+        self.cuantiles: Optional[Dict[str, np.ndarray]] = None
+
+    def por_ano(self, ano_idx: int):
+        """
+        (histogramas, cuantiles) de un año como listas por variable (None si no se calcularon
+        o no hay variables con distribución)
+        """
+        return tuple(
+            {campo: valores[ano_idx].tolist() for campo, valores in arrays.items()} if arrays else None
+            for arrays in (self.histogramas, self.cuantiles)
+        )
+
+
+def validar_distribuciones(formato: str, num_bins: int) -> None:
+    """
+    Raises:
+        ValueError: Si el formato no existe o num_bins está fuera de [1, MAX_BINS_HISTOGRAMA]
+    """
+    if formato not in FORMATOS_DISTRIBUCIONES:
+        raise ValueError(f"Formato de distribuciones desconocido: {formato}")
+    if not 1 <= num_bins <= MAX_BINS_HISTOGRAMA:
+        raise ValueError(f"num_bins debe estar entre 1 y {MAX_BINS_HISTOGRAMA}")
+
+
+def bordes_histograma(minimo: float, maximo: float, num_bins: int) -> np.ndarray:
+    """
+    num_bins + 1 bordes equiespaciados entre minimo y maximo (ensanchados si coinciden)
+    """
+    if not maximo > minimo:
+        minimo, maximo = minimo - 0.5, maximo + 0.5
+    return np.linspace(minimo, maximo, num_bins + 1)
+
+
+def _extremos(
+    campo: str,
+    muestras: Optional[Dict[str, np.ndarray]],
+    acumuladores: Optional[Dict[str, EstadisticasOnline]]
+) -> Tuple[float, float]:
+    if acumuladores is not None:
+        momentos = acumuladores[campo].momentos
+        return float(momentos.minimo.min()), float(momentos.maximo.max())
+    return float(muestras[campo].min()), float(muestras[campo].max())
+
+
+def resumir_distribuciones(
+    variables: Sequence[str],
+    anos: int,
+    formato: str,
+    num_bins: int = NUM_BINS_HISTOGRAMA,
+    muestras: Optional[Dict[str, np.ndarray]] = None,
+    acumuladores: Optional[Dict[str, EstadisticasOnline]] = None,
+    vectorizadas: Optional[EstadisticasVectorizadas] = None
+) -> ResumenDistribuciones:
+    """
+    Histogramas y/o cuantiles por variable y año
+
+    Args:
+        variables: Variables a resumir
+        anos: Número de años
+        formato: Uno de FORMATOS_DISTRIBUCIONES ('muestras' no calcula nada)
+        num_bins: Intervalos de los histogramas
+        muestras: Trayectorias completas (variable -> array (N, anos)), en modo exacto
+        acumuladores: Acumuladores en línea por variable, en modo streaming (tienen prioridad)
+        vectorizadas: En modo exacto, estadísticas que ya incluyen la grilla de cuantiles
+            (ver stats_kernel); si no, los cuantiles se calculan de las muestras
+
+    Returns:
+        ResumenDistribuciones con los campos del formato pedido (los demás en None)
+    """
+    validar_distribuciones(formato, num_bins)
+    resumen = ResumenDistribuciones()
+
+    if formato in ('histograma', 'histograma_cuantiles'):
+        resumen.bordes = {}
+        resumen.histogramas = {}
+        for campo in variables:
+            bordes = bordes_histograma(*_extremos(campo, muestras, acumuladores), num_bins)
+            resumen.bordes[campo] = bordes
+            resumen.histogramas[campo] = np.empty((anos, num_bins))
+            for ano_idx in range(anos):
+                if acumuladores is not None:
+                    # Los bordes cubren [mínimo, máximo] de la corrida: una masa puntual en el
+                    # mínimo (p. ej. RIN en 0) cae en el primer intervalo, como en np.histogram
+                    acumulada = acumuladores[campo].cdf(ano_idx, bordes)
+                    acumulada[0], acumulada[-1] = 0.0, 1.0
+                    frecuencias = np.diff(acumulada)
+                else:
+                    columna = muestras[campo][:, ano_idx]
+                    frecuencias = np.histogram(columna, bordes)[0] / len(columna)
+                resumen.histogramas[campo][ano_idx] = frecuencias
+
+    if formato in ('cuantiles', 'histograma_cuantiles'):
+        resumen.cuantiles = {}
+        for campo in variables:
+            if acumuladores is not None:
+                resumen.cuantiles[campo] = np.array([
+                    acumuladores[campo].cuantiles(ano_idx, PROBABILIDADES_CUANTILES) for ano_idx in range(anos)
+                ])
+            elif vectorizadas is not None:
+                resumen.cuantiles[campo] = vectorizadas.cuantiles(campo, PROBABILIDADES_CUANTILES)
+            else:
+                resumen.cuantiles[campo] = np.quantile(muestras[campo], PROBABILIDADES_CUANTILES, axis=0).T
+
+    return resumen
@@ -1,172 +1,50 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from schemas import ParametrosSimulacion, ResultadoAnual
-from stochastic import box_muller, aplicar_shock
+from stochastic import box_muller, aplicar_shock, normal_truncada
+from commodities import Commodity, REGISTRO_COMMODITIES
+
+# Umbrales prudenciales de las alertas (también las reglas de tail_risk)
+LIMITE_DEUDA_PIB = 70
+LIMITE_DEFICIT_PIB = 5
+MIN_RIN_MESES = 3
 
 def calcular_tipo_cambio(parametros, Z: float, shock_pct: float = 0.0) -> float:
     """
     TC = base + coef_z*Z ± Shock%
     Now uses configurable parameters instead of hardcoded values
     """
-    while (True):
-        Z = box_muller()
-        tc = parametros.tc_base + parametros.tc_coef_z * Z
-        print (f"TC: {tc}")
-        if (tc > 0):
-            break
+    tc = normal_truncada(parametros.tc_base, parametros.tc_coef_z)
     return aplicar_shock(tc, shock_pct)
 
-def calcular_ingresos_gas(parametros, Z: float, TC: float, shock_precio_pct: float = 0.0) -> Dict[str, float]:
-    """
-    Uses configurable gas parameters from ParametrosSimulacion
+def calcular_ingresos_commodity(parametros, commodity: Commodity, TC: float) -> Dict[str, float]:
     """
-    # Volumen de exportación (Toneladas)
-    while (True): 
-        Z = box_muller()
-        Vg = parametros.gas_volumen_base + parametros.gas_volumen_coef_z * Z
-        print (f"VG: {Vg}")
-        if (Vg > 0):
-            break
-
-    # Precio internacional ($/Tonelada)
-    while (True):
-        Z = box_muller()
-        Pg = parametros.gas_precio_base + parametros.gas_precio_coef_z * Z
-        print (f"PG: {Pg}")
-        if (Pg > 0):
-            break
-
-    Pg = aplicar_shock(Pg, shock_precio_pct)
+    Ingresos de exportación de un commodity del registro (ver commodities.py)
     
-    # Ingresos brutos
-    ingresos_brutos = Vg * Pg * TC
+    Ingresos brutos = V * P * TC; regalías e IDH son tasas configurables sobre los brutos
+    """
+    volumen = normal_truncada(
+        getattr(parametros, f"{commodity.nombre}_volumen_base"),
+        getattr(parametros, f"{commodity.nombre}_volumen_coef_z")
+    )
+    precio = normal_truncada(
+        getattr(parametros, f"{commodity.nombre}_precio_base"),
+        getattr(parametros, f"{commodity.nombre}_precio_coef_z")
+    )
+    precio = aplicar_shock(precio, getattr(parametros, commodity.parametro_shock))
     
-    # IDH y Regalías con tasas configurables
-    IDH = ingresos_brutos * (parametros.gas_tasa_idh / 100)
-    regalias = ingresos_brutos * (parametros.gas_tasa_regalias / 100)
+    ingresos_brutos = volumen * precio * TC
+    regalias = ingresos_brutos * (getattr(parametros, f"{commodity.nombre}_tasa_regalias") / 100)
+    idh = ingresos_brutos * (getattr(parametros, commodity.parametro_tasa_idh) / 100) if commodity.parametro_tasa_idh else 0.0
     
     return {
-        'volumen': Vg,
-        'precio_usd': Pg,
+        'volumen': volumen,
+        'precio_usd': precio,
         'ingresos_brutos': ingresos_brutos,
-        'idh': IDH,
+        'idh': idh,
         'regalias': regalias,
-        'total': IDH + regalias
+        'total': idh + regalias
     }
 
-def calcular_ingresos_oro(parametros, Z: float, TC: float, shock_precio_pct: float = 0.0) -> Dict[str, float]:
-    """
-    Uses configurable oro parameters
-    """
-    while (True):
-        Z = box_muller()
-        VO = parametros.oro_volumen_base + parametros.oro_volumen_coef_z * Z
-        print (f"VO: {VO}")
-        if (VO > 0):
-            break
-
-    while (True):
-        Z = box_muller()
-        PO = parametros.oro_precio_base + parametros.oro_precio_coef_z * Z
-        print (f"PO: {PO}")
-        if (PO > 0):
-            break
-
-    PO = aplicar_shock(PO, shock_precio_pct)
-    IO = VO * PO * TC * (parametros.oro_tasa_regalias / 100)
-    
-    return {'volumen': VO, 'precio_usd': PO, 'total': IO}
-
-def calcular_ingresos_plata(parametros, Z: float, TC: float, shock_precio_pct: float = 0.0) -> Dict[str, float]:
-    """
-    Uses configurable plata parameters
-    """
-    while (True):
-        Z = box_muller()
-        VP = parametros.plata_volumen_base + parametros.plata_volumen_coef_z * Z
-        print (f"VP: {VP}")
-        if (VP > 0):
-            break
-    while (True):
-        Z = box_muller()
-        PP = parametros.plata_precio_base + parametros.plata_precio_coef_z * Z
-        print (f"PP: {PP}")
-        if (PP > 0):
-            break
-
-    PP = aplicar_shock(PP, shock_precio_pct)
-    IP = VP * PP * TC * (parametros.plata_tasa_regalias / 100)
-    
-    return {'volumen': VP, 'precio_usd': PP, 'total': IP}
-
-def calcular_ingresos_zinc(parametros, Z: float, TC: float, shock_precio_pct: float = 0.0) -> Dict[str, float]:
-    """
-    Uses configurable zinc parameters
-    """
-    while (True):
-        Z = box_muller()
-        VZ = parametros.zinc_volumen_base + parametros.zinc_volumen_coef_z * Z
-        print (f"VZ: {VZ}")
-        if (VZ > 0):
-            break
-
-    while (True):
-        Z = box_muller()
-        PZ = parametros.zinc_precio_base + parametros.zinc_precio_coef_z * Z
-        print (f"PZ: {PZ}")
-        if (PZ > 0):
-            break
-
-    PZ = aplicar_shock(PZ, shock_precio_pct)
-    IZ = VZ * PZ * TC * (parametros.zinc_tasa_regalias / 100)
-    
-    return {'volumen': VZ, 'precio_usd': PZ, 'total': IZ}
-
-def calcular_ingresos_estano(parametros, Z: float, TC: float, shock_precio_pct: float = 0.0) -> Dict[str, float]:
-    """
-    Uses configurable estano parameters
-    """
-    while (True):
-        Z = box_muller()
-        VES = parametros.estano_volumen_base + parametros.estano_volumen_coef_z * Z
-        print (f"VES: {VES}")
-        if (VES > 0):
-            break
-    
-    while (True):
-        Z = box_muller()
-        PES = parametros.estano_precio_base + parametros.estano_precio_coef_z * Z
-        print (f"PES: {PES}")
-        if (PES > 0):
-            break
-
-    PES = aplicar_shock(PES, shock_precio_pct)
-    IES = VES * PES * TC * (parametros.estano_tasa_regalias / 100)
-    
-    return {'volumen': VES, 'precio_usd': PES, 'total': IES}
-
-def calcular_ingresos_plomo(parametros, Z: float, TC: float, shock_precio_pct: float = 0.0) -> Dict[str, float]:
-    """
-    Uses configurable plomo parameters
-    """
-    while (True):
-        Z = box_muller()
-        VPL = parametros.plomo_volumen_base + parametros.plomo_volumen_coef_z * Z
-        print (f"VPL: {VPL}")
-        if (VPL > 0):
-            break
-    
-    while (True):
-        Z = box_muller()
-        PPL = parametros.plomo_precio_base + parametros.plomo_precio_coef_z * Z
-        print (f"PPL: {PPL}")
-        if (PPL > 0):
-            break
-
-    PPL = aplicar_shock(PPL, shock_precio_pct)
-    IPL = VPL * PPL * TC * (parametros.plomo_tasa_regalias / 100)
-    
-    return {'volumen': VPL, 'precio_usd': PPL, 'total': IPL}
-
 def calcular_ingresos_tributarios(parametros, Z: float, ing_gas_brutos: float) -> Dict[str, float]:
     """
     Calcula todos los ingresos tributarios según fórmulas del modelo
@@ -251,17 +129,15 @@ def calcular_ingresos(
     # Tipo de cambio con parámetros configurables
     TC = calcular_tipo_cambio(parametros, Z, parametros.shock_tc)
     
-    # EXPORTACIONES con parámetros configurables
-    gas_data = calcular_ingresos_gas(parametros, Z, TC, parametros.shock_precio_gas)
-    oro_data = calcular_ingresos_oro(parametros, Z, TC, parametros.shock_precio_oro)
-    plata_data = calcular_ingresos_plata(parametros, Z, TC, parametros.shock_precio_plata)
-    zinc_data = calcular_ingresos_zinc(parametros, Z, TC, parametros.shock_precio_zinc)
-    estano_data = calcular_ingresos_estano(parametros, Z, TC, parametros.shock_precio_estano)
-    plomo_data = calcular_ingresos_plomo(parametros, Z, TC, parametros.shock_precio_plomo)
+    # EXPORTACIONES: todos los commodities del registro
+    commodities = {
+        commodity.nombre: calcular_ingresos_commodity(parametros, commodity, TC)
+        for commodity in REGISTRO_COMMODITIES
+    }
+    gas_data = commodities['gas']
     
-    # Ingresos por exportación de recursos
-    I_EX = (plata_data['total'] + oro_data['total'] + gas_data['regalias'] + 
-            zinc_data['total'] + estano_data['total'] + plomo_data['total'])
+    # Ingresos por exportación de recursos (regalías; el IDH se suma aparte)
+    I_EX = sum(datos['regalias'] for datos in commodities.values())
     
     # INGRESOS TRIBUTARIOS
     tributarios = calcular_ingresos_tributarios(parametros, Z, gas_data['ingresos_brutos'])
@@ -280,11 +156,7 @@ def calcular_ingresos(
         'gas_regalias': gas_data['regalias'],
         'gas_total': gas_data['total'],
         # Minerales
-        'oro': oro_data['total'],
-        'plata': plata_data['total'],
-        'zinc': zinc_data['total'],
-        'estano': estano_data['total'],
-        'plomo': plomo_data['total'],
+        **{nombre: datos['total'] for nombre, datos in commodities.items() if nombre != 'gas'},
         'exportaciones_total': I_EX,
         # Tributarios
         'iva_mi': tributarios['iva_mercado_interno'],
@@ -465,4 +337,20 @@ def calcular_indicadores(parametros, estado_anterior=None):
         'ingresos': ingresos,
         'gastos': gastos,
         'deficit_deuda': deficit_deuda
-    }
\ No newline at end of file
+    }
+
+def generar_alertas(deuda_pib: float, deficit_pib: float, subsidio_hidrocarburos: float,
+                    ingresos_gas: float, rin_meses: float) -> List[str]:
+    """
+    Genera las alertas de sostenibilidad de un año (umbrales prudenciales del modelo)
+    """
+    cambios: List[str] = []
+    if deuda_pib > LIMITE_DEUDA_PIB:
+        cambios.append(f"⚠️ Deuda/PIB {deuda_pib:.1f}% supera límite prudencial")
+    if deficit_pib > LIMITE_DEFICIT_PIB:
+        cambios.append(f"⚠️ Déficit/PIB {deficit_pib:.1f}% elevado")
+    if subsidio_hidrocarburos > ingresos_gas:
+        cambios.append(f"⚠️ Subsidios ({subsidio_hidrocarburos:.0f}M) superan ingresos gas")
+    if rin_meses < MIN_RIN_MESES:
+        cambios.append(f"⚠️ RIN ({rin_meses:.1f} meses) por debajo del mínimo recomendado")
+    return cambios
@@ -0,0 +1,212 @@
+"""
+Trabajos Monte Carlo asíncronos.
+
+Una petición crea un trabajo y recibe su id de inmediato; la corrida se ejecuta
+en un pool acotado de hilos (cada uno puede además usar el pool de procesos de
+parallel) y el cliente consulta el estado, el progreso y el resultado.
+
+- Control de admisión: si ya hay SIM_TRABAJOS_MAX_COLA trabajos en cola, los
+  nuevos se rechazan (ColaLlena) en lugar de acumularse sin límite.
+- Cancelación: un trabajo en cola se descarta; uno en ejecución se detiene en
+  el siguiente bloque de trayectorias (la corrida verifica el TokenCancelacion
+  del trabajo entre bloques; ver cancellation).
+- Los trabajos terminados se conservan (los últimos SIM_TRABAJOS_RETENIDOS)
+  para que el cliente pueda leer el resultado.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+from schemas import EstadoTrabajo, ResultadoMonteCarloComplete
+from cancellation import CorridaCancelada, TokenCancelacion
+
+# Trabajos ejecutándose a la vez
+NUM_TRABAJADORES = int(os.environ.get("SIM_TRABAJOS_CONCURRENTES", 2))
+
+# Trabajos en espera admitidos
+MAX_EN_COLA = int(os.environ.get("SIM_TRABAJOS_MAX_COLA", 16))
+
+# Trabajos terminados que se conservan para consultar su resultado
+MAX_TERMINADOS = int(os.environ.get("SIM_TRABAJOS_RETENIDOS", 100))
+
+ESTADOS_TERMINALES = ('completado', 'fallido', 'cancelado')
+
+
+class ColaLlena(Exception):
+    """La cola de trabajos alcanzó MAX_EN_COLA"""
+
+
+class TrabajoMonteCarlo:
+    """
+    Un trabajo: estado, progreso y resultado de una corrida
+    """
+
+    def __init__(self, num_simulaciones: int):
+        self.id_trabajo = uuid.uuid4().hex
+        self.estado = 'en_cola'
+        self.num_simulaciones = num_simulaciones
+        self.trayectorias_procesadas = 0
+        self.creado = time.time()
+        self.iniciado: Optional[float] = None
+        self.terminado: Optional[float] = None
+        self.error: Optional[str] = None
+        self.resultado: Optional[ResultadoMonteCarloComplete] = None
+        self.cancelacion = TokenCancelacion()
+
+    def progreso(self, trayectorias_procesadas: int, estado=None) -> None:
+        """
+        Callback de la corrida: registra el avance
+        """
+        self.trayectorias_procesadas = trayectorias_procesadas
+
+    def resumen(self, incluir_resultado: bool = True) -> EstadoTrabajo:
+        return EstadoTrabajo(
+            id_trabajo=self.id_trabajo,
+            estado=self.estado,
+            num_simulaciones=self.num_simulaciones,
+            trayectorias_procesadas=self.trayectorias_procesadas,
+            progreso=min(self.trayectorias_procesadas / self.num_simulaciones, 1.0) if self.num_simulaciones else 0.0,
+            creado=self.creado,
+            iniciado=self.iniciado,
+            terminado=self.terminado,
+            error=self.error,
+            resultado=self.resultado if incluir_resultado else None
+        )
+
+
+class GestorTrabajos:
+    """
+    Pool acotado de trabajos con cola limitada
+    """
+
+    def __init__(
+        self,
+        num_trabajadores: int = NUM_TRABAJADORES,
+        max_en_cola: int = MAX_EN_COLA,
+        max_terminados: int = MAX_TERMINADOS
+    ):
+        self.num_trabajadores = num_trabajadores
+        self.max_en_cola = max_en_cola
+        self.max_terminados = max_terminados
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._trabajos: 'OrderedDict[str, TrabajoMonteCarlo]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _obtener_executor(self) -> ThreadPoolExecutor:
+        # Llamar con el lock tomado
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.num_trabajadores, thread_name_prefix="trabajo-mc")
+        return self._executor
+
+    def enviar(
+        self,
+        ejecutar: Callable[[Callable[..., None], TokenCancelacion], ResultadoMonteCarloComplete],
+        num_simulaciones: int
+    ) -> TrabajoMonteCarlo:
+        """
+        Encola una corrida
+
+        Args:
+            ejecutar: Corre la simulación; recibe el callback de progreso del trabajo
+                (simulator.CallbackProgreso) y su token de cancelación
+            num_simulaciones: Trayectorias de la corrida (para reportar el progreso)
+
+        Returns:
+            El trabajo creado (en cola)
+
+        Raises:
+            ColaLlena: Si ya hay max_en_cola trabajos esperando
+        """
+        trabajo = TrabajoMonteCarlo(num_simulaciones)
+        with self._lock:
+            en_cola = sum(1 for t in self._trabajos.values() if t.estado == 'en_cola')
+            if en_cola >= self.max_en_cola:
+                raise ColaLlena(f"Hay {en_cola} trabajos en cola; intente más tarde")
+            self._trabajos[trabajo.id_trabajo] = trabajo
+            self._obtener_executor().submit(self._ejecutar, trabajo, ejecutar)
+        return trabajo
+
+    def _ejecutar(self, trabajo: TrabajoMonteCarlo, ejecutar) -> None:
+        with self._lock:
+            if trabajo.cancelacion.cancelado:
+                return
+            trabajo.estado = 'ejecutando'
+            trabajo.iniciado = time.time()
+        try:
+            resultado = ejecutar(trabajo.progreso, trabajo.cancelacion)
+        except CorridaCancelada:
+            estado, resultado, error = 'cancelado', None, None
+        except Exception as e:
+            estado, resultado, error = 'fallido', None, str(e)
+        else:
+            estado, error = 'completado', None
+            trabajo.trayectorias_procesadas = resultado.num_simulaciones
+        with self._lock:
+            trabajo.estado = estado
+            trabajo.resultado = resultado
+            trabajo.error = error
+            trabajo.terminado = time.time()
+            self._descartar_terminados()
+
+    def _descartar_terminados(self) -> None:
+        # Llamar con el lock tomado: conserva solo los max_terminados más recientes
+        terminados = [t.id_trabajo for t in self._trabajos.values() if t.estado in ESTADOS_TERMINALES]
+        for id_trabajo in terminados[:max(len(terminados) - self.max_terminados, 0)]:
+            del self._trabajos[id_trabajo]
+
+    def obtener(self, id_trabajo: str) -> Optional[TrabajoMonteCarlo]:
+        with self._lock:
+            return self._trabajos.get(id_trabajo)
+
+    def listar(self) -> List[TrabajoMonteCarlo]:
+        with self._lock:
+            return list(self._trabajos.values())
+
+    def cancelar(self, id_trabajo: str) -> Optional[TrabajoMonteCarlo]:
+        """
+        Cancela un trabajo: en cola se descarta de inmediato; en ejecución se detiene
+        en el siguiente bloque. Un trabajo terminado no cambia.
+
+        Returns:
+            El trabajo, o None si no existe
+        """
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is None or trabajo.estado in ESTADOS_TERMINALES:
+                return trabajo
+            trabajo.cancelacion.cancelar("cancelado por el cliente")
+            if trabajo.estado == 'en_cola':
+                # _ejecutar verá la cancelación y no correrá la simulación
+                trabajo.estado = 'cancelado'
+                trabajo.terminado = time.time()
+                self._descartar_terminados()
+        return trabajo
+
+    def estadisticas(self):
+        with self._lock:
+            estados = [t.estado for t in self._trabajos.values()]
+        return {
+            'en_cola': estados.count('en_cola'),
+            'ejecutando': estados.count('ejecutando'),
+            'terminados': sum(1 for e in estados if e in ESTADOS_TERMINALES),
+            'trabajadores': self.num_trabajadores,
+            'max_en_cola': self.max_en_cola,
+        }
+
+    def cerrar(self) -> None:
+        """
+        Cancela los trabajos pendientes y espera a que terminen los que están en ejecución
+        """
+        with self._lock:
+            for trabajo in self._trabajos.values():
+                if trabajo.estado not in ESTADOS_TERMINALES:
+                    trabajo.cancelacion.cancelar("servidor detenido")
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+gestor_trabajos = GestorTrabajos()
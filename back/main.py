@@ -1,13 +1,61 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import io
+import json
+from contextlib import asynccontextmanager
+from typing import Awaitable, List, Literal, Optional, Sequence, TypeVar
+import numpy as np
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from schemas import ParametrosSimulacion, ResultadoSimulacion, ResultadoMonteCarloComplete
-from simulator import SimuladorFiscalBolivia
+from fastapi.responses import StreamingResponse
+from schemas import ParametrosSimulacion, ResultadoSimulacion, ResultadoMonteCarloComplete, ResultadoAnalitico, SolicitudMonteCarloAdaptativo, EstadoTrabajo, ProgresoMonteCarlo, ResumenTrayectorias, CuantilesTrayectorias
+from simulator import SimuladorFiscalBolivia, VARIABLES_MONTE_CARLO, validar_corrida_extensible, estadisticas_parciales, variables_reportadas
+from runs import obtener_corrida
+from result_cache import cache_resultados, clave_resultado
+from single_flight import peticiones_en_curso
+from jobs import gestor_trabajos, ColaLlena
+from cancellation import CorridaCancelada, TokenCancelacion, sesiones_activas
+from adaptive import TAMANO_LOTE_ADAPTATIVO
+from parallel import cerrar_executor, validar_num_procesos
+from distributions import NUM_BINS_HISTOGRAMA, MAX_BINS_HISTOGRAMA
+from binary_formats import TIPO_ARROW, TIPO_NPZ, arrow_disponible
+from serialization import a_json, comprimir, paquetes_faltantes, MIN_BYTES_COMPRESION
+from tail_risk import reglas_riesgo
+from path_store import almacen_trayectorias
+from columnar import CAMPOS_RESULTADO_ANUAL
 import uvicorn
 
+# Límites de num_simulaciones: en modo exacto todas las trayectorias quedan en memoria;
+# en modo streaming la memoria es constante y el límite lo pone el tiempo de cómputo
+MAX_SIMULACIONES = 10000
+MAX_SIMULACIONES_STREAMING = 5_000_000
+
+T = TypeVar('T')
+
+# Trayectorias mínimas entre eventos de progreso del endpoint con streaming de progreso
+MIN_TRAYECTORIAS_POR_EVENTO = 256
+
+# Formato de las distribuciones en ResultadoMonteCarloAnual (ver distributions)
+FormatoDistribuciones = Literal['histograma', 'cuantiles', 'histograma_cuantiles', 'muestras']
+
+# Formato de respuesta de /api/simular-monte-carlo -> tipo de contenido
+TIPOS_RESPUESTA = {'json': "application/json", 'npz': TIPO_NPZ, 'arrow': TIPO_ARROW}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Una sola vez al iniciar: avisar si la serialización usa los caminos lentos
+    for aviso in paquetes_faltantes():
+        print(f"Aviso: {aviso}")
+    yield
+    # Cancelar los trabajos pendientes y liberar el pool de procesos de Monte Carlo paralelo
+    gestor_trabajos.cerrar()
+    cerrar_executor()
+
 app = FastAPI(
     title="Simulador Fiscal Boliviano API",
     description="Backend de simulación fiscal con Python para cálculos precisos y eficientes",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configurar CORS para permitir peticiones desde Next.js
@@ -19,6 +67,161 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def respuesta_json(
+    contenido: bytes,
+    estado_cache: Optional[str] = None,
+    media_type: str = "application/json",
+    accept_encoding: Optional[str] = None
+) -> Response:
+    """
+    Respuesta ya serializada (JSON, o .npz/Arrow), sin que FastAPI la valide de nuevo
+    
+    El JSON se comprime si el cliente lo acepta (ver serialization.comprimir);
+    X-Cache indica HIT, MISS, COALESCED o BYPASS.
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    if estado_cache is not None:
+        headers["X-Cache"] = estado_cache
+    if media_type == "application/json":
+        contenido, codificacion = comprimir(contenido, accept_encoding)
+        if codificacion is not None:
+            headers["Content-Encoding"] = codificacion
+    return Response(content=contenido, media_type=media_type, headers=headers)
+
+async def responder(
+    request: Request,
+    contenido: bytes,
+    estado_cache: Optional[str] = None,
+    media_type: str = "application/json"
+) -> Response:
+    """
+    respuesta_json desde un endpoint async: una respuesta grande se comprime fuera del event loop
+    """
+    accept_encoding = request.headers.get("accept-encoding")
+    if len(contenido) < MIN_BYTES_COMPRESION:
+        return respuesta_json(contenido, estado_cache, media_type, accept_encoding)
+    return await run_in_threadpool(respuesta_json, contenido, estado_cache, media_type, accept_encoding)
+
+def negociar_formato(formato: Optional[str], accept: Optional[str]) -> str:
+    """
+    Formato de respuesta: el parámetro `formato` o, si no viene, el encabezado Accept
+    
+    Raises:
+        HTTPException: 406 si se pide Arrow y pyarrow no está instalado
+    """
+    if formato is None:
+        aceptados = [tipo.split(';')[0].strip() for tipo in (accept or '').split(',')]
+        formato = next(
+            (nombre for nombre, tipo in TIPOS_RESPUESTA.items() if nombre != 'json' and tipo in aceptados), 'json'
+        )
+    if formato == 'arrow' and not arrow_disponible():
+        raise HTTPException(status_code=406, detail="El formato Arrow requiere pyarrow; use formato=npz o JSON")
+    return formato
+
+def validar_num_bins(num_bins: int) -> None:
+    if not 1 <= num_bins <= MAX_BINS_HISTOGRAMA:
+        raise HTTPException(status_code=400, detail=f"num_bins debe estar entre 1 y {MAX_BINS_HISTOGRAMA}")
+
+def validar_procesos(num_procesos: Optional[int]) -> None:
+    try:
+        validar_num_procesos(num_procesos)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def validar_umbrales(umbrales: Sequence[str]) -> None:
+    try:
+        reglas_riesgo(umbrales, VARIABLES_MONTE_CARLO)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def validar_trayectorias(guardar_trayectorias: bool, num_simulaciones: int, anos: int) -> None:
+    if not guardar_trayectorias:
+        return
+    try:
+        almacen_trayectorias.validar_tamano(len(CAMPOS_RESULTADO_ANUAL), anos, num_simulaciones)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def validar_monte_carlo(
+    num_simulaciones: int,
+    semilla: Optional[int],
+    num_procesos: Optional[int],
+    metodo: str,
+    reduccion_varianza: str,
+    modo_estadisticas: str,
+    guardar: bool,
+    num_bins: int = NUM_BINS_HISTOGRAMA,
+    umbrales: Sequence[str] = (),
+    variables: Sequence[str] = (),
+    analitico: bool = False
+) -> None:
+    """
+    Valida las opciones de una corrida Monte Carlo (petición directa o trabajo)
+    
+    Raises:
+        HTTPException: 400 si alguna opción no es válida
+    """
+    # Validar número de simulaciones
+    if num_simulaciones < 100:
+        raise HTTPException(status_code=400, detail="El número mínimo de simulaciones es 100")
+    maximo = MAX_SIMULACIONES_STREAMING if modo_estadisticas == 'streaming' else MAX_SIMULACIONES
+    if num_simulaciones > maximo:
+        raise HTTPException(status_code=400, detail=f"El número máximo de simulaciones es {maximo}")
+    if modo_estadisticas == 'streaming' and metodo == 'lhs':
+        raise HTTPException(status_code=400, detail="El muestreo lhs no está disponible en modo streaming")
+    if modo_estadisticas == 'streaming' and reduccion_varianza == 'variables_control':
+        raise HTTPException(status_code=400, detail="Las variables de control no están disponibles en modo streaming")
+    if semilla is not None and semilla < 0:
+        raise HTTPException(status_code=400, detail="La semilla no puede ser negativa")
+    validar_procesos(num_procesos)
+    validar_num_bins(num_bins)
+    validar_umbrales(umbrales)
+    try:
+        variables_reportadas(variables, analitico)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if guardar:
+        try:
+            validar_corrida_extensible(metodo, reduccion_varianza, num_simulaciones)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+async def esperar_desconexion(request: Request) -> None:
+    # Con el cuerpo ya leído, receive() solo vuelve cuando el cliente se desconecta
+    # (o cuando la respuesta ya se envió)
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+async def esperar_cliente(request: Request, token: TokenCancelacion, calculo: Awaitable[T]) -> T:
+    """
+    Espera el cálculo mientras el cliente siga conectado y la petición siga vigente
+    
+    Si el cliente se desconecta se cancela el token; si el token se cancela por otra
+    razón (la sesión envió una petición más reciente) se deja de esperar. En ambos
+    casos el cálculo se interrumpe en su siguiente bloque.
+    
+    Raises:
+        CorridaCancelada: Si se dejó de esperar el cálculo
+    """
+    loop = asyncio.get_running_loop()
+    tarea = asyncio.ensure_future(calculo)
+    desconexion = asyncio.ensure_future(esperar_desconexion(request))
+    cancelada = loop.create_future()
+    token.al_cancelar(lambda: loop.call_soon_threadsafe(
+        lambda: cancelada.done() or cancelada.set_result(None)
+    ))
+    try:
+        await asyncio.wait({tarea, desconexion, cancelada}, return_when=asyncio.FIRST_COMPLETED)
+        if tarea.done():
+            return tarea.result()
+        if desconexion.done():
+            token.cancelar("cliente desconectado")
+        tarea.cancel()
+        raise CorridaCancelada(token.motivo)
+    finally:
+        desconexion.cancel()
+        cancelada.cancel()
+
 @app.get("/")
 def read_root():
     return {
@@ -32,60 +235,615 @@ def health_check():
     return {"status": "healthy"}
 
 @app.post("/api/simular", response_model=ResultadoSimulacion)
-async def simular(parametros: ParametrosSimulacion):
+async def simular(
+    parametros: ParametrosSimulacion,
+    request: Request,
+    semilla: Optional[int] = None,
+    trayectoria: int = 0,
+    usar_cache: bool = True
+):
     """
     Ejecuta una simulación fiscal completa con los parámetros proporcionados
     
     Args:
         parametros: Objeto ParametrosSimulacion con todos los parámetros de entrada
+        semilla: Semilla para reproducir la simulación (opcional)
+        trayectoria: Índice de la trayectoria a reproducir de una corrida Monte Carlo con la misma semilla
+        usar_cache: Con semilla fija, reutilizar la respuesta de una petición idéntica (ver result_cache)
         
     Returns:
         ResultadoSimulacion: Resultados año por año y pasos de simulación
     """
     try:
+        if semilla is not None and semilla < 0:
+            raise HTTPException(status_code=400, detail="La semilla no puede ser negativa")
+        if trayectoria < 0:
+            raise HTTPException(status_code=400, detail="El índice de trayectoria no puede ser negativo")
+        
+        # Sin semilla el resultado es distinto en cada petición: no hay nada que reutilizar
+        clave = None
+        if semilla is not None and usar_cache:
+            clave = clave_resultado('simular', parametros, semilla, trayectoria=trayectoria)
+            contenido = cache_resultados.obtener(clave)
+            if contenido is not None:
+                return await responder(request, contenido, "HIT")
+        
         # Crear simulador con los parámetros
-        simulador = SimuladorFiscalBolivia(parametros)
+        simulador = SimuladorFiscalBolivia(parametros, semilla)
         
-        # Ejecutar simulación
-        resultado = simulador.simular(parametros.anos)
+        # Ejecutar simulación fuera del event loop
+        resultado = await run_in_threadpool(simulador.simular, parametros.anos, trayectoria)
         
-        return resultado
+        contenido = a_json(resultado)
+        if clave is None:
+            return await responder(request, contenido, "BYPASS")
+        cache_resultados.guardar(clave, contenido)
+        return await responder(request, contenido, "MISS")
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en la simulación: {str(e)}")
 
 @app.post("/api/simular-monte-carlo")
-async def simular_monte_carlo(parametros: ParametrosSimulacion, num_simulaciones: int = 1000):
+async def simular_monte_carlo(
+    parametros: ParametrosSimulacion,
+    request: Request,
+    num_simulaciones: int = 1000,
+    semilla: Optional[int] = None,
+    paralelo: bool = False,
+    num_procesos: Optional[int] = None,
+    metodo: Literal['pseudo', 'sobol', 'lhs'] = 'pseudo',
+    reduccion_varianza: Literal['ninguna', 'antiteticas', 'variables_control'] = 'ninguna',
+    analitico: bool = False,
+    modo_estadisticas: Literal['exacto', 'streaming'] = 'exacto',
+    guardar: bool = False,
+    usar_cache: bool = True,
+    distribuciones: FormatoDistribuciones = 'histograma',
+    num_bins: int = NUM_BINS_HISTOGRAMA,
+    formato: Optional[Literal['json', 'npz', 'arrow']] = None,
+    umbrales: List[str] = Query(default=[]),
+    guardar_trayectorias: bool = False,
+    variables: List[str] = Query(default=[]),
+    sesion: Optional[str] = Header(default=None, alias="X-Sesion"),
+    accept: Optional[str] = Header(default=None)
+):
     """
     Ejecuta simulación Monte Carlo con múltiples iteraciones para obtener distribuciones de probabilidad
     
     Args:
         parametros: Objeto ParametrosSimulacion con todos los parámetros de entrada
         num_simulaciones: Número de simulaciones a ejecutar (default: 1000)
+        semilla: Semilla raíz; cada grupo de trayectorias usa un subflujo independiente derivado de ella
+        paralelo: Ejecutar las trayectorias en el pool de procesos
+        num_procesos: Procesos entre los que se reparten las trayectorias (default: núcleos)
+        metodo: Muestreo de las normales: pseudo-aleatorio, Sobol aleatorizado o hipercubo latino
+        reduccion_varianza: Variables antitéticas o de control (opcional); el resultado reporta el factor logrado
+        analitico: Estadísticas exactas (forma cerrada) para los componentes lineales en Z (impuestos,
+            gasto corriente, subsidio de alimentos, tipo de cambio); solo las variables no lineales se
+            muestrean y, si todas las pedidas son lineales, no se simula ninguna trayectoria
+        modo_estadisticas: 'exacto' (trayectorias en memoria, hasta MAX_SIMULACIONES) o 'streaming'
+            (bloques con acumuladores en línea y memoria constante, hasta MAX_SIMULACIONES_STREAMING)
+        guardar: Guardar la corrida para extenderla después; el id queda en `id_corrida`
+        usar_cache: Con semilla fija, reutilizar la respuesta de una petición idéntica (ver result_cache);
+            las corridas guardadas no se toman del cache porque cada una recibe su propio id
+        distribuciones: 'histograma' (fracción de trayectorias por intervalo, bordes comunes a todos
+            los años), 'cuantiles' (grilla 0, 0.01, ..., 1), 'histograma_cuantiles' o 'muestras'
+            (las trayectorias completas en distribucion_*)
+        num_bins: Intervalos de los histogramas
+        formato: 'json', 'npz' o 'arrow' (ver binary_formats); si no se indica se negocia con
+            Accept (application/x-npz o application/vnd.apache.arrow.stream) y por defecto es JSON
+        umbrales: Umbrales de riesgo además de las alertas del modelo (repetible), p. ej.
+            umbrales=deuda_pib_ratio>60; las probabilidades de violación y el VaR/CVaR van en `riesgo`
+        guardar_trayectorias: Guardar todos los campos de todas las trayectorias en disco (ver
+            path_store); el id queda en `id_trayectorias` y se consulta en /api/trayectorias/{id}
+        variables: Variables a reportar (repetible; por defecto, todas); las demás quedan en null
+        sesion: Encabezado X-Sesion; una petición nueva de la misma sesión cancela la anterior
+            (409). La corrida también se cancela si el cliente se desconecta.
         
     Returns:
-        ResultadoMonteCarloComplete: Estadísticas y distribuciones de resultados
+        ResultadoMonteCarloComplete: Estadísticas y distribuciones de resultados (en JSON), o
+        las mismas estadísticas y distribuciones en columnas (.npz o Arrow IPC stream)
     """
     try:
-        # Validar número de simulaciones
-        if num_simulaciones < 100:
-            raise HTTPException(status_code=400, detail="El número mínimo de simulaciones es 100")
-        if num_simulaciones > 10000:
-            raise HTTPException(status_code=400, detail="El número máximo de simulaciones es 10000")
+        validar_monte_carlo(
+            num_simulaciones, semilla, num_procesos, metodo, reduccion_varianza, modo_estadisticas, guardar,
+            num_bins, umbrales, variables, analitico
+        )
+        validar_trayectorias(guardar_trayectorias, num_simulaciones, parametros.anos)
+        formato = negociar_formato(formato, accept)
+        media_type = TIPOS_RESPUESTA[formato]
         
-        # Crear simulador con los parámetros
-        simulador = SimuladorFiscalBolivia(parametros)
+        # Peticiones con semilla son deterministas: se reutilizan del cache y se coalescen
+        # mientras están en curso. paralelo y num_procesos no cambian el resultado (ni `metodo`,
+        # que no los menciona). Las corridas y trayectorias guardadas reciben cada una su id.
+        clave = None
+        if semilla is not None and not guardar and not guardar_trayectorias:
+            clave = clave_resultado(
+                'simular-monte-carlo', parametros, semilla, num_simulaciones=num_simulaciones, metodo=metodo,
+                reduccion_varianza=reduccion_varianza, analitico=analitico, modo_estadisticas=modo_estadisticas,
+                distribuciones=distribuciones, num_bins=num_bins, formato=formato, umbrales=umbrales,
+                variables=variables
+            )
+            if usar_cache:
+                contenido = cache_resultados.obtener(clave)
+                if contenido is not None:
+                    return await responder(request, contenido, "HIT", media_type)
         
-        # Ejecutar simulación Monte Carlo
-        resultado = simulador.simular_monte_carlo(parametros.anos, num_simulaciones)
+        async def calcular(cancelacion: TokenCancelacion) -> bytes:
+            # Crear simulador con los parámetros
+            simulador = SimuladorFiscalBolivia(parametros, semilla)
+            
+            # Ejecutar simulación Monte Carlo fuera del event loop
+            resultado = await run_in_threadpool(
+                simulador.simular_monte_carlo, parametros.anos, num_simulaciones, paralelo, num_procesos, metodo,
+                reduccion_varianza, analitico, modo_estadisticas, guardar, cancelacion=cancelacion,
+                distribuciones=distribuciones, num_bins=num_bins, columnar=formato != 'json', umbrales=umbrales,
+                guardar_trayectorias=guardar_trayectorias, variables=variables
+            )
+            
+            if formato == 'npz':
+                contenido = await run_in_threadpool(resultado.a_npz)
+            elif formato == 'arrow':
+                contenido = await run_in_threadpool(resultado.a_arrow)
+            else:
+                contenido = await run_in_threadpool(a_json, resultado)
+            if clave is not None and usar_cache:
+                cache_resultados.guardar(clave, contenido)
+            return contenido
         
-        return resultado
+        # Token de esta petición: se cancela si el cliente se desconecta o la sesión envía otra.
+        # Una corrida compartida tiene su propio token y solo se cancela cuando nadie la espera.
+        token = TokenCancelacion()
+        if sesion:
+            sesiones_activas.registrar(sesion, token)
+        try:
+            if clave is None:
+                contenido = await esperar_cliente(request, token, calcular(token))
+                return await responder(request, contenido, "BYPASS", media_type)
+            contenido, compartido = await esperar_cliente(
+                request, token, peticiones_en_curso.ejecutar(clave, calcular)
+            )
+        finally:
+            if sesion:
+                sesiones_activas.liberar(sesion, token)
+        if compartido:
+            return await responder(request, contenido, "COALESCED", media_type)
+        return await responder(request, contenido, "MISS" if usar_cache else "BYPASS", media_type)
     
     except HTTPException:
         raise
+    except CorridaCancelada as e:
+        print(f"Simulación Monte Carlo cancelada: {e}")
+        raise HTTPException(status_code=409, detail=f"Simulación Monte Carlo cancelada: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en la simulación Monte Carlo: {str(e)}")
 
+def formatear_evento(tipo: str, datos: str, formato: str) -> str:
+    """
+    Un evento de progreso como línea NDJSON ({"tipo": ..., "datos": ...}) o evento SSE
+    """
+    if formato == 'sse':
+        return f"event: {tipo}\ndata: {datos}\n\n"
+    return f'{{"tipo": {json.dumps(tipo)}, "datos": {datos}}}\n'
+
+@app.post("/api/simular-monte-carlo/stream")
+async def simular_monte_carlo_stream(
+    parametros: ParametrosSimulacion,
+    num_simulaciones: int = 10000,
+    semilla: Optional[int] = None,
+    paralelo: bool = False,
+    num_procesos: Optional[int] = None,
+    metodo: Literal['pseudo', 'sobol'] = 'pseudo',
+    reduccion_varianza: Literal['ninguna', 'antiteticas'] = 'ninguna',
+    analitico: bool = False,
+    trayectorias_por_evento: int = 2048,
+    formato: Literal['ndjson', 'sse'] = 'ndjson',
+    distribuciones: FormatoDistribuciones = 'histograma',
+    num_bins: int = NUM_BINS_HISTOGRAMA,
+    umbrales: List[str] = Query(default=[]),
+    guardar_trayectorias: bool = False,
+    variables: List[str] = Query(default=[]),
+    sesion: Optional[str] = Header(default=None, alias="X-Sesion")
+):
+    """
+    Monte Carlo en modo streaming que envía el avance mientras corre
+    
+    Cada `trayectorias_por_evento` trayectorias se envía un evento `progreso`
+    (ProgresoMonteCarlo: trayectorias procesadas y estadísticas parciales por año, a
+    partir de los acumuladores en línea) y al final un evento `resultado` con el
+    ResultadoMonteCarloComplete (o `error`). Las bandas parciales convergen a las finales,
+    así que el cliente puede dibujarlas desde el primer bloque.
+    
+    Args:
+        trayectorias_por_evento: Trayectorias entre eventos (tamaño de bloque; se redondea a par)
+        formato: 'ndjson' (una línea JSON por evento: {"tipo", "datos"}) o 'sse' (text/event-stream)
+        sesion: Encabezado X-Sesion; una petición nueva de la misma sesión cancela esta
+            (evento `error`). Si el cliente cierra la conexión la corrida también se cancela.
+        (el resto como en /api/simular-monte-carlo con modo_estadisticas=streaming)
+    """
+    validar_monte_carlo(
+        num_simulaciones, semilla, num_procesos, metodo, reduccion_varianza, 'streaming', False, num_bins, umbrales,
+        variables, analitico
+    )
+    validar_trayectorias(guardar_trayectorias, num_simulaciones, parametros.anos)
+    if trayectorias_por_evento < MIN_TRAYECTORIAS_POR_EVENTO:
+        raise HTTPException(
+            status_code=400,
+            detail=f"trayectorias_por_evento debe ser al menos {MIN_TRAYECTORIAS_POR_EVENTO}"
+        )
+    # Bloques pares: no se parten pares antitéticos
+    tamano_bloque = trayectorias_por_evento + trayectorias_por_evento % 2
+    
+    simulador = SimuladorFiscalBolivia(parametros, semilla)
+    loop = asyncio.get_running_loop()
+    eventos: asyncio.Queue = asyncio.Queue()
+    token = TokenCancelacion()
+    if sesion:
+        sesiones_activas.registrar(sesion, token)
+    
+    def progreso(procesadas: int, estado) -> None:
+        # Se ejecuta en el hilo de la simulación: el evento se serializa aquí y se entrega al loop
+        evento = ProgresoMonteCarlo(
+            trayectorias_procesadas=procesadas,
+            num_simulaciones=num_simulaciones,
+            progreso=procesadas / num_simulaciones,
+            resultados_parciales=estadisticas_parciales(estado)
+        )
+        loop.call_soon_threadsafe(eventos.put_nowait, ('progreso', evento.model_dump_json()))
+    
+    def ejecutar() -> str:
+        resultado = simulador.simular_monte_carlo(
+            parametros.anos, num_simulaciones, paralelo, num_procesos, metodo, reduccion_varianza,
+            analitico, 'streaming', progreso=progreso, tamano_bloque=tamano_bloque, cancelacion=token,
+            distribuciones=distribuciones, num_bins=num_bins, umbrales=umbrales,
+            guardar_trayectorias=guardar_trayectorias, variables=variables
+        )
+        return a_json(resultado).decode()
+    
+    async def correr() -> None:
+        try:
+            eventos.put_nowait(('resultado', await run_in_threadpool(ejecutar)))
+        except CorridaCancelada as e:
+            eventos.put_nowait(('error', json.dumps({'detalle': f"Simulación Monte Carlo cancelada: {e}"})))
+        except Exception as e:
+            eventos.put_nowait(('error', json.dumps({'detalle': f"Error en la simulación Monte Carlo: {str(e)}"})))
+        eventos.put_nowait(None)
+    
+    async def emitir():
+        tarea = asyncio.ensure_future(correr())
+        try:
+            while (evento := await eventos.get()) is not None:
+                yield formatear_evento(*evento, formato)
+            await tarea
+        finally:
+            # Si el cliente cerró la conexión antes del final, detener la corrida
+            if not tarea.done():
+                token.cancelar("cliente desconectado")
+            if sesion:
+                sesiones_activas.liberar(sesion, token)
+    
+    return StreamingResponse(
+        emitir(),
+        media_type="text/event-stream" if formato == 'sse' else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/trabajos/monte-carlo", response_model=EstadoTrabajo, status_code=202)
+async def crear_trabajo_monte_carlo(
+    parametros: ParametrosSimulacion,
+    num_simulaciones: int = 1000,
+    semilla: Optional[int] = None,
+    paralelo: bool = False,
+    num_procesos: Optional[int] = None,
+    metodo: Literal['pseudo', 'sobol', 'lhs'] = 'pseudo',
+    reduccion_varianza: Literal['ninguna', 'antiteticas', 'variables_control'] = 'ninguna',
+    analitico: bool = False,
+    modo_estadisticas: Literal['exacto', 'streaming'] = 'exacto',
+    guardar: bool = False,
+    distribuciones: FormatoDistribuciones = 'histograma',
+    num_bins: int = NUM_BINS_HISTOGRAMA,
+    umbrales: List[str] = Query(default=[]),
+    guardar_trayectorias: bool = False,
+    variables: List[str] = Query(default=[])
+):
+    """
+    Encola una simulación Monte Carlo y devuelve el trabajo de inmediato (ver jobs)
+    
+    Acepta las mismas opciones que /api/simular-monte-carlo. El estado, el progreso y el
+    resultado se consultan en GET /api/trabajos/{id_trabajo}.
+    
+    Returns:
+        EstadoTrabajo: Trabajo en cola (429 si la cola está llena)
+    """
+    validar_monte_carlo(
+        num_simulaciones, semilla, num_procesos, metodo, reduccion_varianza, modo_estadisticas, guardar,
+        num_bins, umbrales, variables, analitico
+    )
+    validar_trayectorias(guardar_trayectorias, num_simulaciones, parametros.anos)
+    simulador = SimuladorFiscalBolivia(parametros, semilla)
+    
+    def ejecutar(progreso, cancelacion) -> ResultadoMonteCarloComplete:
+        return simulador.simular_monte_carlo(
+            parametros.anos, num_simulaciones, paralelo, num_procesos, metodo, reduccion_varianza,
+            analitico, modo_estadisticas, guardar, progreso, cancelacion=cancelacion,
+            distribuciones=distribuciones, num_bins=num_bins, umbrales=umbrales,
+            guardar_trayectorias=guardar_trayectorias, variables=variables
+        )
+    
+    try:
+        trabajo = gestor_trabajos.enviar(ejecutar, num_simulaciones)
+    except ColaLlena as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return trabajo.resumen(incluir_resultado=False)
+
+@app.get("/api/trabajos")
+def listar_trabajos():
+    """
+    Trabajos conocidos (sin resultados) y ocupación del pool
+    """
+    return {
+        **gestor_trabajos.estadisticas(),
+        'trabajos': [trabajo.resumen(incluir_resultado=False) for trabajo in gestor_trabajos.listar()],
+    }
+
+@app.get("/api/trabajos/{id_trabajo}", response_model=EstadoTrabajo)
+def consultar_trabajo(id_trabajo: str, request: Request, incluir_resultado: bool = True):
+    """
+    Estado, progreso y (si terminó) resultado de un trabajo
+    
+    Args:
+        id_trabajo: Id devuelto al crear el trabajo
+        incluir_resultado: Incluir el ResultadoMonteCarloComplete cuando el trabajo está completado
+    """
+    trabajo = gestor_trabajos.obtener(id_trabajo)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo no encontrado: {id_trabajo}")
+    # Serializar directamente: el resultado ya es un modelo validado
+    return respuesta_json(
+        a_json(trabajo.resumen(incluir_resultado)), accept_encoding=request.headers.get("accept-encoding")
+    )
+
+@app.delete("/api/trabajos/{id_trabajo}", response_model=EstadoTrabajo)
+def cancelar_trabajo(id_trabajo: str):
+    """
+    Cancela un trabajo: si está en cola no se ejecuta; si está en ejecución se detiene
+    en el siguiente bloque de trayectorias
+    """
+    trabajo = gestor_trabajos.cancelar(id_trabajo)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo no encontrado: {id_trabajo}")
+    return trabajo.resumen(incluir_resultado=False)
+
+@app.post("/api/simular-monte-carlo/{id_corrida}/extender")
+async def extender_monte_carlo(
+    id_corrida: str,
+    request: Request,
+    num_simulaciones: int = 1000,
+    paralelo: bool = False,
+    num_procesos: Optional[int] = None,
+    distribuciones: FormatoDistribuciones = 'histograma',
+    num_bins: int = NUM_BINS_HISTOGRAMA
+):
+    """
+    Agrega trayectorias a una corrida guardada (simular-monte-carlo con guardar=true)
+    
+    Solo se simulan las trayectorias nuevas, que continúan la secuencia de la
+    semilla; las estadísticas combinan las anteriores con las nuevas en línea.
+    
+    Args:
+        id_corrida: Id devuelto en `id_corrida`
+        num_simulaciones: Trayectorias a agregar
+        paralelo: Ejecutar los bloques nuevos en el pool de procesos
+        num_procesos: Procesos del pool a usar (default: núcleos)
+        distribuciones, num_bins: Formato de las distribuciones (como en /api/simular-monte-carlo)
+        
+    Returns:
+        ResultadoMonteCarloComplete: Estadísticas de la corrida completa (num_simulaciones = total)
+    """
+    try:
+        corrida = obtener_corrida(id_corrida)
+        if corrida is None:
+            raise HTTPException(status_code=404, detail=f"Corrida no encontrada: {id_corrida}")
+        if num_simulaciones < 1:
+            raise HTTPException(status_code=400, detail="El número de simulaciones a agregar debe ser al menos 1")
+        if corrida.estado.num_trayectorias + num_simulaciones > MAX_SIMULACIONES_STREAMING:
+            raise HTTPException(
+                status_code=400,
+                detail=f"El número máximo de simulaciones es {MAX_SIMULACIONES_STREAMING}"
+            )
+        validar_procesos(num_procesos)
+        validar_num_bins(num_bins)
+        try:
+            validar_corrida_extensible(corrida.metodo_muestreo, corrida.reduccion_varianza, num_simulaciones)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        simulador = SimuladorFiscalBolivia(corrida.parametros, corrida.semilla)
+        resultado = await run_in_threadpool(
+            simulador.extender_monte_carlo, corrida, num_simulaciones, paralelo, num_procesos,
+            distribuciones, num_bins
+        )
+        return await responder(request, await run_in_threadpool(a_json, resultado))
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al extender la corrida Monte Carlo: {str(e)}")
+
+@app.post("/api/simular-monte-carlo-adaptativo")
+async def simular_monte_carlo_adaptativo(
+    solicitud: SolicitudMonteCarloAdaptativo,
+    request: Request,
+    paralelo: bool = False,
+    num_procesos: Optional[int] = None,
+    distribuciones: FormatoDistribuciones = 'histograma',
+    num_bins: int = NUM_BINS_HISTOGRAMA,
+    sesion: Optional[str] = Header(default=None, alias="X-Sesion")
+):
+    """
+    Monte Carlo con parada temprana: agrega lotes de trayectorias hasta que los intervalos
+    de confianza de las métricas pedidas tienen el semiancho objetivo
+    
+    Args:
+        solicitud: Parámetros, tolerancias (variable, estadístico, año, semiancho),
+            presupuesto de trayectorias y nivel de confianza
+        paralelo: Ejecutar los lotes en el pool de procesos
+        num_procesos: Procesos a usar (default: núcleos)
+        distribuciones, num_bins: Formato de las distribuciones (como en /api/simular-monte-carlo)
+        sesion: Encabezado X-Sesion (como en /api/simular-monte-carlo)
+        
+    Returns:
+        ResultadoMonteCarloComplete: num_simulaciones es el número de trayectorias usadas;
+        `adaptativo` trae los intervalos alcanzados y si se cumplieron las tolerancias
+    """
+    try:
+        parametros = solicitud.parametros
+        if solicitud.max_simulaciones < TAMANO_LOTE_ADAPTATIVO:
+            raise HTTPException(status_code=400, detail=f"max_simulaciones debe ser al menos {TAMANO_LOTE_ADAPTATIVO}")
+        if solicitud.max_simulaciones > MAX_SIMULACIONES_STREAMING:
+            raise HTTPException(status_code=400, detail=f"El número máximo de simulaciones es {MAX_SIMULACIONES_STREAMING}")
+        if solicitud.semilla is not None and solicitud.semilla < 0:
+            raise HTTPException(status_code=400, detail="La semilla no puede ser negativa")
+        validar_procesos(num_procesos)
+        validar_num_bins(num_bins)
+        validar_umbrales(solicitud.umbrales)
+        for tolerancia in solicitud.tolerancias:
+            if tolerancia.variable not in VARIABLES_MONTE_CARLO:
+                raise HTTPException(status_code=400, detail=f"Variable sin seguimiento en Monte Carlo: {tolerancia.variable}")
+            if tolerancia.ano is not None and not 2020 <= tolerancia.ano < 2020 + parametros.anos:
+                raise HTTPException(status_code=400, detail=f"Año fuera de la simulación: {tolerancia.ano}")
+        
+        simulador = SimuladorFiscalBolivia(parametros, solicitud.semilla)
+        token = TokenCancelacion()
+        if sesion:
+            sesiones_activas.registrar(sesion, token)
+        try:
+            resultado = await esperar_cliente(request, token, run_in_threadpool(
+                simulador.simular_monte_carlo_adaptativo, parametros.anos, solicitud.tolerancias,
+                solicitud.max_simulaciones, solicitud.nivel_confianza, solicitud.reduccion_varianza,
+                paralelo, num_procesos, solicitud.analitico, token, distribuciones, num_bins, solicitud.umbrales
+            ))
+        finally:
+            if sesion:
+                sesiones_activas.liberar(sesion, token)
+        return await responder(request, await run_in_threadpool(a_json, resultado))
+    
+    except HTTPException:
+        raise
+    except CorridaCancelada as e:
+        print(f"Simulación Monte Carlo adaptativa cancelada: {e}")
+        raise HTTPException(status_code=409, detail=f"Simulación Monte Carlo adaptativa cancelada: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en la simulación Monte Carlo adaptativa: {str(e)}")
+
+@app.post("/api/estadisticas-analiticas", response_model=ResultadoAnalitico)
+def estadisticas_analiticas(parametros: ParametrosSimulacion, request: Request, num_simulaciones: int = 1000):
+    """
+    Estadísticas exactas de los componentes lineales (impuestos, gasto corriente,
+    subsidio de alimentos y tipo de cambio) sin ejecutar simulaciones
+    
+    Args:
+        parametros: Objeto ParametrosSimulacion con todos los parámetros de entrada
+        num_simulaciones: N de referencia para el mínimo y máximo esperados (default: 1000)
+        
+    Returns:
+        ResultadoAnalitico: Estadísticas por año y componente
+    """
+    if num_simulaciones < 1:
+        raise HTTPException(status_code=400, detail="num_simulaciones debe ser al menos 1")
+    try:
+        resultado = SimuladorFiscalBolivia(parametros).estadisticas_analiticas(parametros.anos, num_simulaciones)
+        return respuesta_json(a_json(resultado), accept_encoding=request.headers.get("accept-encoding"))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en el cálculo analítico: {str(e)}")
+
+@app.get("/api/trayectorias", response_model=List[ResumenTrayectorias])
+def listar_trayectorias():
+    """
+    Tensores de trayectorias guardados (aplica la retención antes de listar)
+    """
+    return almacen_trayectorias.listar()
+
+@app.get("/api/trayectorias/{id_trayectorias}", response_model=ResumenTrayectorias)
+def obtener_trayectorias(id_trayectorias: str):
+    """
+    Campos, dimensiones y expiración de un tensor de trayectorias guardado
+    """
+    tensor = almacen_trayectorias.abrir(id_trayectorias)
+    if tensor is None:
+        raise HTTPException(status_code=404, detail="Trayectorias no encontradas (o expiradas)")
+    return almacen_trayectorias.resumen(id_trayectorias)
+
+@app.get("/api/trayectorias/{id_trayectorias}/{campo}")
+def consultar_trayectorias(
+    id_trayectorias: str,
+    campo: str,
+    request: Request,
+    probabilidades: List[float] = Query(default=[0.05, 0.25, 0.5, 0.75, 0.95]),
+    formato: Literal['json', 'npz'] = 'json'
+):
+    """
+    Lee un campo de un tensor guardado sin volver a simular: solo se leen del disco
+    las columnas de ese campo
+    
+    Args:
+        campo: Cualquier campo numérico de ResultadoAnual
+        probabilidades: Cuantiles por año a calcular (en [0, 1])
+        formato: 'json' (cuantiles, promedio y desviación por año) o 'npz' (los valores
+            completos del campo en `valores`, forma (anos, trayectorias))
+        
+    Returns:
+        CuantilesTrayectorias, o el .npz con los valores
+    """
+    if not all(0 <= probabilidad <= 1 for probabilidad in probabilidades):
+        raise HTTPException(status_code=400, detail="Las probabilidades deben estar en [0, 1]")
+    tensor = almacen_trayectorias.abrir(id_trayectorias)
+    if tensor is None:
+        raise HTTPException(status_code=404, detail="Trayectorias no encontradas (o expiradas)")
+    if campo not in tensor.indices:
+        raise HTTPException(status_code=404, detail=f"Campo desconocido: {campo}")
+    valores = tensor.campo(campo)
+    if formato == 'npz':
+        buffer = io.BytesIO()
+        np.savez(buffer, valores=valores)
+        return Response(content=buffer.getvalue(), media_type=TIPO_NPZ)
+    ano_inicial = tensor.metadatos.get('ano_inicial', 2020)
+    resultado = CuantilesTrayectorias(
+        id_trayectorias=id_trayectorias,
+        campo=campo,
+        anos=list(range(ano_inicial, ano_inicial + valores.shape[0])),
+        probabilidades=probabilidades,
+        cuantiles=tensor.cuantiles(campo, probabilidades).tolist(),
+        promedio=valores.mean(axis=-1).tolist(),
+        desviacion_estandar=valores.std(axis=-1).tolist()
+    )
+    return respuesta_json(a_json(resultado), accept_encoding=request.headers.get("accept-encoding"))
+
+@app.delete("/api/trayectorias/{id_trayectorias}")
+def eliminar_trayectorias(id_trayectorias: str):
+    """
+    Elimina un tensor de trayectorias guardado
+    """
+    if not almacen_trayectorias.eliminar(id_trayectorias):
+        raise HTTPException(status_code=404, detail="Trayectorias no encontradas")
+    return {'id_trayectorias': id_trayectorias, 'eliminado': True}
+
+@app.get("/api/cache")
+def estadisticas_cache():
+    """
+    Aciertos, fallos y ocupación del cache de resultados, y peticiones coalescidas
+    """
+    return {**cache_resultados.estadisticas(), 'coalescencia': peticiones_en_curso.estadisticas()}
+
+@app.delete("/api/cache")
+def limpiar_cache(disco: bool = False):
+    """
+    Vacía el cache de resultados en memoria (y en disco con disco=true) y reinicia los contadores
+    """
+    cache_resultados.limpiar(disco)
+    return cache_resultados.estadisticas()
+
 @app.get("/api/parametros-default")
 def obtener_parametros_default():
     """Retorna los parámetros por defecto basados en PGE Bolivia 2020"""
@@ -0,0 +1,261 @@
+"""
+Ejecución paralela de Monte Carlo en un pool de procesos.
+
+Las trayectorias se reparten en bloques contiguos; cada bloque regenera las
+normales de sus trayectorias a partir de la semilla (subflujo por grupo de trayectorias
+o posición en la secuencia cuasi-aleatoria), así que unir los bloques en orden
+da exactamente el mismo resultado que la corrida en serie.
+
+Los procesos se crean con el método spawn: el servidor ya tiene hilos (trabajos,
+asyncio.to_thread) y un fork con hilos activos puede heredar locks tomados.
+"""
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from schemas import ParametrosSimulacion
+from stochastic import generar_normales_bloque, TRAYECTORIAS_POR_SUBFLUJO
+from vectorized_model import simular_lote_desde_normales, NUM_FACTORES
+from variance_reduction import calcular_controles
+
+# Tamaño del pool (por defecto, un proceso por núcleo)
+NUM_PROCESOS = int(os.environ.get("SIM_MC_PROCESOS", os.cpu_count() or 1))
+
+# Máximo de procesos que puede pedir una corrida
+MAX_PROCESOS = int(os.environ.get("SIM_MC_MAX_PROCESOS", max(NUM_PROCESOS, os.cpu_count() or 1)))
+
+# Pools de distinto tamaño que se mantienen vivos a la vez
+MAX_POOLS = 2
+
+# Bloques por proceso: más de uno para equilibrar la carga entre núcleos
+BLOQUES_POR_PROCESO = 2
+TAMANO_MINIMO_BLOQUE = 250
+
+# Tamaño -> pool, del menos al más recientemente usado
+_executors: 'OrderedDict[int, ProcessPoolExecutor]' = OrderedDict()
+# Corridas que usan cada pool (incluidos los ya desalojados de _executors)
+_usos: Dict[ProcessPoolExecutor, int] = {}
+_lock_executors = threading.Lock()
+
+
+def validar_num_procesos(num_procesos: Optional[int]) -> None:
+    """
+    Raises:
+        ValueError: Si num_procesos no está entre 1 y MAX_PROCESOS
+    """
+    if num_procesos is not None and not 1 <= num_procesos <= MAX_PROCESOS:
+        raise ValueError(f"El número de procesos debe estar entre 1 y {MAX_PROCESOS}")
+
+
+@contextmanager
+def usar_executor(num_procesos: Optional[int] = None) -> Iterator[ProcessPoolExecutor]:
+    """
+    Pool de procesos de ese tamaño, compartido por las corridas que lo piden (se crea al primer uso)
+
+    Se mantienen a lo sumo MAX_POOLS pools; al crear otro se desaloja el menos usado
+    recientemente, pero un pool solo se cierra cuando lo libera la última corrida que lo
+    usa, así que las corridas en curso (p. ej. en streaming, que envían bloques a medida
+    que avanzan) siguen enviando trabajo al mismo pool hasta terminar.
+
+    Args:
+        num_procesos: Procesos del pool (default: NUM_PROCESOS)
+    """
+    tamano = min(num_procesos or NUM_PROCESOS, MAX_PROCESOS)
+    sin_uso = []
+    with _lock_executors:
+        executor = _executors.get(tamano)
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=tamano, mp_context=multiprocessing.get_context("spawn"))
+            _executors[tamano] = executor
+            while len(_executors) > MAX_POOLS:
+                _, antiguo = _executors.popitem(last=False)
+                if not _usos.get(antiguo):
+                    sin_uso.append(antiguo)
+        _executors.move_to_end(tamano)
+        _usos[executor] = _usos.get(executor, 0) + 1
+    for antiguo in sin_uso:
+        antiguo.shutdown(wait=False)
+    try:
+        yield executor
+    finally:
+        with _lock_executors:
+            _usos[executor] -= 1
+            cerrar = not _usos[executor] and executor not in _executors.values()
+            if not _usos[executor]:
+                del _usos[executor]
+        if cerrar:
+            executor.shutdown(wait=False)
+
+
+def descartar_executor(executor: ProcessPoolExecutor) -> None:
+    """
+    Quita un pool roto (murió uno de sus procesos): el siguiente uso crea uno nuevo
+    """
+    with _lock_executors:
+        for tamano, actual in list(_executors.items()):
+            if actual is executor:
+                del _executors[tamano]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def cerrar_executor() -> None:
+    """
+    Cierra todos los pools, incluidos los desalojados que todavía se usan (al apagar el servidor)
+    """
+    with _lock_executors:
+        executors = set(_executors.values()) | set(_usos)
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(cancel_futures=True)
+
+
+def dividir_trayectorias(num_simulaciones: int, num_procesos: int) -> List[Tuple[int, int]]:
+    """
+    Divide [0, num_simulaciones) en bloques contiguos (inicio, cantidad)
+
+    Los límites internos son múltiplos de TRAYECTORIAS_POR_SUBFLUJO, así que ningún
+    bloque regenera normales de trayectorias de otro bloque.
+    """
+    num_bloques = max(1, min(num_procesos * BLOQUES_POR_PROCESO, num_simulaciones // TAMANO_MINIMO_BLOQUE))
+    limites = np.linspace(0, num_simulaciones, num_bloques + 1)
+    limites = np.round(limites / TRAYECTORIAS_POR_SUBFLUJO).astype(int) * TRAYECTORIAS_POR_SUBFLUJO
+    limites[-1] = num_simulaciones
+    limites = np.minimum(limites, num_simulaciones)
+    return [(int(inicio), int(fin - inicio)) for inicio, fin in zip(limites[:-1], limites[1:]) if fin > inicio]
+
+
+def simular_bloque(
+    parametros: ParametrosSimulacion,
+    anos: int,
+    semilla: int,
+    inicio: int,
+    cantidad: int,
+    variables: Sequence[str],
+    metodo_muestreo: str = 'pseudo',
+    total: Optional[int] = None,
+    antiteticas: bool = False,
+    incluir_controles: bool = False
+) -> Dict[str, np.ndarray]:
+    """
+    Simula las trayectorias [inicio, inicio + cantidad) y devuelve solo las variables pedidas
+    (y, si se piden, las variables de control bajo la clave 'controles')
+
+    Se ejecuta dentro de los procesos del pool.
+    """
+    Z = generar_normales_bloque(
+        metodo_muestreo, semilla, inicio, cantidad, total or inicio + cantidad, (anos, NUM_FACTORES),
+        antiteticas
+    )
+    resultado = simular_lote_desde_normales(parametros, Z, variables).columnas
+    if incluir_controles:
+        resultado['controles'] = calcular_controles(Z)
+    return resultado
+
+
+def simular_monte_carlo_paralelo(
+    parametros: ParametrosSimulacion,
+    anos: int,
+    num_simulaciones: int,
+    semilla: int,
+    variables: Sequence[str],
+    num_procesos: Optional[int] = None,
+    metodo_muestreo: str = 'pseudo',
+    antiteticas: bool = False,
+    incluir_controles: bool = False,
+    progreso: Optional[Callable[[int], None]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Ejecuta las trayectorias en el pool de procesos y une los bloques en orden
+
+    Si progreso (llamado con las trayectorias terminadas tras cada bloque) lanza una
+    excepción, los bloques pendientes se cancelan.
+
+    Returns:
+        Dict variable -> array (num_simulaciones, anos), idéntico a la corrida en serie
+        (más 'controles' si incluir_controles)
+    """
+    num_procesos = min(num_procesos or NUM_PROCESOS, MAX_PROCESOS)
+    bloques = dividir_trayectorias(num_simulaciones, num_procesos)
+    futuros = []
+    resultados = []
+    with usar_executor(num_procesos) as executor:
+        try:
+            futuros.extend(
+                executor.submit(
+                    simular_bloque, parametros, anos, semilla, inicio, cantidad, list(variables),
+                    metodo_muestreo, num_simulaciones, antiteticas, incluir_controles
+                )
+                for inicio, cantidad in bloques
+            )
+            for futuro, (inicio, cantidad) in zip(futuros, bloques):
+                resultados.append(futuro.result())
+                if progreso is not None:
+                    progreso(inicio + cantidad)
+        except BrokenProcessPool:
+            descartar_executor(executor)
+            raise
+        finally:
+            for futuro in futuros:
+                futuro.cancel()
+    return {campo: np.concatenate([r[campo] for r in resultados]) for campo in resultados[0]}
+
+
+def iterar_bloques(
+    parametros: ParametrosSimulacion,
+    anos: int,
+    num_simulaciones: int,
+    semilla: int,
+    variables: Sequence[str],
+    tamano_bloque: int,
+    paralelo: bool = False,
+    num_procesos: Optional[int] = None,
+    metodo_muestreo: str = 'pseudo',
+    antiteticas: bool = False,
+    inicio_corrida: int = 0,
+    incluir_controles: bool = False
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Recorre las trayectorias [inicio_corrida, num_simulaciones) en bloques contiguos de
+    tamano_bloque trayectorias, en orden
+
+    En paralelo mantiene a lo sumo BLOQUES_POR_PROCESO bloques en curso por proceso,
+    así que la memoria no crece con num_simulaciones.
+
+    Yields:
+        Dict variable -> array (cantidad, anos) de cada bloque (más 'controles' si incluir_controles)
+    """
+    bloques = [
+        (inicio, min(tamano_bloque, num_simulaciones - inicio))
+        for inicio in range(inicio_corrida, num_simulaciones, tamano_bloque)
+    ]
+    argumentos = (list(variables), metodo_muestreo, num_simulaciones, antiteticas, incluir_controles)
+    if not paralelo:
+        for inicio, cantidad in bloques:
+            yield simular_bloque(parametros, anos, semilla, inicio, cantidad, *argumentos)
+        return
+
+    num_procesos = min(num_procesos or NUM_PROCESOS, MAX_PROCESOS)
+    max_en_curso = num_procesos * BLOQUES_POR_PROCESO
+    en_curso = deque()
+    # El pool queda tomado mientras el generador esté abierto (aunque otro tamaño lo desaloje)
+    with usar_executor(num_procesos) as executor:
+        try:
+            for inicio, cantidad in bloques:
+                if len(en_curso) >= max_en_curso:
+                    yield en_curso.popleft().result()
+                en_curso.append(
+                    executor.submit(simular_bloque, parametros, anos, semilla, inicio, cantidad, *argumentos)
+                )
+            while en_curso:
+                yield en_curso.popleft().result()
+        except BrokenProcessPool:
+            descartar_executor(executor)
+            raise
+        finally:
+            for futuro in en_curso:
+                futuro.cancel()
@@ -0,0 +1,280 @@
+"""
+Almacén en disco de los tensores completos de trayectorias de Monte Carlo.
+
+Una corrida con guardar_trayectorias=true escribe todos los campos numéricos
+de ResultadoAnual de todas las trayectorias (no solo las variables seguidas)
+en un archivo .npy mapeado en memoria, bajo un id. Después se puede consultar
+cualquier campo o percentil sin volver a simular y sin cargar el tensor
+completo: np.load(mmap_mode='r') solo lee las páginas del campo pedido.
+
+Formato: `{id}.npy` float64 de forma (campos, anos, trayectorias), es decir el
+tensor trayectorias × años × campos con los campos por fuera, de modo que la
+columna de un campo en un año es contigua; `{id}.json` con los campos, años,
+semilla, método, etc. Mientras se escribe, el archivo es `{id}.parcial.npy` y
+solo se publica (rename) al terminar la corrida.
+
+Retención: cada consulta renueva el acceso; se eliminan los tensores sin
+acceso en SIM_TRAYECTORIAS_TTL segundos y, si el total supera
+SIM_TRAYECTORIAS_MAX_BYTES, los de acceso más antiguo.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+DIR_TRAYECTORIAS = os.environ.get(
+    "SIM_DIR_TRAYECTORIAS", os.path.join(tempfile.gettempdir(), "sim_trayectorias")
+)
+
+# Segundos sin acceso tras los que se elimina un tensor
+TTL_TRAYECTORIAS = float(os.environ.get("SIM_TRAYECTORIAS_TTL", 24 * 3600))
+
+# Espacio total en disco; también el máximo de una sola corrida
+MAX_BYTES_TRAYECTORIAS = int(os.environ.get("SIM_TRAYECTORIAS_MAX_BYTES", 2 * 1024 ** 3))
+
+BYTES_VALOR = np.dtype(np.float64).itemsize
+
+
+def _id_valido(id_trayectorias: str) -> bool:
+    # Solo ids hexadecimales: el id forma parte de la ruta del archivo
+    return bool(id_trayectorias) and all(c in "0123456789abcdef" for c in id_trayectorias)
+
+
+def bytes_tensor(num_campos: int, anos: int, num_trayectorias: int) -> int:
+    return num_campos * anos * num_trayectorias * BYTES_VALOR
+
+
+class TensorTrayectorias:
+    """
+    Tensor guardado, abierto en modo solo lectura (mapeado, sin cargarlo en memoria)
+    """
+
+    def __init__(self, id_trayectorias: str, tensor: np.ndarray, metadatos: Dict[str, object]):
+        self.id_trayectorias = id_trayectorias
+        self.tensor = tensor
+        self.metadatos = metadatos
+        self.campos: List[str] = list(metadatos['campos'])
+        self.indices = {campo: indice for indice, campo in enumerate(self.campos)}
+
+    def campo(self, campo: str) -> np.ndarray:
+        """
+        Vista mapeada (anos, trayectorias) de un campo
+
+        Raises:
+            KeyError: Si el campo no está en el tensor
+        """
+        if campo not in self.indices:
+            raise KeyError(campo)
+        return self.tensor[self.indices[campo]]
+
+    def cuantiles(self, campo: str, probabilidades: Sequence[float]) -> np.ndarray:
+        """
+        Cuantiles por año, forma (anos, len(probabilidades)); lee solo las columnas del campo
+        """
+        return np.quantile(self.campo(campo), probabilidades, axis=-1).T
+
+
+class EscritorTrayectorias:
+    """
+    Tensor en escritura: los bloques de trayectorias se copian a su posición en el archivo
+    """
+
+    def __init__(self, almacen: 'AlmacenTrayectorias', id_trayectorias: str, metadatos: Dict[str, object]):
+        self.almacen = almacen
+        self.id_trayectorias = id_trayectorias
+        self.metadatos = metadatos
+        self.campos: List[str] = list(metadatos['campos'])
+        self.ruta_parcial = almacen.ruta(id_trayectorias, parcial=True)
+        self.tensor = np.lib.format.open_memmap(
+            self.ruta_parcial, mode='w+', dtype=np.float64,
+            shape=(len(self.campos), metadatos['anos'], metadatos['num_trayectorias'])
+        )
+
+    def escribir(self, inicio: int, bloque: Dict[str, np.ndarray]) -> None:
+        """
+        Copia un bloque (campo -> array (m, anos)) en las trayectorias [inicio, inicio + m)
+        """
+        for indice, campo in enumerate(self.campos):
+            valores = bloque[campo]
+            self.tensor[indice, :, inicio:inicio + len(valores)] = valores.T
+
+    def cerrar(self) -> str:
+        """
+        Publica el tensor completo y devuelve su id
+        """
+        self.tensor.flush()
+        del self.tensor
+        self.almacen.publicar(self)
+        return self.id_trayectorias
+
+    def descartar(self) -> None:
+        """
+        Elimina un tensor incompleto (corrida cancelada o fallida)
+        """
+        self.tensor = None
+        try:
+            os.remove(self.ruta_parcial)
+        except FileNotFoundError:
+            pass
+
+
+class AlmacenTrayectorias:
+    """
+    Directorio de tensores de trayectorias con retención por TTL y espacio total
+    """
+
+    def __init__(
+        self,
+        directorio: str = DIR_TRAYECTORIAS,
+        ttl: float = TTL_TRAYECTORIAS,
+        max_bytes: int = MAX_BYTES_TRAYECTORIAS
+    ):
+        self.directorio = directorio
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def ruta(self, id_trayectorias: str, parcial: bool = False, extension: str = "npy") -> str:
+        return os.path.join(self.directorio, f"{id_trayectorias}{'.parcial' if parcial else ''}.{extension}")
+
+    def validar_tamano(self, num_campos: int, anos: int, num_trayectorias: int) -> None:
+        """
+        Raises:
+            ValueError: Si el tensor no cabe en el espacio del almacén
+        """
+        tamano = bytes_tensor(num_campos, anos, num_trayectorias)
+        if tamano > self.max_bytes:
+            raise ValueError(
+                f"El tensor de trayectorias ({tamano / 1024 ** 2:.0f} MB) supera el máximo del almacén "
+                f"({self.max_bytes / 1024 ** 2:.0f} MB)"
+            )
+
+    def crear(
+        self,
+        campos: Sequence[str],
+        anos: int,
+        num_trayectorias: int,
+        metadatos: Optional[Dict[str, object]] = None
+    ) -> EscritorTrayectorias:
+        """
+        Reserva el archivo de un tensor nuevo (libera espacio según la retención)
+
+        Raises:
+            ValueError: Si el tensor supera el espacio del almacén
+        """
+        self.validar_tamano(len(campos), anos, num_trayectorias)
+        os.makedirs(self.directorio, exist_ok=True)
+        self.limpiar(reservar=bytes_tensor(len(campos), anos, num_trayectorias))
+        return EscritorTrayectorias(self, uuid.uuid4().hex, {
+            **(metadatos or {}),
+            'campos': list(campos),
+            'anos': anos,
+            'num_trayectorias': num_trayectorias,
+            'creado': time.time(),
+        })
+
+    def publicar(self, escritor: EscritorTrayectorias) -> None:
+        with open(self.ruta(escritor.id_trayectorias, extension="json"), "w") as archivo:
+            json.dump(escritor.metadatos, archivo)
+        os.replace(escritor.ruta_parcial, self.ruta(escritor.id_trayectorias))
+
+    def abrir(self, id_trayectorias: str) -> Optional[TensorTrayectorias]:
+        """
+        Tensor guardado con ese id (renueva su acceso), o None si no existe o expiró
+        """
+        if not _id_valido(id_trayectorias):
+            return None
+        self.limpiar()
+        ruta_metadatos = self.ruta(id_trayectorias, extension="json")
+        try:
+            with open(ruta_metadatos) as archivo:
+                metadatos = json.load(archivo)
+            tensor = np.load(self.ruta(id_trayectorias), mmap_mode='r')
+            os.utime(ruta_metadatos)
+        except FileNotFoundError:
+            return None
+        return TensorTrayectorias(id_trayectorias, tensor, metadatos)
+
+    def resumen(self, id_trayectorias: str) -> Optional[Dict[str, object]]:
+        """
+        Metadatos, tamaño y expiración de un tensor (sin renovar el acceso)
+        """
+        if not _id_valido(id_trayectorias):
+            return None
+        ruta_metadatos = self.ruta(id_trayectorias, extension="json")
+        try:
+            with open(ruta_metadatos) as archivo:
+                metadatos = json.load(archivo)
+            acceso = os.path.getmtime(ruta_metadatos)
+            tamano = os.path.getsize(self.ruta(id_trayectorias))
+        except FileNotFoundError:
+            return None
+        return {
+            'id_trayectorias': id_trayectorias,
+            **metadatos,
+            'bytes': tamano,
+            'ultimo_acceso': acceso,
+            'expira': acceso + self.ttl,
+        }
+
+    def listar(self) -> List[Dict[str, object]]:
+        self.limpiar()
+        resumenes = [self.resumen(id_trayectorias) for id_trayectorias in self._ids()]
+        return [resumen for resumen in resumenes if resumen is not None]
+
+    def eliminar(self, id_trayectorias: str) -> bool:
+        """
+        Elimina un tensor; False si no existía
+        """
+        if not _id_valido(id_trayectorias):
+            return False
+        existia = False
+        for ruta in (self.ruta(id_trayectorias, extension="json"), self.ruta(id_trayectorias)):
+            try:
+                os.remove(ruta)
+                existia = True
+            except FileNotFoundError:
+                pass
+        return existia
+
+    def limpiar(self, reservar: int = 0) -> None:
+        """
+        Aplica la retención: elimina los tensores expirados y, de más antiguo a más
+        reciente, los necesarios para que el total más `reservar` quepa en max_bytes
+        """
+        if not os.path.isdir(self.directorio):
+            return
+        with self._lock:
+            ahora = time.time()
+            tensores = []
+            for nombre in os.listdir(self.directorio):
+                ruta = os.path.join(self.directorio, nombre)
+                try:
+                    if nombre.endswith(".parcial.npy"):
+                        # Escrituras interrumpidas (p. ej. un reinicio a mitad de corrida)
+                        if os.path.getmtime(ruta) + self.ttl < ahora:
+                            os.remove(ruta)
+                    elif nombre.endswith(".json"):
+                        id_trayectorias = nombre[:-len(".json")]
+                        tamano = os.path.getsize(self.ruta(id_trayectorias))
+                        tensores.append((os.path.getmtime(ruta), tamano, id_trayectorias))
+                except FileNotFoundError:
+                    continue
+            total = sum(tamano for _, tamano, _ in tensores) + reservar
+            for acceso, tamano, id_trayectorias in sorted(tensores):
+                if acceso + self.ttl >= ahora and total <= self.max_bytes:
+                    continue
+                self.eliminar(id_trayectorias)
+                total -= tamano
+
+    def _ids(self) -> List[str]:
+        if not os.path.isdir(self.directorio):
+            return []
+        return [nombre[:-len(".json")] for nombre in os.listdir(self.directorio) if nombre.endswith(".json")]
+
+
+almacen_trayectorias = AlmacenTrayectorias()
@@ -0,0 +1,211 @@
+"""
+Cache de resultados de los endpoints de simulación.
+
+Con semilla fija una simulación es determinista, así que la respuesta se puede
+reutilizar. La clave combina el hash de los parámetros del modelo
+(compiled.clave_parametros), la semilla, N, el método y las demás opciones que
+cambian el resultado. Se guarda el JSON ya serializado, de modo que un acierto
+no vuelve a simular ni a serializar.
+
+Dos niveles:
+- memoria: LRU acotado (SIM_CACHE_TAMANO entradas)
+- disco (opcional): un archivo `{clave}.bin` por clave en SIM_DIR_CACHE (JSON, npz o
+  Arrow según el formato pedido, que es parte de la clave); sobrevive a un reinicio.
+  Retención como en path_store: cada acierto renueva el acceso, se eliminan las
+  entradas sin acceso en SIM_CACHE_TTL segundos y, si el total supera
+  SIM_CACHE_MAX_BYTES, las de acceso más antiguo
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from schemas import ParametrosSimulacion
+from compiled import clave_parametros
+from stochastic import VERSION_NORMALES
+
+# Entradas del LRU en memoria (una respuesta Monte Carlo exacta de 10000 trayectorias ocupa ~3,5 MB)
+TAMANO_CACHE_RESULTADOS = int(os.environ.get("SIM_CACHE_TAMANO", 64))
+
+# Directorio opcional del nivel en disco
+DIR_CACHE_RESULTADOS = os.environ.get("SIM_DIR_CACHE")
+
+# Segundos sin acceso tras los que se elimina una entrada en disco
+TTL_CACHE_RESULTADOS = float(os.environ.get("SIM_CACHE_TTL", 7 * 24 * 3600))
+
+# Espacio total del nivel en disco
+MAX_BYTES_CACHE_RESULTADOS = int(os.environ.get("SIM_CACHE_MAX_BYTES", 1024 ** 3))
+
+EXTENSION = ".bin"
+
+
+def clave_resultado(endpoint: str, parametros: ParametrosSimulacion, semilla: int, **opciones) -> str:
+    """
+    Clave estable de una respuesta: endpoint, hash de los parámetros, años, semilla y opciones
+
+    Args:
+        endpoint: Nombre del endpoint (separa resultados de distinto tipo)
+        parametros: Parámetros de la simulación
+        semilla: Semilla raíz
+        **opciones: Opciones que cambian el resultado (N, método, reducción de varianza, ...)
+
+    Returns:
+        Hash SHA-256 en hexadecimal
+    """
+    contenido = {
+        'endpoint': endpoint,
+        'parametros': clave_parametros(parametros),
+        'anos': parametros.anos,
+        'semilla': semilla,
+        'opciones': opciones,
+        # Con otra asignación de normales la misma semilla da otro resultado
+        'normales': VERSION_NORMALES,
+    }
+    return hashlib.sha256(json.dumps(contenido, sort_keys=True).encode()).hexdigest()
+
+
+class CacheResultados:
+    """
+    LRU de respuestas serializadas con nivel opcional en disco y contadores de aciertos
+    """
+
+    def __init__(
+        self,
+        tamano: int = TAMANO_CACHE_RESULTADOS,
+        directorio: Optional[str] = DIR_CACHE_RESULTADOS,
+        ttl: float = TTL_CACHE_RESULTADOS,
+        max_bytes: int = MAX_BYTES_CACHE_RESULTADOS
+    ):
+        self.tamano = tamano
+        self.directorio = directorio
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entradas: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, f"{clave}{EXTENSION}")
+
+    def _guardar_memoria(self, clave: str, contenido: bytes) -> None:
+        # Llamar con el lock tomado
+        self._entradas[clave] = contenido
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.tamano:
+            self._entradas.popitem(last=False)
+
+    def obtener(self, clave: str) -> Optional[bytes]:
+        """
+        Respuesta guardada bajo la clave (memoria y luego disco, si no expiró), o None
+        """
+        with self._lock:
+            contenido = self._entradas.get(clave)
+            if contenido is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos_memoria += 1
+                return contenido
+        if self.directorio:
+            ruta = self._ruta(clave)
+            try:
+                if os.path.getmtime(ruta) + self.ttl < time.time():
+                    os.remove(ruta)
+                    contenido = None
+                else:
+                    with open(ruta, "rb") as archivo:
+                        contenido = archivo.read()
+                    os.utime(ruta)
+            except FileNotFoundError:
+                contenido = None
+            if contenido is not None:
+                with self._lock:
+                    self._guardar_memoria(clave, contenido)
+                    self.aciertos_disco += 1
+                return contenido
+        with self._lock:
+            self.fallos += 1
+        return None
+
+    def guardar(self, clave: str, contenido: bytes) -> None:
+        """
+        Guarda la respuesta en memoria y, si está configurado, en disco (si cabe en max_bytes)
+        """
+        with self._lock:
+            self._guardar_memoria(clave, contenido)
+        if self.directorio and len(contenido) <= self.max_bytes:
+            os.makedirs(self.directorio, exist_ok=True)
+            self.retener(reservar=len(contenido))
+            temporal = f"{self._ruta(clave)}.{threading.get_ident()}.tmp"
+            with open(temporal, "wb") as archivo:
+                archivo.write(contenido)
+            os.replace(temporal, self._ruta(clave))
+
+    def limpiar(self, disco: bool = False) -> None:
+        """
+        Vacía la memoria y los contadores (y el directorio en disco si disco=True)
+        """
+        with self._lock:
+            self._entradas.clear()
+            self.aciertos_memoria = self.aciertos_disco = self.fallos = 0
+        if disco and self.directorio and os.path.isdir(self.directorio):
+            for nombre in os.listdir(self.directorio):
+                # También las entradas del formato anterior ({clave}.json)
+                if nombre.endswith((EXTENSION, ".json")):
+                    try:
+                        os.remove(os.path.join(self.directorio, nombre))
+                    except FileNotFoundError:
+                        pass
+
+    def retener(self, reservar: int = 0) -> None:
+        """
+        Aplica la retención en disco: elimina las entradas expiradas y, de acceso más
+        antiguo a más reciente, las necesarias para que el total más `reservar` quepa en max_bytes
+        """
+        if not self.directorio or not os.path.isdir(self.directorio):
+            return
+        with self._lock:
+            ahora = time.time()
+            entradas = []
+            for nombre in os.listdir(self.directorio):
+                if not nombre.endswith(EXTENSION):
+                    continue
+                ruta = os.path.join(self.directorio, nombre)
+                try:
+                    entradas.append((os.path.getmtime(ruta), os.path.getsize(ruta), ruta))
+                except FileNotFoundError:
+                    continue
+            total = sum(tamano for _, tamano, _ in entradas) + reservar
+            for acceso, tamano, ruta in sorted(entradas):
+                if acceso + self.ttl >= ahora and total <= self.max_bytes:
+                    continue
+                try:
+                    os.remove(ruta)
+                except FileNotFoundError:
+                    pass
+                total -= tamano
+
+    def estadisticas(self) -> Dict[str, object]:
+        """
+        Contadores de aciertos y fallos y ocupación actual
+        """
+        with self._lock:
+            aciertos = self.aciertos_memoria + self.aciertos_disco
+            consultas = aciertos + self.fallos
+            return {
+                'aciertos': aciertos,
+                'aciertos_memoria': self.aciertos_memoria,
+                'aciertos_disco': self.aciertos_disco,
+                'fallos': self.fallos,
+                'tasa_aciertos': aciertos / consultas if consultas else None,
+                'entradas': len(self._entradas),
+                'tamano': self.tamano,
+                'disco': self.directorio,
+                'max_bytes_disco': self.max_bytes,
+                'ttl_disco': self.ttl,
+            }
+
+
+cache_resultados = CacheResultados()
@@ -0,0 +1,221 @@
+"""
+Corridas Monte Carlo guardadas, para extenderlas con más trayectorias.
+
+Cada corrida guarda sus parámetros, la semilla, el método y el estado de los
+acumuladores en línea (streaming_stats.EstadoStreaming) bajo un id. Extenderla
+continúa con las trayectorias siguientes de la misma semilla y combina los
+resultados en el estado guardado, así que solo cuesta las trayectorias nuevas.
+
+Las corridas se guardan en memoria (LRU) y, si SIM_DIR_CORRIDAS está definido,
+también en disco, de modo que sobreviven a un reinicio. En disco cada corrida es
+un `{id}.npz` con los arrays de los acumuladores (momentos, centroides de los
+t-digest, muestra y conteos de riesgo) y sus metadatos en JSON (entrada
+'metadatos'); se lee sin pickle, así que el archivo no puede ejecutar código y no
+depende de la estructura de las clases.
+"""
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from schemas import ParametrosSimulacion
+from streaming_stats import EstadoStreaming, MomentosOnline
+from stochastic import VERSION_NORMALES
+from tail_risk import AcumuladorRiesgo, ReglaRiesgo
+
+# Corridas en memoria
+MAX_CORRIDAS_MEMORIA = int(os.environ.get("SIM_MAX_CORRIDAS", 64))
+
+# Directorio opcional para persistir las corridas
+DIR_CORRIDAS = os.environ.get("SIM_DIR_CORRIDAS")
+
+# Versión del formato en disco (los archivos de otra versión se ignoran)
+VERSION_FORMATO = 1
+
+
+class CorridaMonteCarlo:
+    """
+    Corrida Monte Carlo extensible
+    """
+
+    def __init__(
+        self,
+        parametros: ParametrosSimulacion,
+        semilla: int,
+        anos: int,
+        metodo_muestreo: str,
+        reduccion_varianza: str,
+        analitico: bool,
+        estado: EstadoStreaming,
+        id_corrida: Optional[str] = None,
+        variables: Optional[List[str]] = None
+    ):
+        self.id_corrida = id_corrida or uuid.uuid4().hex
+        self.parametros = parametros
+        self.semilla = semilla
+        self.anos = anos
+        self.metodo_muestreo = metodo_muestreo
+        self.reduccion_varianza = reduccion_varianza
+        self.analitico = analitico
+        self.estado = estado
+        # Variables reportadas (None: todas; ver simulator.variables_reportadas)
+        self.variables = variables
+        # Serializa las extensiones concurrentes de la misma corrida
+        self.lock = threading.Lock()
+
+
+_corridas: 'OrderedDict[str, CorridaMonteCarlo]' = OrderedDict()
+_lock = threading.Lock()
+
+
+def _ruta(id_corrida: str) -> str:
+    return os.path.join(DIR_CORRIDAS, f"{id_corrida}.npz")
+
+
+def _exportar_momentos(arrays: Dict[str, np.ndarray], prefijo: str, momentos: MomentosOnline) -> None:
+    arrays[f"{prefijo}/n"] = np.array(momentos.n)
+    for nombre in ('media', 'm2', 'minimo', 'maximo'):
+        arrays[f"{prefijo}/{nombre}"] = getattr(momentos, nombre)
+
+
+def _importar_momentos(arrays: Dict[str, np.ndarray], prefijo: str, momentos: MomentosOnline) -> None:
+    momentos.n = int(arrays[f"{prefijo}/n"])
+    for nombre in ('media', 'm2', 'minimo', 'maximo'):
+        setattr(momentos, nombre, arrays[f"{prefijo}/{nombre}"])
+
+
+def _exportar(corrida: CorridaMonteCarlo) -> Dict[str, np.ndarray]:
+    """
+    Arrays de la corrida para np.savez (los metadatos van como JSON en 'metadatos')
+    """
+    estado = corrida.estado
+    arrays: Dict[str, np.ndarray] = {}
+    for campo, acumulador in estado.acumuladores.items():
+        _exportar_momentos(arrays, f"acumuladores/{campo}", acumulador.momentos)
+        # Centroides de los t-digest de todos los años, concatenados
+        arrays[f"acumuladores/{campo}/centroides"] = np.array([len(d.medias) for d in acumulador.digests])
+        arrays[f"acumuladores/{campo}/medias"] = np.concatenate([d.medias for d in acumulador.digests])
+        arrays[f"acumuladores/{campo}/pesos"] = np.concatenate([d.pesos for d in acumulador.digests])
+    for campo, momentos in estado.momentos_pares.items():
+        _exportar_momentos(arrays, f"pares/{campo}", momentos)
+    for campo, valores in (estado.muestra or {}).items():
+        arrays[f"muestra/{campo}"] = valores
+    riesgo = estado.riesgo
+    if riesgo is not None:
+        for nombre in ('violaciones', 'acumuladas', 'primeras'):
+            arrays[f"riesgo/{nombre}"] = getattr(riesgo, nombre)
+    arrays['metadatos'] = np.array(json.dumps({
+        'version': VERSION_FORMATO,
+        'version_normales': VERSION_NORMALES,
+        'parametros': corrida.parametros.model_dump(mode='json'),
+        'semilla': corrida.semilla,
+        'anos': corrida.anos,
+        'metodo_muestreo': corrida.metodo_muestreo,
+        'reduccion_varianza': corrida.reduccion_varianza,
+        'analitico': corrida.analitico,
+        'variables': corrida.variables,
+        'estado': {
+            'num_trayectorias': estado.num_trayectorias,
+            'variables': list(estado.acumuladores),
+            'antiteticas': bool(estado.momentos_pares),
+            'variables_muestra': estado.variables_muestra,
+            'con_muestra': estado.muestra is not None,
+            'compresion': [acumulador.digests[0].compresion for acumulador in estado.acumuladores.values()],
+            'riesgo': None if riesgo is None else {
+                'num_trayectorias': riesgo.num_trayectorias,
+                'reglas': [
+                    [regla.nombre, regla.variable, regla.operador, regla.umbral, regla.referencia]
+                    for regla in riesgo.reglas
+                ],
+            },
+        },
+    }))
+    return arrays
+
+
+def _importar(id_corrida: str, arrays: Dict[str, np.ndarray]) -> Optional[CorridaMonteCarlo]:
+    """
+    Corrida a partir de los arrays de _exportar (None si el formato es de otra versión o
+    la corrida usó otra asignación de normales: extenderla no equivaldría a una corrida fija)
+    """
+    metadatos = json.loads(str(arrays['metadatos']))
+    if metadatos.get('version') != VERSION_FORMATO or metadatos.get('version_normales') != VERSION_NORMALES:
+        return None
+    anos = metadatos['anos']
+    datos = metadatos['estado']
+    riesgo = None
+    if datos['riesgo'] is not None:
+        riesgo = AcumuladorRiesgo([ReglaRiesgo(*regla) for regla in datos['riesgo']['reglas']], anos)
+        riesgo.num_trayectorias = datos['riesgo']['num_trayectorias']
+        for nombre in ('violaciones', 'acumuladas', 'primeras'):
+            setattr(riesgo, nombre, arrays[f"riesgo/{nombre}"])
+    estado = EstadoStreaming(datos['variables'], anos, datos['antiteticas'], datos['variables_muestra'], riesgo)
+    estado.num_trayectorias = datos['num_trayectorias']
+    for (campo, acumulador), compresion in zip(estado.acumuladores.items(), datos['compresion']):
+        _importar_momentos(arrays, f"acumuladores/{campo}", acumulador.momentos)
+        limites = np.cumsum(arrays[f"acumuladores/{campo}/centroides"])[:-1]
+        medias = np.split(arrays[f"acumuladores/{campo}/medias"], limites)
+        pesos = np.split(arrays[f"acumuladores/{campo}/pesos"], limites)
+        for digest, medias_ano, pesos_ano in zip(acumulador.digests, medias, pesos):
+            digest.compresion = compresion
+            digest.medias, digest.pesos = medias_ano, pesos_ano
+    for campo, momentos in estado.momentos_pares.items():
+        _importar_momentos(arrays, f"pares/{campo}", momentos)
+    if datos['con_muestra']:
+        estado.muestra = {campo: arrays[f"muestra/{campo}"] for campo in estado.variables_muestra}
+    return CorridaMonteCarlo(
+        parametros=ParametrosSimulacion(**metadatos['parametros']),
+        semilla=metadatos['semilla'],
+        anos=anos,
+        metodo_muestreo=metadatos['metodo_muestreo'],
+        reduccion_varianza=metadatos['reduccion_varianza'],
+        analitico=metadatos['analitico'],
+        estado=estado,
+        id_corrida=id_corrida,
+        variables=metadatos['variables']
+    )
+
+
+def guardar_corrida(corrida: CorridaMonteCarlo) -> None:
+    """
+    Guarda (o actualiza) la corrida en memoria y, si está configurado, en disco
+    """
+    with _lock:
+        _corridas[corrida.id_corrida] = corrida
+        _corridas.move_to_end(corrida.id_corrida)
+        while len(_corridas) > MAX_CORRIDAS_MEMORIA:
+            _corridas.popitem(last=False)
+    if DIR_CORRIDAS:
+        os.makedirs(DIR_CORRIDAS, exist_ok=True)
+        temporal = _ruta(corrida.id_corrida) + ".tmp"
+        with open(temporal, "wb") as archivo:
+            np.savez(archivo, **_exportar(corrida))
+        os.replace(temporal, _ruta(corrida.id_corrida))
+
+
+def obtener_corrida(id_corrida: str) -> Optional[CorridaMonteCarlo]:
+    """
+    Corrida guardada con ese id (de memoria o de disco), o None si no existe
+    """
+    with _lock:
+        corrida = _corridas.get(id_corrida)
+        if corrida is not None:
+            _corridas.move_to_end(id_corrida)
+            return corrida
+    # Solo ids hexadecimales: el id forma parte de la ruta del archivo
+    if not DIR_CORRIDAS or not all(c in "0123456789abcdef" for c in id_corrida):
+        return None
+    try:
+        with np.load(_ruta(id_corrida), allow_pickle=False) as archivo:
+            corrida = _importar(id_corrida, dict(archivo))
+    except FileNotFoundError:
+        return None
+    if corrida is None:
+        return None
+    with _lock:
+        # Otro hilo pudo cargarla mientras tanto: conservar una sola instancia (y su lock)
+        corrida = _corridas.setdefault(id_corrida, corrida)
+        _corridas.move_to_end(id_corrida)
+    return corrida
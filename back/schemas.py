@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, field_serializer
+from typing import Dict, List, Literal, Optional
 
 class ParametrosSimulacion(BaseModel):
     """Parámetros de entrada para la simulación fiscal basados en el modelo estocástico"""
@@ -265,6 +265,7 @@ class ResultadoSimulacion(BaseModel):
     
     resultados: List[ResultadoAnual]
     pasos: List[PasoSimulacion]
+    semilla: Optional[int] = None
 
 class EstadisticasVariable(BaseModel):
     """Estadísticas de una variable en Monte Carlo"""
@@ -279,31 +280,151 @@ class EstadisticasVariable(BaseModel):
     maximo: float
 
 class ResultadoMonteCarloAnual(BaseModel):
-    """Resultado anual con estadísticas de Monte Carlo"""
+    """Resultado anual con estadísticas de Monte Carlo (None: variable no pedida)"""
     ano: int
     
     # Estadísticas de variables principales
-    ingresos_totales: EstadisticasVariable
-    gastos_totales: EstadisticasVariable
-    deficit_superavit: EstadisticasVariable
-    deuda_total: EstadisticasVariable
-    deuda_pib_ratio: EstadisticasVariable
-    rin: EstadisticasVariable
-    rin_meses_importacion: EstadisticasVariable
-    deficit_pib_ratio: EstadisticasVariable
-    presion_tributaria: EstadisticasVariable
+    ingresos_totales: Optional[EstadisticasVariable] = None
+    gastos_totales: Optional[EstadisticasVariable] = None
+    deficit_superavit: Optional[EstadisticasVariable] = None
+    deuda_total: Optional[EstadisticasVariable] = None
+    deuda_pib_ratio: Optional[EstadisticasVariable] = None
+    rin: Optional[EstadisticasVariable] = None
+    rin_meses_importacion: Optional[EstadisticasVariable] = None
+    deficit_pib_ratio: Optional[EstadisticasVariable] = None
+    presion_tributaria: Optional[EstadisticasVariable] = None
     
     # Variables específicas
-    ing_gas: EstadisticasVariable
-    ing_mineria_total: EstadisticasVariable
-    ing_iva: EstadisticasVariable
-    ing_iue: EstadisticasVariable
-    gasto_subsidio_combustibles: EstadisticasVariable
-    
-    # Distribuciones completas (para histogramas)
-    distribucion_deficit: List[float]
-    distribucion_deuda_pib: List[float]
-    distribucion_rin: List[float]
+    ing_gas: Optional[EstadisticasVariable] = None
+    ing_mineria_total: Optional[EstadisticasVariable] = None
+    ing_iva: Optional[EstadisticasVariable] = None
+    ing_iue: Optional[EstadisticasVariable] = None
+    gasto_subsidio_combustibles: Optional[EstadisticasVariable] = None
+    
+    # Composición de la deuda y carga de intereses
+    delta_deuda_externa: Optional[EstadisticasVariable] = None
+    delta_deuda_interna: Optional[EstadisticasVariable] = None
+    deuda_externa_pib: Optional[EstadisticasVariable] = None
+    deuda_interna_pib: Optional[EstadisticasVariable] = None
+    ratio_externa_total: Optional[EstadisticasVariable] = None
+    ratio_interna_total: Optional[EstadisticasVariable] = None
+    intereses_ingresos_ratio: Optional[EstadisticasVariable] = None
+    
+    # Componentes lineales en Z, solo en modo analítico (forma cerrada; ver analytic)
+    ing_it: Optional[EstadisticasVariable] = None
+    ing_itf: Optional[EstadisticasVariable] = None
+    ing_rc_iva: Optional[EstadisticasVariable] = None
+    ing_ice: Optional[EstadisticasVariable] = None
+    ing_ga: Optional[EstadisticasVariable] = None
+    gasto_inversion: Optional[EstadisticasVariable] = None
+    gasto_subsidio_alimentos: Optional[EstadisticasVariable] = None
+    tipo_cambio: Optional[EstadisticasVariable] = None
+    
+    # Distribuciones completas (solo con distribuciones='muestras')
+    distribucion_deficit: Optional[List[float]] = None
+    distribucion_deuda_pib: Optional[List[float]] = None
+    distribucion_rin: Optional[List[float]] = None
+    
+    # Fracción de trayectorias por intervalo (bordes en ResultadoMonteCarloComplete.bordes_histogramas)
+    histogramas: Optional[Dict[str, List[float]]] = None
+    # Cuantiles en ResultadoMonteCarloComplete.probabilidades_cuantiles
+    cuantiles: Optional[Dict[str, List[float]]] = None
+    
+    # Estadísticas exactas de los componentes lineales (modo analítico)
+    estadisticas_analiticas: Optional[Dict[str, EstadisticasVariable]] = None
+    
+    @field_serializer('distribucion_deficit', 'distribucion_deuda_pib', 'distribucion_rin', when_used='json')
+    def _distribucion_json(self, valores):
+        # El simulador puede dejar arrays de NumPy (ver serialization.lista_serializable)
+        return valores.tolist() if hasattr(valores, 'tolist') else valores
+
+class EstadisticasParcialesAnual(BaseModel):
+    """Estadísticas de un año en una corrida Monte Carlo en curso"""
+    ano: int
+    estadisticas: Dict[str, EstadisticasVariable]
+
+class ProgresoMonteCarlo(BaseModel):
+    """Avance de una corrida Monte Carlo con estadísticas parciales (ver /api/simular-monte-carlo/stream)"""
+    trayectorias_procesadas: int
+    num_simulaciones: int
+    progreso: float  # Fracción de trayectorias procesadas
+    resultados_parciales: List[EstadisticasParcialesAnual]
+
+class ResultadoAnaliticoAnual(BaseModel):
+    """Estadísticas exactas de los componentes lineales en un año"""
+    ano: int
+    componentes: Dict[str, EstadisticasVariable]
+
+class ResultadoAnalitico(BaseModel):
+    """Resultado del cálculo analítico (sin muestreo) de los componentes lineales"""
+    resultados: List[ResultadoAnaliticoAnual]
+    metodo: str
+
+class ResultadoReduccionVarianza(BaseModel):
+    """Reducción de varianza aplicada en Monte Carlo"""
+    modo: str
+    # Métrica -> factor Var(sin reducción) / Var(con reducción) por año
+    # (None: la media es exacta porque los controles explican la variable por completo)
+    factores: Dict[str, List[Optional[float]]]
+
+class ToleranciaMonteCarlo(BaseModel):
+    """Objetivo de precisión para Monte Carlo adaptativo"""
+    variable: str = Field(description="Variable de ResultadoAnual (p. ej. deuda_pib_ratio)")
+    estadistico: Literal[
+        'promedio', 'mediana', 'percentil_5', 'percentil_25', 'percentil_75', 'percentil_95'
+    ] = 'promedio'
+    ano: Optional[int] = Field(default=None, description="Año (p. ej. 2025); None = todos los años")
+    semiancho: float = Field(gt=0, description="Semiancho máximo del intervalo de confianza (unidades de la variable)")
+
+class SolicitudMonteCarloAdaptativo(BaseModel):
+    """Monte Carlo que agrega trayectorias hasta cumplir las tolerancias o agotar el presupuesto"""
+    parametros: ParametrosSimulacion
+    tolerancias: List[ToleranciaMonteCarlo] = Field(min_length=1)
+    max_simulaciones: int = Field(default=100000, description="Presupuesto de trayectorias")
+    nivel_confianza: float = Field(default=0.95, gt=0, lt=1)
+    semilla: Optional[int] = None
+    reduccion_varianza: Literal['ninguna', 'antiteticas'] = 'ninguna'
+    analitico: bool = False
+    umbrales: List[str] = Field(default=[], description="Umbrales de riesgo adicionales, p. ej. 'deuda_pib_ratio>60'")
+
+class IntervaloConfianza(BaseModel):
+    """Intervalo de confianza alcanzado para una tolerancia"""
+    variable: str
+    estadistico: str
+    ano: int
+    estimacion: float
+    semiancho: float
+    objetivo: float
+    cumple: bool
+
+class ResultadoAdaptativo(BaseModel):
+    """Resumen de la corrida adaptativa"""
+    convergencia: bool
+    nivel_confianza: float
+    max_simulaciones: int
+    intervalos: List[IntervaloConfianza]
+
+class ProbabilidadViolacion(BaseModel):
+    """Probabilidad de violar una regla de riesgo (alerta del modelo o umbral pedido), por año"""
+    nombre: str
+    regla: str  # p. ej. "deuda_pib_ratio > 70"
+    probabilidad: List[float]  # Fracción de trayectorias que violan la regla en cada año
+    probabilidad_acumulada: List[float]  # Fracción que la violó al menos una vez hasta ese año
+    primera_violacion: List[float]  # Fracción cuya primera violación es en ese año
+    sin_violacion: float  # Fracción que nunca la viola
+
+class ValorEnRiesgo(BaseModel):
+    """VaR y CVaR (cola superior) de una variable por año"""
+    variable: str
+    nivel: float
+    var: List[float]  # Cuantil `nivel`
+    cvar: List[float]  # Promedio de las trayectorias en o sobre el VaR
+
+class ResultadoRiesgo(BaseModel):
+    """Riesgo de cola de una corrida Monte Carlo"""
+    anos: List[int]
+    violaciones: List[ProbabilidadViolacion]
+    valor_en_riesgo: List[ValorEnRiesgo]
 
 class ResultadoMonteCarloComplete(BaseModel):
     """Resultado completo de simulación Monte Carlo"""
@@ -311,3 +432,53 @@ class ResultadoMonteCarloComplete(BaseModel):
     resultados_estadisticos: List[ResultadoMonteCarloAnual]
     simulacion_representativa: List[ResultadoAnual]
     metodo: str
+    semilla: Optional[int] = None
+    metodo_muestreo: str = "pseudo"
+    reduccion_varianza: Optional[ResultadoReduccionVarianza] = None
+    adaptativo: Optional[ResultadoAdaptativo] = None
+    id_corrida: Optional[str] = None  # Corrida guardada, extensible con /api/simular-monte-carlo/{id}/extender
+    bordes_histogramas: Optional[Dict[str, List[float]]] = None  # Por variable, comunes a todos los años
+    probabilidades_cuantiles: Optional[List[float]] = None
+    riesgo: Optional[ResultadoRiesgo] = None  # Probabilidades de violación y VaR/CVaR (ver tail_risk)
+    id_trayectorias: Optional[str] = None  # Tensor completo en disco, consultable en /api/trayectorias/{id}
+
+class ResumenTrayectorias(BaseModel):
+    """Tensor de trayectorias guardado en disco (ver path_store)"""
+    id_trayectorias: str
+    campos: List[str]
+    anos: int
+    ano_inicial: int = 2020
+    num_trayectorias: int
+    semilla: Optional[int] = None
+    metodo_muestreo: Optional[str] = None
+    reduccion_varianza: Optional[str] = None
+    modo_estadisticas: Optional[str] = None
+    bytes: int
+    # Marcas de tiempo (segundos desde epoch); expira = último acceso + TTL
+    creado: float
+    ultimo_acceso: float
+    expira: float
+
+class CuantilesTrayectorias(BaseModel):
+    """Cuantiles por año de un campo, leídos del tensor guardado"""
+    id_trayectorias: str
+    campo: str
+    anos: List[int]
+    probabilidades: List[float]
+    cuantiles: List[List[float]]  # Por año, uno por probabilidad
+    promedio: List[float]
+    desviacion_estandar: List[float]
+
+class EstadoTrabajo(BaseModel):
+    """Estado de un trabajo Monte Carlo asíncrono (ver jobs)"""
+    id_trabajo: str
+    estado: Literal['en_cola', 'ejecutando', 'completado', 'fallido', 'cancelado']
+    num_simulaciones: int
+    trayectorias_procesadas: int = 0
+    progreso: float = 0.0  # Fracción de trayectorias procesadas
+    # Marcas de tiempo (segundos desde epoch)
+    creado: float
+    iniciado: Optional[float] = None
+    terminado: Optional[float] = None
+    error: Optional[str] = None
+    resultado: Optional[ResultadoMonteCarloComplete] = None
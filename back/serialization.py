@@ -0,0 +1,87 @@
+"""
+Serialización rápida de las respuestas del motor.
+
+Los resultados de simulación los arma el propio motor a partir de datos ya
+validados, así que no se vuelven a validar: los modelos grandes se crean con
+model_construct y se responden como bytes (sin que FastAPI los valide y
+serialice de nuevo campo por campo).
+
+- a_json: con orjson (opcional) serializa directamente los arrays de NumPy que
+  llevan los modelos (ver lista_serializable); sin orjson usa el serializador
+  de Pydantic
+- comprimir: gzip (o brotli, si está instalado) según Accept-Encoding, solo
+  por encima de SIM_COMPRESION_MIN_BYTES
+"""
+import gzip
+import os
+from typing import List, Optional, Tuple, Union
+import numpy as np
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Respuestas más chicas se envían sin comprimir
+MIN_BYTES_COMPRESION = int(os.environ.get("SIM_COMPRESION_MIN_BYTES", 1024))
+
+# Nivel de gzip: 1 comprime ~2x una respuesta con trayectorias completas en una fracción del tiempo de 6
+NIVEL_GZIP = int(os.environ.get("SIM_NIVEL_GZIP", 1))
+
+NIVEL_BROTLI = int(os.environ.get("SIM_NIVEL_BROTLI", 4))
+
+
+def paquetes_faltantes() -> List[str]:
+    """
+    Avisos de los paquetes de serialización (requirements.txt) que no están instalados
+    """
+    avisos = []
+    if orjson is None:
+        avisos.append("orjson no está instalado: las respuestas JSON se serializan con Pydantic (más lento)")
+    if brotli is None:
+        avisos.append("brotli no está instalado: las respuestas se comprimen solo con gzip")
+    return avisos
+
+
+def lista_serializable(valores: np.ndarray) -> Union[np.ndarray, list]:
+    """
+    Valores para un campo List[float] de un modelo armado con model_construct
+
+    Con orjson el array se serializa tal cual (contiguo); sin orjson se convierte a lista.
+    """
+    if orjson is None:
+        return valores.tolist()
+    return np.ascontiguousarray(valores, dtype=np.float64)
+
+
+def a_json(modelo: BaseModel) -> bytes:
+    """
+    JSON de un modelo sin validarlo (admite arrays de NumPy de lista_serializable)
+    """
+    if orjson is None:
+        return modelo.model_dump_json().encode()
+    # warnings=False: los arrays ocupan campos declarados como listas
+    return orjson.dumps(modelo.model_dump(warnings=False), option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def comprimir(contenido: bytes, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """
+    Comprime la respuesta si el cliente lo acepta y supera MIN_BYTES_COMPRESION
+
+    Returns:
+        (contenido, Content-Encoding o None si se envía sin comprimir)
+    """
+    if len(contenido) < MIN_BYTES_COMPRESION or not accept_encoding:
+        return contenido, None
+    aceptadas = {codificacion.split(';')[0].strip() for codificacion in accept_encoding.lower().split(',')}
+    if brotli is not None and 'br' in aceptadas:
+        return brotli.compress(contenido, quality=NIVEL_BROTLI), 'br'
+    if 'gzip' in aceptadas:
+        return gzip.compress(contenido, compresslevel=NIVEL_GZIP, mtime=0), 'gzip'
+    return contenido, None
@@ -1,9 +1,145 @@
-from typing import List, Dict, Optional
+import copy
+from contextlib import closing
+from typing import Callable, List, Dict, Optional, Sequence, Union
 import random
 import numpy as np
-from schemas import ParametrosSimulacion, ResultadoAnual, PasoSimulacion, ResultadoSimulacion, ResultadoMonteCarloAnual, EstadisticasVariable, ResultadoMonteCarloComplete
-from fiscal_model import calcular_ingresos, calcular_gastos, calcular_indicadores, calcular_deficit_deuda
-from stochastic import aplicar_volatilidad_precios, simular_shock
+from schemas import ParametrosSimulacion, ResultadoAnual, PasoSimulacion, ResultadoSimulacion, ResultadoMonteCarloAnual, EstadisticasVariable, ResultadoMonteCarloComplete, ResultadoReduccionVarianza, ResultadoAnalitico, ResultadoAnaliticoAnual, ToleranciaMonteCarlo, IntervaloConfianza, ResultadoAdaptativo, EstadisticasParcialesAnual
+from fiscal_model import calcular_ingresos, calcular_gastos, calcular_indicadores, calcular_deficit_deuda, generar_alertas
+from stochastic import aplicar_volatilidad_precios, simular_shock, nueva_semilla, generador_trayectoria, generar_normales_bloque, usar_generador
+from vectorized_model import simular_lote_desde_normales, NUM_FACTORES
+from parallel import simular_monte_carlo_paralelo, iterar_bloques
+from variance_reduction import aplicar_reduccion_varianza, factor_reduccion, METRICAS_PRINCIPALES
+from streaming_stats import EstadoStreaming, EstadisticasOnline, TAMANO_BLOQUE
+from analytic import componentes_analiticos, campos_monte_carlo_analiticos, CAMPOS_SOLO_ANALITICOS
+from adaptive import evaluar_tolerancias, TAMANO_LOTE_ADAPTATIVO
+from runs import CorridaMonteCarlo, guardar_corrida
+from cancellation import TokenCancelacion
+from distributions import resumir_distribuciones, validar_distribuciones, NUM_BINS_HISTOGRAMA, PROBABILIDADES_CUANTILES
+from binary_formats import ColumnasMonteCarlo, ESTADISTICOS
+from serialization import lista_serializable
+from stats_kernel import calcular_estadisticas, EstadisticasVectorizadas
+from tail_risk import AcumuladorRiesgo, reglas_riesgo, resumir_riesgo, variables_riesgo
+from path_store import almacen_trayectorias, EscritorTrayectorias
+from columnar import CAMPOS_RESULTADO_ANUAL
+
+# Variables de ResultadoAnual con estadísticas en ResultadoMonteCarloAnual (todas las que se siguen)
+VARIABLES_ESTADISTICAS = [
+    'ingresos_totales',
+    'gastos_totales',
+    'deficit_superavit',
+    'deuda_total',
+    'deuda_pib_ratio',
+    'rin',
+    'rin_meses_importacion',
+    'deficit_pib_ratio',
+    'presion_tributaria',
+    'ing_gas',
+    'ing_mineria_total',
+    'ing_iva',
+    'ing_iue',
+    'gasto_subsidio_combustibles',
+    'delta_deuda_externa',
+    'delta_deuda_interna',
+    'deuda_externa_pib',
+    'deuda_interna_pib',
+    'ratio_externa_total',
+    'ratio_interna_total',
+    'intereses_ingresos_ratio',
+]
+
+# Variables de ResultadoAnual que se siguen en Monte Carlo
+VARIABLES_MONTE_CARLO = list(VARIABLES_ESTADISTICAS)
+
+# Distribución de ResultadoMonteCarloAnual -> variable de ResultadoAnual
+DISTRIBUCIONES = {
+    'distribucion_deficit': 'deficit_superavit',
+    'distribucion_deuda_pib': 'deuda_pib_ratio',
+    'distribucion_rin': 'rin',
+    'distribucion_delta_deuda_externa': 'delta_deuda_externa',
+    'distribucion_delta_deuda_interna': 'delta_deuda_interna',
+    'distribucion_deuda_externa_pib': 'deuda_externa_pib',
+    'distribucion_deuda_interna_pib': 'deuda_interna_pib',
+    'distribucion_ratio_externa_total': 'ratio_externa_total',
+    'distribucion_ratio_interna_total': 'ratio_interna_total',
+    'distribucion_intereses_ingresos_ratio': 'intereses_ingresos_ratio',
+}
+
+MODOS_ESTADISTICAS = ('exacto', 'streaming')
+
+# progreso(trayectorias procesadas, estado en línea o None en modo exacto)
+CallbackProgreso = Callable[[int, Optional[EstadoStreaming]], None]
+
+
+def estadisticas_parciales(
+    estado: EstadoStreaming,
+    variables: Optional[Sequence[str]] = None,
+    ano_inicial: int = 2020
+) -> List[EstadisticasParcialesAnual]:
+    """
+    Estadísticas por año de una corrida en curso, a partir de sus acumuladores en línea
+    (por defecto, de todas las variables seguidas)
+    """
+    if variables is None:
+        variables = list(estado.acumuladores)
+    return [
+        EstadisticasParcialesAnual(
+            ano=ano_inicial + ano_idx,
+            estadisticas={campo: estado.acumuladores[campo].estadisticas(ano_idx) for campo in variables}
+        )
+        for ano_idx in range(estado.anos)
+    ]
+
+
+def _variables_seguidas(bloque: Dict[str, np.ndarray], variables: Sequence[str]) -> Dict[str, np.ndarray]:
+    # Sin los campos que solo van al almacén de trayectorias (conserva 'controles')
+    return {campo: valores for campo, valores in bloque.items() if campo in variables or campo == 'controles'}
+
+
+def _num_trayectorias(bloque: Dict[str, np.ndarray]) -> int:
+    return len(next(iter(bloque.values())))
+
+
+def variables_reportadas(variables: Optional[Sequence[str]], analitico: bool) -> List[str]:
+    """
+    Variables con estadísticas en ResultadoMonteCarloAnual
+    
+    Args:
+        variables: Variables pedidas; None o vacío son todas las de VARIABLES_ESTADISTICAS
+            (y en modo analítico también CAMPOS_SOLO_ANALITICOS)
+        analitico: Modo analítico
+        
+    Raises:
+        ValueError: Si una variable no existe o solo está disponible en modo analítico
+    """
+    disponibles = VARIABLES_ESTADISTICAS + (CAMPOS_SOLO_ANALITICOS if analitico else [])
+    if not variables:
+        return list(disponibles)
+    for variable in variables:
+        if variable in CAMPOS_SOLO_ANALITICOS and not analitico:
+            raise ValueError(f"La variable {variable} solo está disponible con analitico=true")
+        if variable not in disponibles:
+            raise ValueError(f"Variable desconocida: {variable}")
+    return list(dict.fromkeys(variables))
+
+
+def _distribuidas(variables: Sequence[str]) -> List[str]:
+    # Variables de DISTRIBUCIONES entre las pedidas, en el orden de DISTRIBUCIONES
+    return [campo for campo in DISTRIBUCIONES.values() if campo in variables]
+
+
+def validar_corrida_extensible(metodo_muestreo: str, reduccion_varianza: str, num_simulaciones: int) -> None:
+    """
+    Verifica que una corrida (o una extensión) se pueda continuar en línea
+    
+    Raises:
+        ValueError: Si el método no admite agregar trayectorias
+    """
+    if metodo_muestreo == 'lhs':
+        raise ValueError("El hipercubo latino estratifica la corrida completa; no se puede extender")
+    if reduccion_varianza == 'variables_control':
+        raise ValueError("Las variables de control no se pueden extender en línea")
+    if reduccion_varianza == 'antiteticas' and num_simulaciones % 2:
+        raise ValueError("Con variables antitéticas el número de simulaciones debe ser par")
 
 class SimuladorFiscalBolivia:
     """
@@ -11,8 +147,15 @@ class SimuladorFiscalBolivia:
     Calcula proyecciones fiscales año por año con relaciones causa-efecto
     """
     
-    def __init__(self, parametros: ParametrosSimulacion):
+    def __init__(self, parametros: ParametrosSimulacion, semilla: Optional[int] = None):
+        """
+        Args:
+            parametros: Parámetros de la simulación
+            semilla: Semilla raíz; cada grupo de trayectorias usa su propio subflujo derivado de ella.
+                Si es None se genera una y queda registrada en el resultado.
+        """
         self.parametros = parametros
+        self.semilla = semilla if semilla is not None else nueva_semilla()
         self.pasos: List[PasoSimulacion] = []
         
     def _simular_anio(self, ano_numero: int, estado_anterior: Optional[ResultadoAnual]) -> ResultadoAnual:
@@ -63,14 +206,13 @@ class SimuladorFiscalBolivia:
         rin_meses = deficit_deuda['rin'] / importaciones_mensuales_usd if importaciones_mensuales_usd > 0 else 0
         
         # Alertas
-        if deuda_pib > 70:
-            cambios.append(f"⚠️ Deuda/PIB {deuda_pib:.1f}% supera límite prudencial")
-        if deficit_pib > 5:
-            cambios.append(f"⚠️ Déficit/PIB {deficit_pib:.1f}% elevado")
-        if gastos['subsidio_hidrocarburos'] > ingresos['gas_total']:
-            cambios.append(f"⚠️ Subsidios ({gastos['subsidio_hidrocarburos']:.0f}M) superan ingresos gas")
-        if rin_meses < 3:
-            cambios.append(f"⚠️ RIN ({rin_meses:.1f} meses) por debajo del mínimo recomendado")
+        cambios.extend(generar_alertas(
+            deuda_pib,
+            deficit_pib,
+            gastos['subsidio_hidrocarburos'],
+            ingresos['gas_total'],
+            rin_meses
+        ))
         
         # Registrar paso
         self.pasos.append(PasoSimulacion(
@@ -141,12 +283,14 @@ class SimuladorFiscalBolivia:
             cambios=cambios
         )
     
-    def simular(self, anos: int) -> ResultadoSimulacion:
+    def simular(self, anos: int, trayectoria: int = 0) -> ResultadoSimulacion:
         """
         Ejecuta simulación completa para múltiples años
         
         Args:
             anos: Número de años a simular
+            trayectoria: Índice de la trayectoria a usar (en el subflujo de su grupo); con la misma semilla
+                reproduce la trayectoria con ese índice de simular_monte_carlo
             
         Returns:
             ResultadoSimulacion con resultados y pasos
@@ -154,152 +298,712 @@ class SimuladorFiscalBolivia:
         self.pasos = []
         resultados: List[ResultadoAnual] = []
         
-        for i in range(anos):
-            estado_anterior = resultados[-1] if resultados else None
-            resultado = self._simular_anio(i, estado_anterior)
-            resultados.append(resultado)
+        generador = generador_trayectoria(self.semilla, trayectoria, (anos, NUM_FACTORES))
+        with usar_generador(generador):
+            for i in range(anos):
+                estado_anterior = resultados[-1] if resultados else None
+                resultado = self._simular_anio(i, estado_anterior)
+                resultados.append(resultado)
         
         return ResultadoSimulacion(
             resultados=resultados,
-            pasos=self.pasos
+            pasos=self.pasos,
+            semilla=self.semilla
         )
     
-    def simular_monte_carlo(self, anos: int, num_simulaciones: int = 1000) -> 'ResultadoMonteCarloComplete':
+    def simular_monte_carlo(
+        self,
+        anos: int,
+        num_simulaciones: int = 1000,
+        paralelo: bool = False,
+        num_procesos: Optional[int] = None,
+        metodo_muestreo: str = 'pseudo',
+        reduccion_varianza: str = 'ninguna',
+        analitico: bool = False,
+        modo_estadisticas: str = 'exacto',
+        guardar: bool = False,
+        progreso: Optional[CallbackProgreso] = None,
+        tamano_bloque: int = TAMANO_BLOQUE,
+        cancelacion: Optional[TokenCancelacion] = None,
+        distribuciones: str = 'histograma',
+        num_bins: int = NUM_BINS_HISTOGRAMA,
+        columnar: bool = False,
+        umbrales: Sequence[str] = (),
+        guardar_trayectorias: bool = False,
+        variables: Optional[Sequence[str]] = None
+    ) -> Union['ResultadoMonteCarloComplete', ColumnasMonteCarlo]:
         """
         Ejecuta múltiples simulaciones Monte Carlo para obtener distribuciones de probabilidad
-        OPTIMIZADO con NumPy para mejor rendimiento
+        Todas las trayectorias se calculan en bloque con el motor vectorizado (vectorized_model)
         
         Args:
             anos: Número de años a simular
             num_simulaciones: Número de simulaciones a ejecutar (default: 1000)
+            paralelo: Repartir las trayectorias en bloques sobre el pool de procesos
+            num_procesos: Procesos entre los que se reparten los bloques (default: núcleos)
+            metodo_muestreo: 'pseudo', 'sobol' o 'lhs' (ver stochastic.generar_normales_bloque)
+            reduccion_varianza: 'ninguna', 'antiteticas' (pares Z, -Z) o 'variables_control'
+                (la media se ajusta con controles de media conocida; ver variance_reduction)
+            analitico: Calcular en forma cerrada las estadísticas de los componentes lineales en Z
+                (ver analytic); solo se siguen las trayectorias de las variables no lineales y, si
+                todas las pedidas son lineales (y no hay umbrales ni nada que guardar), no se simula
+            modo_estadisticas: 'exacto' (todas las trayectorias en memoria) o 'streaming'
+                (bloques con acumuladores en línea, memoria constante; ver streaming_stats)
+            guardar: Guardar el estado de la corrida para extenderla después
+                (ver extender_monte_carlo); el id queda en `id_corrida`
+            progreso: Se llama con las trayectorias procesadas y el estado en línea tras cada
+                bloque (en modo exacto, sin estado); si lanza una excepción la corrida se interrumpe
+            tamano_bloque: Trayectorias por bloque (en modo exacto en serie, a lo sumo TAMANO_BLOQUE)
+            cancelacion: Token que se verifica antes de empezar y entre bloques
+            distribuciones: 'histograma', 'cuantiles', 'histograma_cuantiles' o 'muestras'
+                (trayectorias completas; ver distributions)
+            num_bins: Intervalos de los histogramas
+            columnar: Devolver ColumnasMonteCarlo (arrays tipados para .npz o Arrow, sin modelos
+                Pydantic ni trayectoria representativa; ver binary_formats)
+            umbrales: Umbrales de riesgo además de las alertas del modelo, p. ej. 'deuda_pib_ratio>60'
+                (probabilidades de violación y VaR/CVaR en `riesgo`; ver tail_risk)
+            guardar_trayectorias: Guardar todos los campos de todas las trayectorias en un archivo
+                mapeado en memoria (ver path_store); el id queda en `id_trayectorias`
+            variables: Variables a reportar (ver variables_reportadas); por defecto, todas
+            
+        Raises:
+            CorridaCancelada: Si el token se cancela durante la corrida
+            ValueError: Si el tensor de trayectorias no cabe en el almacén o una variable no existe
             
         Returns:
-            ResultadoMonteCarloComplete con estadísticas y distribuciones
+            ResultadoMonteCarloComplete con estadísticas y distribuciones (o ColumnasMonteCarlo)
         """
+        if modo_estadisticas not in MODOS_ESTADISTICAS:
+            raise ValueError(f"Modo de estadísticas desconocido: {modo_estadisticas}")
+        validar_distribuciones(distribuciones, num_bins)
+        reglas = reglas_riesgo(umbrales, VARIABLES_MONTE_CARLO)
+        riesgo = AcumuladorRiesgo(reglas, anos)
+        if guardar:
+            validar_corrida_extensible(metodo_muestreo, reduccion_varianza, num_simulaciones)
         
-        # Almacenar todas las simulaciones
-        todas_las_simulaciones: List[List[ResultadoAnual]] = []
-        
-        print(f"Ejecutando {num_simulaciones} simulaciones Monte Carlo (OPTIMIZADO)...")
-        
-        # Esto es mucho más rápido que usar listas de Python
-        variables_tracking = {
-            'ingresos_totales': np.zeros((num_simulaciones, anos)),
-            'gastos_totales': np.zeros((num_simulaciones, anos)),
-            'deficit_superavit': np.zeros((num_simulaciones, anos)),
-            'deuda_total': np.zeros((num_simulaciones, anos)),
-            'deuda_pib_ratio': np.zeros((num_simulaciones, anos)),
-            'rin': np.zeros((num_simulaciones, anos)),
-            'rin_meses_importacion': np.zeros((num_simulaciones, anos)),
-            'deficit_pib_ratio': np.zeros((num_simulaciones, anos)),
-            'presion_tributaria': np.zeros((num_simulaciones, anos)),
-            'ing_gas': np.zeros((num_simulaciones, anos)),
-            'ing_mineria_total': np.zeros((num_simulaciones, anos)),
-            'ing_iva': np.zeros((num_simulaciones, anos)),
-            'ing_iue': np.zeros((num_simulaciones, anos)),
-            'gasto_subsidio_combustibles': np.zeros((num_simulaciones, anos)),
-            'delta_deuda_externa': np.zeros((num_simulaciones, anos)),
-            'delta_deuda_interna': np.zeros((num_simulaciones, anos)),
-            'deuda_externa_pib': np.zeros((num_simulaciones, anos)),
-            'deuda_interna_pib': np.zeros((num_simulaciones, anos)),
-            'ratio_externa_total': np.zeros((num_simulaciones, anos)),
-            'ratio_interna_total': np.zeros((num_simulaciones, anos)),
-            'intereses_ingresos_ratio': np.zeros((num_simulaciones, anos)),
-        }
-        
-        simulacion_representativa = None
-        
-        for sim_num in range(num_simulaciones):
-            # Ejecutar una simulación completa
-            resultado = self.simular(anos)
-            
-            # Extraer solo las métricas necesarias (no todo el objeto)
-            for ano_idx, resultado_ano in enumerate(resultado.resultados):
-                variables_tracking['ingresos_totales'][sim_num, ano_idx] = resultado_ano.ingresos_totales
-                variables_tracking['gastos_totales'][sim_num, ano_idx] = resultado_ano.gastos_totales
-                variables_tracking['deficit_superavit'][sim_num, ano_idx] = resultado_ano.deficit_superavit
-                variables_tracking['deuda_total'][sim_num, ano_idx] = resultado_ano.deuda_total
-                variables_tracking['deuda_pib_ratio'][sim_num, ano_idx] = resultado_ano.deuda_pib_ratio
-                variables_tracking['rin'][sim_num, ano_idx] = resultado_ano.rin
-                variables_tracking['rin_meses_importacion'][sim_num, ano_idx] = resultado_ano.rin_meses_importacion
-                variables_tracking['deficit_pib_ratio'][sim_num, ano_idx] = resultado_ano.deficit_pib_ratio
-                variables_tracking['presion_tributaria'][sim_num, ano_idx] = resultado_ano.presion_tributaria
-                variables_tracking['ing_gas'][sim_num, ano_idx] = resultado_ano.ing_gas
-                variables_tracking['ing_mineria_total'][sim_num, ano_idx] = resultado_ano.ing_mineria_total
-                variables_tracking['ing_iva'][sim_num, ano_idx] = resultado_ano.ing_iva
-                variables_tracking['ing_iue'][sim_num, ano_idx] = resultado_ano.ing_iue
-                variables_tracking['gasto_subsidio_combustibles'][sim_num, ano_idx] = resultado_ano.gasto_subsidio_combustibles
-                variables_tracking['delta_deuda_externa'][sim_num, ano_idx] = resultado_ano.delta_deuda_externa
-                variables_tracking['delta_deuda_interna'][sim_num, ano_idx] = resultado_ano.delta_deuda_interna
-                variables_tracking['deuda_externa_pib'][sim_num, ano_idx] = resultado_ano.deuda_externa_pib
-                variables_tracking['deuda_interna_pib'][sim_num, ano_idx] = resultado_ano.deuda_interna_pib
-                variables_tracking['ratio_externa_total'][sim_num, ano_idx] = resultado_ano.ratio_externa_total
-                variables_tracking['ratio_interna_total'][sim_num, ano_idx] = resultado_ano.ratio_interna_total
-                variables_tracking['intereses_ingresos_ratio'][sim_num, ano_idx] = resultado_ano.intereses_ingresos_ratio
+        # Variables pedidas: las lineales salen de la forma cerrada; se siguen las no lineales
+        # y las que necesitan las reglas de riesgo
+        reportadas = variables_reportadas(variables, analitico)
+        exactas = campos_monte_carlo_analiticos(self.parametros) if analitico else []
+        muestreadas = [campo for campo in reportadas if campo not in exactas]
+        necesarias = set(muestreadas) | set(variables_riesgo(reglas))
+        seguidas = [campo for campo in VARIABLES_MONTE_CARLO if campo in necesarias]
+        distribuidas = _distribuidas(muestreadas)
+        
+        if cancelacion is not None:
+            cancelacion.verificar()
+        
+        if not muestreadas and not (umbrales or guardar or guardar_trayectorias):
+            # Todas las variables pedidas tienen forma cerrada: no se simula ninguna trayectoria
+            print(f"Monte Carlo analítico: {len(reportadas)} variables en forma cerrada, sin muestreo")
+            metodo = "Analítico (forma cerrada en Z), sin muestreo"
+            if columnar:
+                columnas = self._armar_columnas(
+                    anos, num_simulaciones, None, {}, True, distribuciones, num_bins, variables=reportadas
+                )
+                columnas.metadatos.update(metodo=metodo, metodo_muestreo=metodo_muestreo)
+                return columnas
+            resultado = self._armar_resultado(
+                anos, num_simulaciones, None, {}, [], True, distribuciones, num_bins, variables=reportadas
+            )
+            resultado.metodo = metodo
+            resultado.metodo_muestreo = metodo_muestreo
+            return resultado
+        
+        print(f"Ejecutando {num_simulaciones} simulaciones Monte Carlo (vectorizado{', paralelo' if paralelo else ''}, {modo_estadisticas})...")
+        
+        # Entre bloques: verificar la cancelación y reportar el avance
+        def avance(procesadas: int, estado: Optional[EstadoStreaming]) -> None:
+            if cancelacion is not None:
+                cancelacion.verificar()
+            if progreso is not None:
+                progreso(procesadas, estado)
+        
+        # Tensor completo de trayectorias en disco (todos los campos; ver path_store)
+        escritor: Optional[EscritorTrayectorias] = None
+        if guardar_trayectorias:
+            escritor = almacen_trayectorias.crear(CAMPOS_RESULTADO_ANUAL, anos, num_simulaciones, {
+                'semilla': self.semilla,
+                'metodo_muestreo': metodo_muestreo,
+                'reduccion_varianza': reduccion_varianza,
+                'modo_estadisticas': modo_estadisticas,
+                'ano_inicial': 2020,
+            })
+        
+        try:
+            if modo_estadisticas == 'streaming':
+                estadisticas, muestras, simulacion_representativa, resultado_reduccion, estado = self._monte_carlo_streaming(
+                    anos, num_simulaciones, paralelo, num_procesos, metodo_muestreo, reduccion_varianza,
+                    tamano_bloque, progreso=avance, representativa=not columnar, riesgo=riesgo,
+                    escritor=escritor, variables=seguidas, variables_muestra=distribuidas
+                )
+                acumuladores = estado.acumuladores
+                vectorizadas = None
+            else:
+                # La grilla de cuantiles sale de la misma pasada que las estadísticas
+                estadisticas, muestras, simulacion_representativa, resultado_reduccion, vectorizadas = self._monte_carlo_exacto(
+                    anos, num_simulaciones, paralelo, num_procesos, metodo_muestreo, reduccion_varianza, avance,
+                    min(tamano_bloque, TAMANO_BLOQUE), representativa=not columnar,
+                    probabilidades_extra=PROBABILIDADES_CUANTILES if 'cuantiles' in distribuciones else (),
+                    escritor=escritor, variables=seguidas
+                )
+                acumuladores = None
+                if guardar:
+                    # La corrida se extiende en línea: se guardan los acumuladores de todas las trayectorias
+                    estado = EstadoStreaming(
+                        seguidas, anos, reduccion_varianza == 'antiteticas', distribuidas, riesgo
+                    )
+                    estado.actualizar(muestras)
+                else:
+                    riesgo.actualizar(muestras)
+        except BaseException:
+            if escritor is not None:
+                escritor.descartar()
+            raise
+        id_trayectorias = escritor.cerrar() if escritor is not None else None
+        resultado_riesgo = resumir_riesgo(riesgo, muestras, acumuladores)
+        
+        # Sin mención del paralelismo: el resultado es idéntico en serie y en paralelo, y el
+        # cache y la coalescencia comparten la respuesta entre ambos
+        metodo = (
+            f"Monte Carlo vectorizado con NumPy, muestreo {metodo_muestreo}"
+            + (", componentes lineales analíticos" if analitico else "")
+            + (", estadísticas en línea" if modo_estadisticas == 'streaming' else "")
+        )
+        id_corrida: Optional[str] = None
+        if guardar:
+            corrida = CorridaMonteCarlo(
+                self.parametros, self.semilla, anos, metodo_muestreo, reduccion_varianza, analitico, estado,
+                variables=reportadas
+            )
+            guardar_corrida(corrida)
+            id_corrida = corrida.id_corrida
+        
+        if columnar:
+            columnas = self._armar_columnas(
+                anos, num_simulaciones, estadisticas, muestras, analitico, distribuciones, num_bins, acumuladores,
+                vectorizadas, reportadas
+            )
+            columnas.agregar_riesgo(resultado_riesgo)
+            columnas.metadatos.update(
+                metodo=metodo,
+                metodo_muestreo=metodo_muestreo,
+                reduccion_varianza=resultado_reduccion.model_dump() if resultado_reduccion else None,
+                id_corrida=id_corrida,
+                id_trayectorias=id_trayectorias
+            )
+            print(f"✓ Monte Carlo completado: {num_simulaciones} simulaciones")
+            return columnas
+        
+        resultado = self._armar_resultado(
+            anos, num_simulaciones, estadisticas, muestras, simulacion_representativa, analitico,
+            distribuciones, num_bins, acumuladores, vectorizadas, reportadas
+        )
+        resultado.metodo = metodo
+        resultado.metodo_muestreo = metodo_muestreo
+        resultado.reduccion_varianza = resultado_reduccion
+        resultado.id_corrida = id_corrida
+        resultado.riesgo = resultado_riesgo
+        resultado.id_trayectorias = id_trayectorias
+        
+        print(f"✓ Monte Carlo completado: {num_simulaciones} simulaciones")
+        return resultado
+    
+    def extender_monte_carlo(
+        self,
+        corrida: CorridaMonteCarlo,
+        num_adicionales: int,
+        paralelo: bool = False,
+        num_procesos: Optional[int] = None,
+        distribuciones: str = 'histograma',
+        num_bins: int = NUM_BINS_HISTOGRAMA
+    ) -> 'ResultadoMonteCarloComplete':
+        """
+        Agrega trayectorias a una corrida guardada sin recalcular las anteriores
+        
+        Las trayectorias nuevas son las que siguen en la misma semilla (índices
+        [n, n + num_adicionales)), así que el resultado equivale al de una corrida
+        de n + num_adicionales trayectorias en modo streaming. Las trayectorias
+        nuevas se combinan en una copia del estado, que reemplaza al de la corrida
+        guardada solo si la extensión termina (una extensión cancelada o fallida
+        deja la corrida como estaba).
+        
+        Args:
+            corrida: Corrida guardada (runs.obtener_corrida); el simulador debe usar
+                sus parámetros y su semilla
+            num_adicionales: Trayectorias a agregar
+            paralelo: Repartir los bloques nuevos en el pool de procesos
+            num_procesos: Procesos del pool a usar (default: núcleos)
+            distribuciones, num_bins: Formato de las distribuciones (como en simular_monte_carlo)
             
-            # Guardar la simulación del medio como representativa
-            if sim_num == num_simulaciones // 2:
-                simulacion_representativa = resultado.resultados
+        Returns:
+            ResultadoMonteCarloComplete con num_simulaciones = total acumulado
+        """
+        validar_corrida_extensible(corrida.metodo_muestreo, corrida.reduccion_varianza, num_adicionales)
+        validar_distribuciones(distribuciones, num_bins)
+        # Una extensión a la vez por corrida
+        with corrida.lock:
+            total = corrida.estado.num_trayectorias + num_adicionales
+            print(f"Extendiendo corrida {corrida.id_corrida} a {total} simulaciones...")
+            estadisticas, muestras, simulacion_representativa, resultado_reduccion, estado = self._monte_carlo_streaming(
+                corrida.anos, total, paralelo, num_procesos, corrida.metodo_muestreo, corrida.reduccion_varianza,
+                estado=copy.deepcopy(corrida.estado)
+            )
+            resultado = self._armar_resultado(
+                corrida.anos, estado.num_trayectorias, estadisticas, muestras, simulacion_representativa,
+                corrida.analitico, distribuciones, num_bins, estado.acumuladores,
+                variables=corrida.variables
+            )
+            # Umbrales de la corrida original
+            if estado.riesgo is not None:
+                resultado.riesgo = resumir_riesgo(estado.riesgo, acumuladores=estado.acumuladores)
+            corrida.estado = estado
+            guardar_corrida(corrida)
+        
+        resultado.metodo = (
+            f"Monte Carlo vectorizado con NumPy, muestreo {corrida.metodo_muestreo}"
+            + (", componentes lineales analíticos" if corrida.analitico else "")
+            + ", estadísticas en línea, corrida extendida"
+        )
+        resultado.metodo_muestreo = corrida.metodo_muestreo
+        resultado.reduccion_varianza = resultado_reduccion
+        resultado.id_corrida = corrida.id_corrida
+        
+        print(f"✓ Corrida extendida: {estado.num_trayectorias} simulaciones")
+        return resultado
+    
+    def simular_monte_carlo_adaptativo(
+        self,
+        anos: int,
+        tolerancias: List[ToleranciaMonteCarlo],
+        max_simulaciones: int = 100000,
+        nivel_confianza: float = 0.95,
+        reduccion_varianza: str = 'ninguna',
+        paralelo: bool = False,
+        num_procesos: Optional[int] = None,
+        analitico: bool = False,
+        cancelacion: Optional[TokenCancelacion] = None,
+        distribuciones: str = 'histograma',
+        num_bins: int = NUM_BINS_HISTOGRAMA,
+        umbrales: Sequence[str] = ()
+    ) -> 'ResultadoMonteCarloComplete':
+        """
+        Monte Carlo que agrega lotes de trayectorias hasta que los intervalos de confianza
+        cumplen las tolerancias pedidas o se agota max_simulaciones (ver adaptive)
+        
+        Usa muestreo pseudo (los intervalos suponen trayectorias independientes) y
+        estadísticas en línea. Con la misma semilla, las primeras n trayectorias son
+        las mismas que en una corrida fija de n trayectorias.
+        
+        Args:
+            anos: Número de años a simular
+            tolerancias: Semiancho objetivo por variable, estadístico y año
+            max_simulaciones: Presupuesto de trayectorias
+            nivel_confianza: Nivel de los intervalos (default: 0.95)
+            reduccion_varianza: 'ninguna' o 'antiteticas'
+            paralelo: Repartir los lotes en el pool de procesos
+            num_procesos: Procesos del pool a usar (default: núcleos)
+            analitico: Estadísticas exactas para los componentes lineales en Z
+            cancelacion: Token que se verifica entre lotes
+            distribuciones, num_bins: Formato de las distribuciones (como en simular_monte_carlo)
+            umbrales: Umbrales de riesgo adicionales (como en simular_monte_carlo)
             
-            if (sim_num + 1) % 50 == 0 or sim_num == 0:
-                print(f"  Completadas {sim_num + 1}/{num_simulaciones} simulaciones")
+        Returns:
+            ResultadoMonteCarloComplete con num_simulaciones = trayectorias usadas y el
+            resumen en `adaptativo`
+        
+        Raises:
+            CorridaCancelada: Si el token se cancela durante la corrida
+        """
+        validar_distribuciones(distribuciones, num_bins)
+        riesgo = AcumuladorRiesgo(reglas_riesgo(umbrales, VARIABLES_MONTE_CARLO), anos)
+        print(f"Ejecutando Monte Carlo adaptativo (hasta {max_simulaciones} simulaciones)...")
+        
+        intervalos: List[IntervaloConfianza] = []
+        
+        def cumple_tolerancias(estado: EstadoStreaming) -> bool:
+            if cancelacion is not None:
+                cancelacion.verificar()
+            intervalos[:] = evaluar_tolerancias(
+                tolerancias, estado.acumuladores, anos, nivel_confianza, estado.momentos_pares
+            )
+            return all(intervalo.cumple for intervalo in intervalos)
+        
+        estadisticas, muestras, simulacion_representativa, resultado_reduccion, estado = self._monte_carlo_streaming(
+            anos, max_simulaciones, paralelo, num_procesos, 'pseudo', reduccion_varianza,
+            TAMANO_LOTE_ADAPTATIVO, cumple_tolerancias, riesgo=riesgo
+        )
+        
+        num_usadas = estado.num_trayectorias
+        resultado = self._armar_resultado(
+            anos, num_usadas, estadisticas, muestras, simulacion_representativa, analitico,
+            distribuciones, num_bins, estado.acumuladores
+        )
+        resultado.metodo = (
+            "Monte Carlo adaptativo vectorizado con NumPy, estadísticas en línea"
+            + (", componentes lineales analíticos" if analitico else "")
+        )
+        resultado.reduccion_varianza = resultado_reduccion
+        resultado.riesgo = resumir_riesgo(riesgo, acumuladores=estado.acumuladores)
+        resultado.adaptativo = ResultadoAdaptativo(
+            convergencia=all(intervalo.cumple for intervalo in intervalos),
+            nivel_confianza=nivel_confianza,
+            max_simulaciones=max_simulaciones,
+            intervalos=intervalos
+        )
+        
+        print(f"✓ Monte Carlo adaptativo completado: {num_usadas} simulaciones")
+        return resultado
+    
+    def _armar_resultado(
+        self,
+        anos: int,
+        num_simulaciones: int,
+        estadisticas,
+        muestras: Dict[str, np.ndarray],
+        simulacion_representativa: List[ResultadoAnual],
+        analitico: bool,
+        distribuciones: str = 'histograma',
+        num_bins: int = NUM_BINS_HISTOGRAMA,
+        acumuladores: Optional[Dict[str, EstadisticasOnline]] = None,
+        vectorizadas: Optional[EstadisticasVectorizadas] = None,
+        variables: Optional[Sequence[str]] = None
+    ) -> 'ResultadoMonteCarloComplete':
+        """
+        Arma ResultadoMonteCarloComplete a partir de las estadísticas (campo, año) y las distribuciones
+        
+        Args:
+            estadisticas: (campo, año) -> EstadisticasVariable de las variables muestreadas
+                (None si todas las variables tienen forma cerrada)
+            muestras: Trayectorias por variable (N, anos); en modo streaming, las del primer bloque
+            distribuciones, num_bins: Formato de las distribuciones (ver distributions)
+            acumuladores: En modo streaming, los histogramas y cuantiles salen de los acumuladores
+                (la corrida completa) y no de la muestra
+            vectorizadas: En modo exacto, estadísticas ya calculadas (los cuantiles se reutilizan)
+            variables: Variables reportadas (default: variables_reportadas(None, analitico))
+        """
+        if variables is None:
+            variables = variables_reportadas(None, analitico)
+        # Componentes lineales con estadísticas exactas
+        analiticos: Optional[Dict[str, EstadisticasVariable]] = None
+        campos_exactos: List[str] = []
+        if analitico:
+            analiticos = componentes_analiticos(self.parametros, num_simulaciones)
+            campos_exactos = campos_monte_carlo_analiticos(self.parametros)
+        distribuidas = _distribuidas([campo for campo in variables if campo not in campos_exactos])
+        
+        resumen = resumir_distribuciones(
+            distribuidas, anos, distribuciones, num_bins, muestras, acumuladores, vectorizadas
+        )
         
         resultados_mc: List[ResultadoMonteCarloAnual] = []
         
+        # Salida del motor: los modelos se arman sin validar (ver serialization)
         for ano_idx in range(anos):
-            ano_actual = 2020 + ano_idx
-            
-            def calcular_estadisticas_rapido(datos_col: np.ndarray) -> EstadisticasVariable:
-                return EstadisticasVariable(
-                    promedio=float(np.mean(datos_col)),
-                    mediana=float(np.median(datos_col)),
-                    desviacion_estandar=float(np.std(datos_col)),
-                    percentil_5=float(np.percentile(datos_col, 5)),
-                    percentil_25=float(np.percentile(datos_col, 25)),
-                    percentil_75=float(np.percentile(datos_col, 75)),
-                    percentil_95=float(np.percentile(datos_col, 95)),
-                    minimo=float(np.min(datos_col)),
-                    maximo=float(np.max(datos_col))
-                )
-            
-            resultado_mc_ano = ResultadoMonteCarloAnual(
-                ano=ano_actual,
-                ingresos_totales=calcular_estadisticas_rapido(variables_tracking['ingresos_totales'][:, ano_idx]),
-                gastos_totales=calcular_estadisticas_rapido(variables_tracking['gastos_totales'][:, ano_idx]),
-                deficit_superavit=calcular_estadisticas_rapido(variables_tracking['deficit_superavit'][:, ano_idx]),
-                deuda_total=calcular_estadisticas_rapido(variables_tracking['deuda_total'][:, ano_idx]),
-                deuda_pib_ratio=calcular_estadisticas_rapido(variables_tracking['deuda_pib_ratio'][:, ano_idx]),
-                rin=calcular_estadisticas_rapido(variables_tracking['rin'][:, ano_idx]),
-                rin_meses_importacion=calcular_estadisticas_rapido(variables_tracking['rin_meses_importacion'][:, ano_idx]),
-                deficit_pib_ratio=calcular_estadisticas_rapido(variables_tracking['deficit_pib_ratio'][:, ano_idx]),
-                presion_tributaria=calcular_estadisticas_rapido(variables_tracking['presion_tributaria'][:, ano_idx]),
-                ing_gas=calcular_estadisticas_rapido(variables_tracking['ing_gas'][:, ano_idx]),
-                ing_mineria_total=calcular_estadisticas_rapido(variables_tracking['ing_mineria_total'][:, ano_idx]),
-                ing_iva=calcular_estadisticas_rapido(variables_tracking['ing_iva'][:, ano_idx]),
-                ing_iue=calcular_estadisticas_rapido(variables_tracking['ing_iue'][:, ano_idx]),
-                gasto_subsidio_combustibles=calcular_estadisticas_rapido(variables_tracking['gasto_subsidio_combustibles'][:, ano_idx]),
-                # Distribuciones completas para histogramas (convertir a lista)
-                distribucion_deficit=variables_tracking['deficit_superavit'][:, ano_idx].tolist(),
-                distribucion_deuda_pib=variables_tracking['deuda_pib_ratio'][:, ano_idx].tolist(),
-                distribucion_rin=variables_tracking['rin'][:, ano_idx].tolist(),
-                distribucion_delta_deuda_externa=variables_tracking['delta_deuda_externa'][:, ano_idx].tolist(),
-                distribucion_delta_deuda_interna=variables_tracking['delta_deuda_interna'][:, ano_idx].tolist(),
-                distribucion_deuda_externa_pib=variables_tracking['deuda_externa_pib'][:, ano_idx].tolist(),
-                distribucion_deuda_interna_pib=variables_tracking['deuda_interna_pib'][:, ano_idx].tolist(),
-                distribucion_ratio_externa_total=variables_tracking['ratio_externa_total'][:, ano_idx].tolist(),
-                distribucion_ratio_interna_total=variables_tracking['ratio_interna_total'][:, ano_idx].tolist(),
-                distribucion_intereses_ingresos_ratio=variables_tracking['intereses_ingresos_ratio'][:, ano_idx].tolist(),
+            histogramas, cuantiles = resumen.por_ano(ano_idx)
+            resultado_mc_ano = ResultadoMonteCarloAnual.model_construct(
+                ano=2020 + ano_idx,
+                **{
+                    campo: analiticos[campo] if campo in campos_exactos else estadisticas(campo, ano_idx)
+                    for campo in variables
+                },
+                # Distribuciones completas solo si se piden (arrays, o listas sin orjson)
+                **({
+                    nombre: lista_serializable(muestras[campo][:, ano_idx])
+                    for nombre, campo in DISTRIBUCIONES.items()
+                    if nombre in ResultadoMonteCarloAnual.model_fields and campo in distribuidas
+                } if distribuciones == 'muestras' else {}),
+                histogramas=histogramas,
+                cuantiles=cuantiles,
+                estadisticas_analiticas=analiticos,
             )
             
             resultados_mc.append(resultado_mc_ano)
         
-        print(f"✓ Monte Carlo completado: {num_simulaciones} simulaciones")
-        
-        return ResultadoMonteCarloComplete(
+        return ResultadoMonteCarloComplete.model_construct(
             num_simulaciones=num_simulaciones,
             resultados_estadisticos=resultados_mc,
             simulacion_representativa=simulacion_representativa,
-            metodo="Monte Carlo optimizado con NumPy"
+            metodo="Monte Carlo vectorizado con NumPy",
+            semilla=self.semilla,
+            bordes_histogramas=(
+                {campo: bordes.tolist() for campo, bordes in resumen.bordes.items()} if resumen.bordes else None
+            ),
+            probabilidades_cuantiles=PROBABILIDADES_CUANTILES if resumen.cuantiles else None
+        )
+    
+    def _armar_columnas(
+        self,
+        anos: int,
+        num_simulaciones: int,
+        estadisticas,
+        muestras: Dict[str, np.ndarray],
+        analitico: bool,
+        distribuciones: str = 'histograma',
+        num_bins: int = NUM_BINS_HISTOGRAMA,
+        acumuladores: Optional[Dict[str, EstadisticasOnline]] = None,
+        vectorizadas: Optional[EstadisticasVectorizadas] = None,
+        variables: Optional[Sequence[str]] = None
+    ) -> ColumnasMonteCarlo:
+        """
+        Como _armar_resultado, pero en arrays tipados (ver binary_formats): las
+        distribuciones pasan directo de los arrays de seguimiento, sin listas de Python
+        """
+        if variables is None:
+            variables = variables_reportadas(None, analitico)
+        analiticos: Dict[str, EstadisticasVariable] = {}
+        campos_exactos: List[str] = []
+        if analitico:
+            analiticos = componentes_analiticos(self.parametros, num_simulaciones)
+            campos_exactos = campos_monte_carlo_analiticos(self.parametros)
+        distribuidas = _distribuidas([campo for campo in variables if campo not in campos_exactos])
+        
+        columnas = ColumnasMonteCarlo(anos)
+        for campo in variables:
+            anuales = [
+                analiticos[campo] if campo in campos_exactos else estadisticas(campo, ano_idx)
+                for ano_idx in range(anos)
+            ]
+            valores = np.array([[getattr(anual, estadistico) for estadistico in ESTADISTICOS] for anual in anuales])
+            columnas.agregar_estadisticas(campo, valores)
+        for componente, estadistica in analiticos.items():
+            # Iguales todos los años (ver analytic.componentes_analiticos)
+            fila = [getattr(estadistica, estadistico) for estadistico in ESTADISTICOS]
+            columnas.agregar_estadisticas(f"analitico.{componente}", np.tile(fila, (anos, 1)))
+        
+        resumen = resumir_distribuciones(
+            distribuidas, anos, distribuciones, num_bins, muestras, acumuladores, vectorizadas
+        )
+        for campo in distribuidas:
+            if resumen.histogramas is not None:
+                columnas.columnas[f"histograma.{campo}"] = resumen.histogramas[campo]
+                columnas.globales[f"bordes.{campo}"] = resumen.bordes[campo]
+            if resumen.cuantiles is not None:
+                columnas.columnas[f"cuantiles.{campo}"] = resumen.cuantiles[campo]
+            if distribuciones == 'muestras':
+                columnas.columnas[f"distribucion.{campo}"] = muestras[campo].T
+        if resumen.cuantiles is not None:
+            columnas.globales['probabilidades_cuantiles'] = np.array(PROBABILIDADES_CUANTILES)
+        
+        columnas.metadatos.update(num_simulaciones=num_simulaciones, semilla=self.semilla)
+        return columnas
+    
+    def _trayectoria_representativa(
+        self,
+        anos: int,
+        num_simulaciones: int,
+        metodo_muestreo: str,
+        antiteticas: bool
+    ) -> List[ResultadoAnual]:
+        """
+        Regenera y materializa la trayectoria del medio (índice N // 2) de la corrida
+        """
+        indice = num_simulaciones // 2
+        Z = generar_normales_bloque(
+            metodo_muestreo, self.semilla, indice, 1, num_simulaciones, (anos, NUM_FACTORES), antiteticas
+        )
+        return simular_lote_desde_normales(self.parametros, Z).trayectoria(0)
+    
+    def _monte_carlo_exacto(
+        self,
+        anos: int,
+        num_simulaciones: int,
+        paralelo: bool,
+        num_procesos: Optional[int],
+        metodo_muestreo: str,
+        reduccion_varianza: str,
+        progreso: Optional[CallbackProgreso] = None,
+        tamano_bloque: int = TAMANO_BLOQUE,
+        representativa: bool = True,
+        probabilidades_extra: Sequence[float] = (),
+        escritor: Optional[EscritorTrayectorias] = None,
+        variables: Sequence[str] = VARIABLES_MONTE_CARLO
+    ):
+        """
+        Corrida con todas las trayectorias en memoria: percentiles exactos
+        
+        En serie las trayectorias se simulan en bloques de tamano_bloque (entre bloques se
+        llama a progreso), con el mismo resultado que en un solo lote.
+        
+        Args:
+            representativa: Regenerar la trayectoria representativa (si no, se devuelve vacía)
+            probabilidades_extra: Cuantiles a calcular junto con las estadísticas (ver stats_kernel)
+            escritor: Si se indica, se simulan todos los campos y se escriben en el almacén de
+                trayectorias; en memoria quedan solo las variables seguidas
+            variables: Variables seguidas (con arrays y estadísticas)
+        
+        Returns:
+            (estadísticas (campo, año) -> EstadisticasVariable, distribuciones, representativa, reducción,
+            EstadisticasVectorizadas)
+        """
+        # Todas las trayectorias se evalúan en bloque: cada campo es un array (N, anos).
+        # Con muestreo pseudo la trayectoria i es una fila del subflujo de su grupo (stochastic.TRAYECTORIAS_POR_SUBFLUJO) (reproducible por separado).
+        # Con cualquier método el resultado en paralelo es idéntico al de la corrida en serie.
+        antiteticas = reduccion_varianza == 'antiteticas'
+        usar_controles = reduccion_varianza == 'variables_control'
+        simuladas = CAMPOS_RESULTADO_ANUAL if escritor is not None else variables
+        if paralelo:
+            variables_tracking = simular_monte_carlo_paralelo(
+                self.parametros, anos, num_simulaciones, self.semilla, simuladas,
+                num_procesos, metodo_muestreo, antiteticas, usar_controles,
+                None if progreso is None else lambda procesadas: progreso(procesadas, None)
+            )
+            if escritor is not None:
+                escritor.escribir(0, variables_tracking)
+                variables_tracking = _variables_seguidas(variables_tracking, variables)
+        else:
+            partes = []
+            bloques = iterar_bloques(
+                self.parametros, anos, num_simulaciones, self.semilla, simuladas, tamano_bloque,
+                metodo_muestreo=metodo_muestreo, antiteticas=antiteticas, incluir_controles=usar_controles
+            )
+            for bloque in bloques:
+                if escritor is not None:
+                    escritor.escribir(sum(_num_trayectorias(parte) for parte in partes), bloque)
+                    bloque = _variables_seguidas(bloque, variables)
+                partes.append(bloque)
+                if progreso is not None:
+                    progreso(sum(_num_trayectorias(parte) for parte in partes), None)
+            variables_tracking = {campo: np.concatenate([parte[campo] for parte in partes]) for campo in partes[0]}
+        controles = variables_tracking.pop('controles', None)
+        # La simulación del medio como representativa
+        simulacion_representativa = self._trayectoria_representativa(
+            anos, num_simulaciones, metodo_muestreo, antiteticas
+        ) if representativa else []
+        
+        # Medias con reducción de varianza y factor logrado por métrica
+        medias: Optional[Dict[str, np.ndarray]] = None
+        resultado_reduccion: Optional[ResultadoReduccionVarianza] = None
+        if reduccion_varianza != 'ninguna':
+            medias, factores = aplicar_reduccion_varianza(reduccion_varianza, variables_tracking, controles)
+            resultado_reduccion = ResultadoReduccionVarianza(modo=reduccion_varianza, factores=factores)
+        
+        # Todas las variables y años en una pasada (ver stats_kernel)
+        vectorizadas = calcular_estadisticas(variables_tracking, variables, probabilidades_extra)
+        
+        def calcular_estadisticas_rapido(campo: str, ano_idx: int) -> EstadisticasVariable:
+            return vectorizadas.estadisticas(campo, ano_idx, medias[campo][ano_idx] if medias else None)
+        
+        return calcular_estadisticas_rapido, variables_tracking, simulacion_representativa, resultado_reduccion, vectorizadas
+    
+    def _monte_carlo_streaming(
+        self,
+        anos: int,
+        num_simulaciones: int,
+        paralelo: bool,
+        num_procesos: Optional[int],
+        metodo_muestreo: str,
+        reduccion_varianza: str,
+        tamano_bloque: int = TAMANO_BLOQUE,
+        criterio_parada: Optional[Callable[[EstadoStreaming], bool]] = None,
+        estado: Optional[EstadoStreaming] = None,
+        progreso: Optional[CallbackProgreso] = None,
+        representativa: bool = True,
+        riesgo: Optional[AcumuladorRiesgo] = None,
+        escritor: Optional[EscritorTrayectorias] = None,
+        variables: Sequence[str] = VARIABLES_MONTE_CARLO,
+        variables_muestra: Optional[Sequence[str]] = None
+    ):
+        """
+        Corrida por bloques con acumuladores en línea: memoria constante en N
+        
+        Media, desviación, mínimo y máximo son exactos; los percentiles salen de un
+        t-digest. Las distribuciones devueltas son las trayectorias del primer
+        bloque (una muestra de la corrida, no la corrida completa).
+        
+        Args:
+            criterio_parada: Se evalúa tras cada bloque con el estado de la corrida;
+                si devuelve True la corrida termina antes de num_simulaciones
+            estado: Estado de una corrida previa; se continúa desde su trayectoria
+                num_trayectorias hasta num_simulaciones (con la misma semilla)
+            progreso: Se llama con las trayectorias procesadas y el estado tras cada bloque
+            representativa: Regenerar la trayectoria representativa (si no, se devuelve vacía)
+            riesgo: Acumulador de riesgo de cola para el estado nuevo (con estado, se usa el suyo)
+            escritor: Si se indica, cada bloque se simula con todos los campos y se escribe
+                en el almacén de trayectorias
+            variables: Variables seguidas en el estado nuevo (con estado, las suyas)
+            variables_muestra: Variables de la muestra del primer bloque (default: las de DISTRIBUCIONES)
+        
+        Returns:
+            (estadísticas (campo, año) -> EstadisticasVariable, distribuciones, representativa,
+            reducción, estado de la corrida)
+        """
+        if metodo_muestreo == 'lhs':
+            raise ValueError("El hipercubo latino necesita toda la corrida; no está disponible en modo streaming")
+        if reduccion_varianza == 'variables_control':
+            raise ValueError("Las variables de control no están disponibles en modo streaming")
+        antiteticas = reduccion_varianza == 'antiteticas'
+        
+        if estado is None:
+            if variables_muestra is None:
+                variables_muestra = _distribuidas(variables)
+            estado = EstadoStreaming(variables, anos, antiteticas, variables_muestra, riesgo)
+        variables = list(estado.acumuladores)
+        
+        simuladas = CAMPOS_RESULTADO_ANUAL if escritor is not None else variables
+        bloques = iterar_bloques(
+            self.parametros, anos, num_simulaciones, self.semilla, simuladas, tamano_bloque,
+            paralelo, num_procesos, metodo_muestreo, antiteticas, estado.num_trayectorias
+        )
+        with closing(bloques):
+            for bloque in bloques:
+                if escritor is not None:
+                    escritor.escribir(estado.num_trayectorias, bloque)
+                    bloque = _variables_seguidas(bloque, variables)
+                estado.actualizar(bloque)
+                if progreso is not None:
+                    progreso(estado.num_trayectorias, estado)
+                if criterio_parada is not None and criterio_parada(estado):
+                    break
+        
+        estadisticas, resultado_reduccion = self._estadisticas_estado(estado, reduccion_varianza)
+        simulacion_representativa = self._trayectoria_representativa(
+            anos, estado.num_trayectorias, metodo_muestreo, antiteticas
+        ) if representativa else []
+        return estadisticas, estado.muestra, simulacion_representativa, resultado_reduccion, estado
+    
+    def _estadisticas_estado(self, estado: EstadoStreaming, reduccion_varianza: str):
+        """
+        Estadísticas (campo, año) y factores de reducción a partir del estado en línea
+        """
+        resultado_reduccion: Optional[ResultadoReduccionVarianza] = None
+        if estado.momentos_pares:
+            factores = {
+                campo: [
+                    factor_reduccion(
+                        float(estado.acumuladores[campo].momentos.varianza[ano_idx]),
+                        2 * float(momentos.varianza[ano_idx])
+                    ) if momentos.n >= 2 else None
+                    for ano_idx in range(estado.anos)
+                ]
+                for campo, momentos in estado.momentos_pares.items()
+                if campo in METRICAS_PRINCIPALES
+            }
+            resultado_reduccion = ResultadoReduccionVarianza(modo=reduccion_varianza, factores=factores)
+        
+        def estadisticas(campo: str, ano_idx: int) -> EstadisticasVariable:
+            return estado.acumuladores[campo].estadisticas(ano_idx)
+        
+        return estadisticas, resultado_reduccion
+
+    def estadisticas_analiticas(self, anos: int, num_simulaciones: int = 1000) -> ResultadoAnalitico:
+        """
+        Estadísticas exactas de los componentes lineales del modelo, sin muestreo
+        
+        Args:
+            anos: Número de años
+            num_simulaciones: N de referencia para reportar mínimo y máximo esperados
+            
+        Returns:
+            ResultadoAnalitico con las estadísticas por año
+        """
+        componentes = componentes_analiticos(self.parametros, num_simulaciones)
+        return ResultadoAnalitico(
+            resultados=[
+                ResultadoAnaliticoAnual(ano=2020 + ano_idx, componentes=componentes)
+                for ano_idx in range(anos)
+            ],
+            metodo="Analítico (forma cerrada en Z)"
         )
 
 def aplicar_volatilidad_precios(precio_base: float, volatilidad_pct: float) -> float:
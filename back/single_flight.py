@@ -0,0 +1,96 @@
+"""
+Coalescencia de peticiones idénticas en curso (single-flight).
+
+Cuando llegan varias peticiones con la misma clave mientras la primera todavía
+se calcula, solo la primera ejecuta el cálculo y las demás esperan su
+resultado. El cálculo corre en una tarea propia: si el cliente que lo inició
+se desconecta, los demás igual reciben el resultado. Cuando ya no queda
+ninguna petición esperando, se cancela su token (ver cancellation) y el
+cálculo se detiene en el siguiente bloque.
+
+Se usa desde el event loop de FastAPI (una sola hebra), así que el diccionario
+de tareas no necesita lock.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Tuple, TypeVar
+from cancellation import TokenCancelacion
+
+T = TypeVar('T')
+
+
+class _Vuelo:
+    def __init__(self, tarea: asyncio.Future, token: TokenCancelacion):
+        self.tarea = tarea
+        self.token = token
+        self.esperando = 0
+
+
+class PeticionesEnCurso:
+    """
+    Tareas en curso por clave, compartidas entre peticiones idénticas
+    """
+
+    def __init__(self):
+        self._vuelos: Dict[str, _Vuelo] = {}
+        self.ejecutadas = 0
+        self.compartidas = 0
+        self.canceladas = 0
+
+    async def ejecutar(
+        self,
+        clave: str,
+        calcular: Callable[[TokenCancelacion], Awaitable[T]]
+    ) -> Tuple[T, bool]:
+        """
+        Resultado de calcular(token), reutilizando el cálculo en curso con la misma clave
+
+        Args:
+            clave: Identifica peticiones equivalentes (mismo resultado)
+            calcular: Corrutina que produce el resultado (solo se llama si no hay una en curso);
+                recibe el token que se cancela cuando ninguna petición espera el resultado
+
+        Returns:
+            (resultado, compartido): compartido es True si se reutilizó un cálculo en curso
+        """
+        vuelo = self._vuelos.get(clave)
+        compartido = vuelo is not None
+        if compartido:
+            self.compartidas += 1
+        else:
+            token = TokenCancelacion()
+            vuelo = _Vuelo(asyncio.ensure_future(calcular(token)), token)
+            self._vuelos[clave] = vuelo
+            vuelo.tarea.add_done_callback(lambda tarea: self._terminar(clave, vuelo))
+            self.ejecutadas += 1
+        vuelo.esperando += 1
+        try:
+            # shield: cancelar a un cliente no cancela el cálculo de los demás
+            return await asyncio.shield(vuelo.tarea), compartido
+        finally:
+            vuelo.esperando -= 1
+            if vuelo.esperando == 0 and not vuelo.tarea.done():
+                # Nadie espera el resultado: detener el cálculo y no ofrecerlo a peticiones nuevas
+                vuelo.token.cancelar("sin clientes esperando el resultado")
+                self._quitar(clave, vuelo)
+                self.canceladas += 1
+
+    def _quitar(self, clave: str, vuelo: _Vuelo) -> None:
+        if self._vuelos.get(clave) is vuelo:
+            del self._vuelos[clave]
+
+    def _terminar(self, clave: str, vuelo: _Vuelo) -> None:
+        self._quitar(clave, vuelo)
+        # Consumir la excepción de un cálculo cancelado que ya nadie espera
+        if not vuelo.tarea.cancelled():
+            vuelo.tarea.exception()
+
+    def estadisticas(self) -> Dict[str, int]:
+        return {
+            'en_curso': len(self._vuelos),
+            'ejecutadas': self.ejecutadas,
+            'compartidas': self.compartidas,
+            'canceladas': self.canceladas,
+        }
+
+
+peticiones_en_curso = PeticionesEnCurso()
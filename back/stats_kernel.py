@@ -0,0 +1,106 @@
+"""
+Estadísticas de Monte Carlo en una sola pasada vectorizada.
+
+Todas las variables seguidas se apilan en un tensor (variables, anos,
+trayectorias) y cada resumen sale de una sola operación sobre el último eje:
+media, desviación, mínimo, máximo y todos los cuantiles (los de
+EstadisticasVariable más una lista arbitraria) con un único np.quantile, que
+particiona cada columna una vez en lugar de ordenarla en cada percentil.
+
+Cada columna queda contigua en el tensor: las medias y desviaciones usan la
+suma por pares de NumPy sobre la columna completa (difieren en el último
+dígito de las de una columna no contigua, y son algo más precisas).
+"""
+from typing import Dict, Optional, Sequence
+import numpy as np
+from schemas import EstadisticasVariable
+
+# Probabilidades de mediana y percentiles de EstadisticasVariable
+PROBABILIDADES_ESTADISTICAS = (0.5, 0.05, 0.25, 0.75, 0.95)
+
+
+class EstadisticasVectorizadas:
+    """
+    Resúmenes por variable y año: arrays (variables, anos) y cuantiles (probabilidades, variables, anos)
+    """
+
+    def __init__(
+        self,
+        campos: Sequence[str],
+        promedio: np.ndarray,
+        desviacion: np.ndarray,
+        minimo: np.ndarray,
+        maximo: np.ndarray,
+        probabilidades: Sequence[float],
+        cuantiles: np.ndarray
+    ):
+        self.indices = {campo: indice for indice, campo in enumerate(campos)}
+        self.promedio = promedio
+        self.desviacion = desviacion
+        self.minimo = minimo
+        self.maximo = maximo
+        self.probabilidades = list(probabilidades)
+        self.cuantiles_calculados = cuantiles
+
+    def cuantiles(self, campo: str, probabilidades: Sequence[float]) -> np.ndarray:
+        """
+        Cuantiles ya calculados de una variable, forma (anos, len(probabilidades))
+
+        Raises:
+            ValueError: Si alguna probabilidad no se pidió al calcular
+        """
+        faltantes = [p for p in probabilidades if p not in self.probabilidades]
+        if faltantes:
+            raise ValueError(f"Cuantiles no calculados: {faltantes}")
+        filas = [self.probabilidades.index(p) for p in probabilidades]
+        return self.cuantiles_calculados[filas, self.indices[campo]].T
+
+    def estadisticas(self, campo: str, ano_idx: int, media: Optional[float] = None) -> EstadisticasVariable:
+        """
+        EstadisticasVariable de un año (media opcionalmente ajustada por reducción de varianza)
+        """
+        indice = self.indices[campo]
+        mediana, p5, p25, p75, p95 = self.cuantiles(campo, PROBABILIDADES_ESTADISTICAS)[ano_idx]
+        return EstadisticasVariable(
+            promedio=float(self.promedio[indice, ano_idx] if media is None else media),
+            mediana=float(mediana),
+            desviacion_estandar=float(self.desviacion[indice, ano_idx]),
+            percentil_5=float(p5),
+            percentil_25=float(p25),
+            percentil_75=float(p75),
+            percentil_95=float(p95),
+            minimo=float(self.minimo[indice, ano_idx]),
+            maximo=float(self.maximo[indice, ano_idx])
+        )
+
+
+def calcular_estadisticas(
+    variables: Dict[str, np.ndarray],
+    campos: Sequence[str],
+    probabilidades_extra: Sequence[float] = ()
+) -> EstadisticasVectorizadas:
+    """
+    Estadísticas de todas las variables y años en una pasada
+
+    Args:
+        variables: Variable -> array (N, anos)
+        campos: Variables a resumir
+        probabilidades_extra: Cuantiles adicionales a los de EstadisticasVariable (p. ej. una grilla)
+
+    Returns:
+        EstadisticasVectorizadas
+    """
+    # (variables, anos, N): cada columna contigua
+    tensor = np.stack([variables[campo].T for campo in campos])
+    probabilidades = list(PROBABILIDADES_ESTADISTICAS) + [
+        p for p in probabilidades_extra if p not in PROBABILIDADES_ESTADISTICAS
+    ]
+    return EstadisticasVectorizadas(
+        campos,
+        tensor.mean(axis=-1),
+        tensor.std(axis=-1),
+        tensor.min(axis=-1),
+        tensor.max(axis=-1),
+        probabilidades,
+        np.quantile(tensor, probabilidades, axis=-1)
+    )
@@ -1,26 +1,217 @@
-import math
 import random
-from typing import Tuple
+import secrets
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Tuple, Union
+import warnings
+import numpy as np
+from scipy.special import ndtr, ndtri
+from scipy.stats import qmc
 
-def box_muller() -> float:
+class GeneradorNormal:
+    """
+    Generador de normales estándar N(0,1) sobre numpy.random.Generator
+    
+    Entrega bloques completos (p. ej. trayectorias × años × factores) en una sola
+    llamada y admite semilla para reproducir una corrida.
+    """
+    
+    def __init__(self, semilla: Union[None, int, np.random.SeedSequence] = None, tamano_buffer: int = 4096):
+        """
+        Args:
+            semilla: Semilla entera, SeedSequence o None (entropía del sistema)
+            tamano_buffer: Normales pre-generadas para las llamadas escalares
+        """
+        self.rng = np.random.default_rng(semilla)
+        self.tamano_buffer = tamano_buffer
+        self._buffer = np.empty(0)
+        self._posicion = 0
+    
+    def normales(self, forma: Union[int, Tuple[int, ...]]) -> np.ndarray:
+        """
+        Genera un bloque de normales estándar con la forma indicada
+        """
+        return self.rng.standard_normal(forma)
+    
+    def normal(self) -> float:
+        """
+        Entrega una normal estándar desde un buffer (para el camino escalar)
+        """
+        if self._posicion >= len(self._buffer):
+            self._buffer = self.rng.standard_normal(self.tamano_buffer)
+            self._posicion = 0
+        Z = self._buffer[self._posicion]
+        self._posicion += 1
+        return float(Z)
+
+def nueva_semilla() -> int:
+    """
+    Semilla aleatoria para corridas sin semilla explícita
+    
+    Se limita a 2**53 para que el cliente (JSON/JavaScript) la pueda devolver sin pérdida.
+    """
+    return secrets.randbelow(2 ** 53)
+
+# Trayectorias por subflujo: las normales de un grupo de trayectorias consecutivas salen
+# de un solo generador, una fila (anos × factores) por trayectoria y en orden. Crear un
+# generador por trayectoria costaba más que simularla.
+TRAYECTORIAS_POR_SUBFLUJO = 256
+
+# Versión de la asignación de normales a trayectorias: con la misma semilla, resultados
+# de otra versión no coinciden con los actuales (entra en las claves de cache y corridas)
+VERSION_NORMALES = 2
+
+def subflujo_grupo(semilla: int, grupo: int) -> np.random.SeedSequence:
     """
-    Implementación de la transformación Box-Müller para generar
-    variables aleatorias con distribución normal estándar N(0,1)
+    Subflujo independiente del grupo `grupo` de TRAYECTORIAS_POR_SUBFLUJO trayectorias
     
-    Formula: Z = sqrt(-2 * ln(R1)) * cos(2π * R2)
+    Equivale al hijo `grupo` de SeedSequence(semilla).spawn(...), pero se construye
+    directamente: cada grupo se puede regenerar solo y el resultado no depende de
+    cómo se repartan las trayectorias entre procesos.
+    """
+    return np.random.SeedSequence(semilla, spawn_key=(grupo,))
+
+def generador_trayectoria(semilla: int, indice: int, forma: Tuple[int, ...]) -> GeneradorNormal:
+    """
+    GeneradorNormal posicionado en las normales de la trayectoria `indice` (descarta las
+    de las trayectorias anteriores de su grupo); reproduce la fila `indice` de normales_trayectorias
     
+    Args:
+        semilla: Semilla raíz de la corrida
+        indice: Índice global de la trayectoria
+        forma: Forma de las normales de cada trayectoria, p. ej. (anos, factores)
+    """
+    grupo, fila = divmod(indice, TRAYECTORIAS_POR_SUBFLUJO)
+    generador = GeneradorNormal(subflujo_grupo(semilla, grupo))
+    generador.rng.standard_normal(fila * int(np.prod(forma)))
+    return generador
+
+def normales_trayectorias(semilla: int, inicio: int, cantidad: int, forma: Tuple[int, ...]) -> np.ndarray:
+    """
+    Bloque de normales de las trayectorias [inicio, inicio + cantidad)
+    
+    Un generador por grupo de TRAYECTORIAS_POR_SUBFLUJO trayectorias; si el bloque empieza
+    a mitad de un grupo se descartan las normales de sus trayectorias anteriores (los
+    bloques alineados al tamaño del grupo no descartan nada).
+    
+    Args:
+        semilla: Semilla raíz de la corrida
+        inicio: Índice global de la primera trayectoria
+        cantidad: Número de trayectorias
+        forma: Forma de las normales de cada trayectoria, p. ej. (anos, factores)
+        
     Returns:
-        float: Variable aleatoria con distribución N(0,1)
+        np.ndarray: Array de forma (cantidad, *forma)
+    """
+    bloque = np.empty((cantidad, *forma))
+    fin = inicio + cantidad
+    posicion = inicio
+    while posicion < fin:
+        grupo, fila = divmod(posicion, TRAYECTORIAS_POR_SUBFLUJO)
+        hasta = min(fin, (grupo + 1) * TRAYECTORIAS_POR_SUBFLUJO)
+        rng = np.random.default_rng(subflujo_grupo(semilla, grupo))
+        if fila:
+            rng.standard_normal(fila * int(np.prod(forma)))
+        rng.standard_normal(out=bloque[posicion - inicio:hasta - inicio])
+        posicion = hasta
+    return bloque
+
+# Métodos de muestreo del bloque de normales de Monte Carlo
+METODOS_MUESTREO = ('pseudo', 'sobol', 'lhs')
+
+def generar_normales_bloque(
+    metodo: str,
+    semilla: int,
+    inicio: int,
+    cantidad: int,
+    total: int,
+    forma: Tuple[int, ...],
+    antiteticas: bool = False
+) -> np.ndarray:
+    """
+    Normales de las trayectorias [inicio, inicio + cantidad) de una corrida de `total` trayectorias
+    
+    - pseudo: subflujo pseudoaleatorio independiente por trayectoria
+    - sobol: puntos Sobol aleatorizados (scrambling Owen) de dimensión prod(forma)
+    - lhs: hipercubo latino de `total` puntos (la estratificación abarca toda la corrida)
+    
+    Con antiteticas=True las trayectorias van en pares (Z, -Z): la 2k y la 2k+1
+    comparten el punto k del método elegido con signo opuesto.
+    
+    En todos los casos el bloque depende solo de (semilla, índices), así que la
+    corrida se puede repartir en bloques con el mismo resultado.
+    
+    Returns:
+        np.ndarray: Array de forma (cantidad, *forma)
     """
-    R1 = random.random()
-    R2 = random.random()
+    if antiteticas:
+        primer_par = inicio // 2
+        ultimo_par = (inicio + cantidad - 1) // 2
+        base = generar_normales_bloque(
+            metodo, semilla, primer_par, ultimo_par - primer_par + 1, (total + 1) // 2, forma
+        )
+        pares = np.stack([base, -base], axis=1).reshape((-1, *forma))
+        desplazamiento = inicio - 2 * primer_par
+        return pares[desplazamiento:desplazamiento + cantidad]
     
-    # Evitar ln(0)
-    while R1 == 0:
-        R1 = random.random()
+    if metodo == 'pseudo':
+        return normales_trayectorias(semilla, inicio, cantidad, forma)
     
-    Z = math.sqrt(-2 * math.log(R1)) * math.cos(2 * math.pi * R2)
-    return Z
+    dimension = int(np.prod(forma))
+    if metodo == 'sobol':
+        motor = qmc.Sobol(d=dimension, scramble=True, seed=semilla)
+        if inicio:
+            motor.fast_forward(inicio)
+        with warnings.catch_warnings():
+            # Las propiedades de balance son óptimas con N potencia de 2; se acepta cualquier N
+            warnings.simplefilter('ignore', UserWarning)
+            uniformes = motor.random(cantidad)
+    elif metodo == 'lhs':
+        uniformes = qmc.LatinHypercube(d=dimension, seed=semilla).random(total)[inicio:inicio + cantidad]
+    else:
+        raise ValueError(f"Método de muestreo desconocido: {metodo}")
+    
+    # Evitar Φ⁻¹(0) = -inf
+    uniformes = np.clip(uniformes, np.finfo(float).tiny, 1 - np.finfo(float).epsneg)
+    return ndtri(uniformes).reshape((cantidad, *forma))
+
+# Generador de proceso usado por las funciones escalares de compatibilidad
+_generador_global = GeneradorNormal()
+
+# Generador activo en el contexto actual (petición / hilo), si lo hay
+_generador_contexto: ContextVar[Optional[GeneradorNormal]] = ContextVar('generador_normal', default=None)
+
+@contextmanager
+def usar_generador(generador: GeneradorNormal) -> Iterator[GeneradorNormal]:
+    """
+    Hace que box_muller / generar_normal usen `generador` dentro del bloque with
+    """
+    token = _generador_contexto.set(generador)
+    try:
+        yield generador
+    finally:
+        _generador_contexto.reset(token)
+
+def semilla_global(semilla: Optional[int]) -> None:
+    """
+    Reinicia el generador usado por box_muller / generar_normal
+    """
+    global _generador_global
+    _generador_global = GeneradorNormal(semilla)
+
+def box_muller() -> float:
+    """
+    Variable aleatoria con distribución normal estándar N(0,1)
+    
+    Se mantiene por compatibilidad: ahora delega en el GeneradorNormal activo
+    (el del contexto o, si no hay, el del proceso) en lugar de aplicar
+    Z = sqrt(-2 * ln(R1)) * cos(2π * R2) a dos llamadas de random.random().
+    
+    Returns:
+        float: Variable aleatoria con distribución N(0,1)
+    """
+    generador = _generador_contexto.get() or _generador_global
+    return generador.normal()
 
 def generar_normal(mu: float, sigma: float) -> float:
     """
@@ -38,6 +229,61 @@ def generar_normal(mu: float, sigma: float) -> float:
     Z = box_muller()
     return mu + sigma * Z
 
+def normal_truncada_array(mu, sigma, Z, limite_inferior: float = 0.0) -> np.ndarray:
+    """
+    Transforma normales estándar Z en muestras de Normal(μ, σ) truncada en X > limite_inferior
+    por inversión de la CDF (costo fijo por muestra, sin reintentos)
+    
+    Formula: X = μ + σ*Φ⁻¹(Φ(a) + Φ(Z)*(1 - Φ(a))),  a = (limite_inferior - μ) / σ
+    
+    Args:
+        mu: Media de la normal sin truncar (base); escalar o array que se difunde con Z
+        sigma: Desviación estándar (coef_z); escalar o array que se difunde con Z
+        Z: Normales estándar (escalar o array), p. ej. del generador del motor
+        limite_inferior: Punto de truncamiento (default: 0)
+        
+    Returns:
+        np.ndarray: Muestras truncadas con la forma difundida de Z, mu y sigma
+    """
+    Z = np.asarray(Z, dtype=float)
+    mu = np.asarray(mu, dtype=float)
+    sigma = np.asarray(sigma, dtype=float)
+    # μ + σ*Z con σ < 0 tiene la misma ley que μ + |σ|*(-Z)
+    Z = np.where(sigma < 0, -Z, Z)
+    sigma = np.abs(sigma)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = (limite_inferior - mu) / sigma
+        masa_inferior = ndtr(a)
+        masa_superior = ndtr(-a)
+        
+        # Se trabaja con la cola más cercana para no perder precisión cerca de 0 y 1
+        p = masa_inferior + masa_superior * ndtr(Z)
+        q = np.maximum(masa_superior * ndtr(-Z), np.finfo(float).tiny)
+        x = np.where(p < 0.5, ndtri(p), -ndtri(q))
+        muestras = mu + sigma * np.maximum(x, a)
+    
+    # Sin masa sobre el límite, o σ = 0 (degenerada)
+    muestras = np.where(masa_superior == 0, float(limite_inferior), muestras)
+    return np.where(sigma == 0, np.maximum(mu, limite_inferior), muestras)
+
+def normal_truncada(mu: float, sigma: float, Z: Optional[float] = None, limite_inferior: float = 0.0) -> float:
+    """
+    Versión escalar de normal_truncada_array
+    
+    Args:
+        mu: Media de la normal sin truncar (base)
+        sigma: Desviación estándar (coef_z)
+        Z: Normal estándar a transformar (si es None se genera con box_muller)
+        limite_inferior: Punto de truncamiento (default: 0)
+        
+    Returns:
+        float: Variable aleatoria Normal(μ, σ) truncada en limite_inferior
+    """
+    if Z is None:
+        Z = box_muller()
+    return float(normal_truncada_array(mu, sigma, Z, limite_inferior))
+
 def aplicar_shock(valor: float, shock_pct: float = 0.0) -> float:
     """
     Aplica shock porcentual a un valor
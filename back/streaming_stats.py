@@ -0,0 +1,248 @@
+"""
+Estadísticas en línea con memoria acotada para Monte Carlo por bloques.
+
+Las trayectorias se procesan en bloques de tamaño fijo y de cada bloque solo
+quedan acumuladores combinables:
+
+- MomentosOnline: media y varianza (Welford / Chan), mínimo y máximo
+- TDigest: esbozo de cuantiles (t-digest con función de escala k1)
+
+La memoria no depende del número de trayectorias, solo de los años y de la
+compresión del t-digest.
+"""
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from schemas import EstadisticasVariable
+
+# Trayectorias por bloque (par, para no partir pares antitéticos)
+TAMANO_BLOQUE = 8192
+
+# Compresión del t-digest (δ): ~δ/2 centroides, error relativo de rango ~1/δ en el centro y menor en las colas
+COMPRESION_TDIGEST = 200
+
+
+class MomentosOnline:
+    """
+    Media, varianza, mínimo y máximo de una serie por año, actualizados por bloques
+    """
+
+    def __init__(self, anos: int):
+        self.n = 0
+        self.media = np.zeros(anos)
+        self.m2 = np.zeros(anos)
+        self.minimo = np.full(anos, np.inf)
+        self.maximo = np.full(anos, -np.inf)
+
+    def actualizar(self, valores: np.ndarray) -> None:
+        """
+        Agrega un bloque de valores de forma (m, anos)
+        """
+        m = valores.shape[0]
+        if m == 0:
+            return
+        media_bloque = valores.mean(axis=0)
+        m2_bloque = ((valores - media_bloque) ** 2).sum(axis=0)
+        self._combinar(m, media_bloque, m2_bloque, valores.min(axis=0), valores.max(axis=0))
+
+    def combinar(self, otro: 'MomentosOnline') -> None:
+        self._combinar(otro.n, otro.media, otro.m2, otro.minimo, otro.maximo)
+
+    def _combinar(self, m, media, m2, minimo, maximo) -> None:
+        # Fórmula de Chan et al. para unir dos conjuntos de momentos
+        if m == 0:
+            return
+        n = self.n + m
+        delta = media - self.media
+        self.media = self.media + delta * (m / n)
+        self.m2 = self.m2 + m2 + delta ** 2 * (self.n * m / n)
+        self.minimo = np.minimum(self.minimo, minimo)
+        self.maximo = np.maximum(self.maximo, maximo)
+        self.n = n
+
+    @property
+    def varianza(self) -> np.ndarray:
+        """
+        Varianza poblacional (ddof=0, como np.std por defecto)
+        """
+        return self.m2 / self.n if self.n else np.zeros_like(self.m2)
+
+
+class TDigest:
+    """
+    Esbozo de cuantiles combinable (t-digest por fusión)
+
+    Los centroides se agrupan según k(q) = δ/(2π)·asin(2q - 1): cada grupo cubre
+    a lo sumo una unidad de k, así que cerca de las colas quedan centroides de
+    pocos puntos y los percentiles extremos se conservan con precisión.
+    """
+
+    def __init__(self, compresion: float = COMPRESION_TDIGEST):
+        self.compresion = compresion
+        self.medias = np.empty(0)
+        self.pesos = np.empty(0)
+
+    @property
+    def peso_total(self) -> float:
+        return float(self.pesos.sum())
+
+    def actualizar(self, valores: np.ndarray, ordenados: bool = False) -> None:
+        """
+        Agrega valores (peso 1 cada uno); con ordenados=True se asume que ya vienen ordenados
+        """
+        if not ordenados:
+            valores = np.sort(valores)
+        # Insertar los centroides actuales en los valores ordenados evita reordenar todo
+        posiciones = np.searchsorted(valores, self.medias)
+        self._comprimir(
+            np.insert(valores, posiciones, self.medias),
+            np.insert(np.ones(len(valores)), posiciones, self.pesos)
+        )
+
+    def combinar(self, otro: 'TDigest') -> None:
+        medias = np.concatenate([self.medias, otro.medias])
+        pesos = np.concatenate([self.pesos, otro.pesos])
+        orden = np.argsort(medias)
+        self._comprimir(medias[orden], pesos[orden])
+
+    def _comprimir(self, medias: np.ndarray, pesos: np.ndarray) -> None:
+        # medias ya ordenadas
+        acumulado = np.cumsum(pesos)
+        total = acumulado[-1]
+        q_centro = (acumulado - pesos / 2) / total
+        k = self.compresion / (2 * np.pi) * np.arcsin(2 * q_centro - 1)
+        grupos = np.floor(k)
+        inicios = np.flatnonzero(np.r_[True, grupos[1:] != grupos[:-1]])
+        pesos_grupo = np.add.reduceat(pesos, inicios)
+        self.medias = np.add.reduceat(medias * pesos, inicios) / pesos_grupo
+        self.pesos = pesos_grupo
+
+    def cuantiles(self, q, minimo: float, maximo: float) -> np.ndarray:
+        """
+        Cuantiles aproximados (q en [0, 1]) interpolando entre centroides
+
+        Args:
+            q: Probabilidades
+            minimo, maximo: Extremos exactos de los datos (anclan las colas)
+        """
+        total = self.peso_total
+        centros = np.cumsum(self.pesos) - self.pesos / 2
+        x = np.concatenate([[minimo], self.medias, [maximo]])
+        y = np.concatenate([[0.0], centros, [total]])
+        return np.interp(np.asarray(q) * total, y, x)
+
+    def cdf(self, x, minimo: float, maximo: float) -> np.ndarray:
+        """
+        Fracción aproximada de los datos <= x (inversa de cuantiles)
+
+        Args:
+            x: Valores
+            minimo, maximo: Extremos exactos de los datos
+        """
+        total = self.peso_total
+        centros = np.cumsum(self.pesos) - self.pesos / 2
+        xs = np.concatenate([[minimo], self.medias, [maximo]])
+        y = np.concatenate([[0.0], centros, [total]])
+        return np.interp(x, xs, y, left=0.0, right=total) / total
+
+
+class EstadisticasOnline:
+    """
+    Acumuladores de una variable de Monte Carlo: momentos y un t-digest por año
+    """
+
+    def __init__(self, anos: int, compresion: float = COMPRESION_TDIGEST):
+        self.momentos = MomentosOnline(anos)
+        self.digests: List[TDigest] = [TDigest(compresion) for _ in range(anos)]
+
+    @property
+    def n(self) -> int:
+        return self.momentos.n
+
+    def actualizar(self, valores: np.ndarray) -> None:
+        """
+        Agrega un bloque de forma (m, anos)
+        """
+        self.momentos.actualizar(valores)
+        ordenados = np.sort(valores, axis=0)
+        for ano_idx, digest in enumerate(self.digests):
+            digest.actualizar(ordenados[:, ano_idx], ordenados=True)
+
+    def combinar(self, otro: 'EstadisticasOnline') -> None:
+        self.momentos.combinar(otro.momentos)
+        for digest, digest_otro in zip(self.digests, otro.digests):
+            digest.combinar(digest_otro)
+
+    def cuantiles(self, ano_idx: int, q) -> np.ndarray:
+        return self.digests[ano_idx].cuantiles(
+            q, self.momentos.minimo[ano_idx], self.momentos.maximo[ano_idx]
+        )
+
+    def cdf(self, ano_idx: int, x) -> np.ndarray:
+        return self.digests[ano_idx].cdf(
+            x, self.momentos.minimo[ano_idx], self.momentos.maximo[ano_idx]
+        )
+
+    def estadisticas(self, ano_idx: int, media: Optional[float] = None) -> EstadisticasVariable:
+        """
+        EstadisticasVariable de un año (media opcionalmente ajustada por reducción de varianza)
+        """
+        mediana, p5, p25, p75, p95 = self.cuantiles(ano_idx, [0.5, 0.05, 0.25, 0.75, 0.95])
+        return EstadisticasVariable(
+            promedio=float(self.momentos.media[ano_idx] if media is None else media),
+            mediana=float(mediana),
+            desviacion_estandar=float(np.sqrt(self.momentos.varianza[ano_idx])),
+            percentil_5=float(p5),
+            percentil_25=float(p25),
+            percentil_75=float(p75),
+            percentil_95=float(p95),
+            minimo=float(self.momentos.minimo[ano_idx]),
+            maximo=float(self.momentos.maximo[ano_idx])
+        )
+
+
+class EstadoStreaming:
+    """
+    Estado de una corrida por bloques: acumuladores por variable, momentos de las
+    medias de pares antitéticos, una muestra (el primer bloque) para las distribuciones
+    y, opcionalmente, los conteos de riesgo de cola.
+
+    Se puede guardar y seguir actualizando con más trayectorias: media, desviación,
+    mínimo y máximo coinciden con los de una sola corrida con todos los bloques y
+    los percentiles quedan dentro del error del t-digest.
+    """
+
+    def __init__(
+        self,
+        variables: Sequence[str],
+        anos: int,
+        antiteticas: bool = False,
+        variables_muestra: Sequence[str] = (),
+        riesgo=None
+    ):
+        self.anos = anos
+        self.num_trayectorias = 0
+        self.acumuladores: Dict[str, EstadisticasOnline] = {campo: EstadisticasOnline(anos) for campo in variables}
+        self.momentos_pares: Dict[str, MomentosOnline] = (
+            {campo: MomentosOnline(anos) for campo in variables} if antiteticas else {}
+        )
+        self.variables_muestra = list(variables_muestra)
+        self.muestra: Optional[Dict[str, np.ndarray]] = None
+        # Conteos de violaciones de umbrales (tail_risk.AcumuladorRiesgo), opcional
+        self.riesgo = riesgo
+
+    def actualizar(self, bloque: Dict[str, np.ndarray]) -> None:
+        """
+        Agrega un bloque de trayectorias contiguas (variable -> array (m, anos))
+
+        Con pares antitéticos el bloque debe empezar en una trayectoria par.
+        """
+        for campo, acumulador in self.acumuladores.items():
+            acumulador.actualizar(bloque[campo])
+        for campo, momentos in self.momentos_pares.items():
+            num_pares = len(bloque[campo]) // 2
+            momentos.actualizar(bloque[campo][:2 * num_pares].reshape(num_pares, 2, self.anos).mean(axis=1))
+        if self.riesgo is not None:
+            self.riesgo.actualizar(bloque)
+        if self.muestra is None:
+            self.muestra = {campo: np.array(bloque[campo]) for campo in self.variables_muestra}
+        self.num_trayectorias += len(next(iter(bloque.values())))
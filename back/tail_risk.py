@@ -0,0 +1,226 @@
+"""
+Riesgo de cola de Monte Carlo: probabilidades de violar umbrales y VaR/CVaR.
+
+Las reglas son las alertas del modelo (fiscal_model.generar_alertas) más los
+umbrales que pida el usuario ('variable>valor', o 'variable>otra_variable').
+Para cada regla se obtiene, por año:
+
+- la probabilidad de violarla (fracción de trayectorias)
+- la probabilidad de haberla violado al menos una vez hasta ese año
+- la distribución del año de la primera violación (y la fracción que nunca la viola)
+
+Las máscaras booleanas (reglas, trayectorias, años) de todas las reglas se
+evalúan juntas sobre cada bloque y solo se acumulan conteos, así que el mismo
+acumulador sirve en modo exacto (un solo bloque), streaming y extensiones.
+
+VaR y CVaR son de la cola superior (mayor déficit o deuda): en modo exacto
+salen de las trayectorias; en modo streaming, del t-digest (el CVaR promedia
+los cuantiles sobre la cola).
+"""
+import re
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from schemas import ProbabilidadViolacion, ValorEnRiesgo, ResultadoRiesgo
+from fiscal_model import LIMITE_DEUDA_PIB, LIMITE_DEFICIT_PIB, MIN_RIN_MESES
+from streaming_stats import EstadisticasOnline
+
+OPERADORES = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+}
+
+# Variables con VaR/CVaR y niveles reportados
+VARIABLES_VAR = ('deficit_pib_ratio', 'deuda_pib_ratio')
+NIVELES_VAR = (0.95, 0.99)
+
+# Cuantiles de la cola con que se aproxima el CVaR en modo streaming
+PUNTOS_CVAR = 100
+
+MAX_UMBRALES = 20
+
+_PATRON_UMBRAL = re.compile(r'^\s*(\w+)\s*(>=|<=|>|<)\s*(\S+)\s*$')
+
+
+class ReglaRiesgo:
+    """
+    Condición de violación: variable operador umbral (un número u otra variable)
+    """
+
+    def __init__(self, nombre: str, variable: str, operador: str, umbral, referencia: Optional[str] = None):
+        self.nombre = nombre
+        self.variable = variable
+        self.operador = operador
+        self.umbral = umbral
+        self.referencia = referencia
+
+    def descripcion(self) -> str:
+        return f"{self.variable} {self.operador} {self.referencia or f'{self.umbral:g}'}"
+
+    def violaciones(self, bloque: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Máscara (m, anos): True donde la trayectoria viola la regla
+        """
+        limite = bloque[self.referencia] if self.referencia else self.umbral
+        return OPERADORES[self.operador](bloque[self.variable], limite)
+
+
+# Las alertas de generar_alertas
+REGLAS_ALERTAS = [
+    ReglaRiesgo('deuda_pib', 'deuda_pib_ratio', '>', LIMITE_DEUDA_PIB),
+    ReglaRiesgo('deficit_pib', 'deficit_pib_ratio', '>', LIMITE_DEFICIT_PIB),
+    ReglaRiesgo('subsidios_gas', 'gasto_subsidio_combustibles', '>', None, referencia='ing_gas'),
+    ReglaRiesgo('rin_meses', 'rin_meses_importacion', '<', MIN_RIN_MESES),
+]
+
+
+def reglas_riesgo(umbrales: Sequence[str], variables: Sequence[str]) -> List[ReglaRiesgo]:
+    """
+    Reglas de una corrida: las alertas del modelo más los umbrales pedidos
+
+    Args:
+        umbrales: Umbrales 'variable>valor' (operadores >, >=, <, <=); el valor puede ser otra variable
+        variables: Variables seguidas en Monte Carlo
+
+    Raises:
+        ValueError: Si un umbral no tiene el formato o usa una variable no seguida
+    """
+    if len(umbrales) > MAX_UMBRALES:
+        raise ValueError(f"A lo sumo {MAX_UMBRALES} umbrales")
+    reglas = list(REGLAS_ALERTAS)
+    for umbral in umbrales:
+        coincidencia = _PATRON_UMBRAL.match(umbral)
+        if coincidencia is None:
+            raise ValueError(f"Umbral inválido: '{umbral}' (formato: variable>valor)")
+        variable, operador, valor = coincidencia.groups()
+        if variable not in variables:
+            raise ValueError(f"Variable desconocida en el umbral '{umbral}': {variable}")
+        try:
+            regla = ReglaRiesgo(umbral.replace(' ', ''), variable, operador, float(valor))
+        except ValueError:
+            if valor not in variables:
+                raise ValueError(f"Valor inválido en el umbral '{umbral}': {valor}")
+            regla = ReglaRiesgo(umbral.replace(' ', ''), variable, operador, None, referencia=valor)
+        reglas.append(regla)
+    return reglas
+
+
+def variables_riesgo(reglas: Sequence[ReglaRiesgo]) -> List[str]:
+    """
+    Variables que hay que seguir para evaluar las reglas y el VaR/CVaR
+    """
+    variables = [regla.variable for regla in reglas] + [regla.referencia for regla in reglas if regla.referencia]
+    return list(dict.fromkeys(variables + list(VARIABLES_VAR)))
+
+
+class AcumuladorRiesgo:
+    """
+    Conteos por regla y año (violaciones, violaciones acumuladas y primeras violaciones),
+    actualizados por bloques de trayectorias
+    """
+
+    def __init__(self, reglas: Sequence[ReglaRiesgo], anos: int):
+        self.reglas = list(reglas)
+        self.anos = anos
+        self.num_trayectorias = 0
+        self.violaciones = np.zeros((len(self.reglas), anos), dtype=np.int64)
+        self.acumuladas = np.zeros((len(self.reglas), anos), dtype=np.int64)
+        # Última columna: trayectorias que nunca violan la regla
+        self.primeras = np.zeros((len(self.reglas), anos + 1), dtype=np.int64)
+
+    def actualizar(self, bloque: Dict[str, np.ndarray]) -> None:
+        """
+        Agrega un bloque de trayectorias (variable -> array (m, anos))
+        """
+        mascaras = np.stack([regla.violaciones(bloque) for regla in self.reglas])
+        alcanzadas = np.logical_or.accumulate(mascaras, axis=2)
+        # argmax da el primer True; sin violaciones, la columna "nunca"
+        primeras = np.where(alcanzadas[..., -1], mascaras.argmax(axis=2), self.anos)
+        desplazamientos = np.arange(len(self.reglas))[:, None] * (self.anos + 1)
+        self.violaciones += mascaras.sum(axis=1)
+        self.acumuladas += alcanzadas.sum(axis=1)
+        self.primeras += np.bincount(
+            (primeras + desplazamientos).ravel(), minlength=self.primeras.size
+        ).reshape(self.primeras.shape)
+        self.num_trayectorias += mascaras.shape[1]
+
+    def probabilidades(self) -> List[ProbabilidadViolacion]:
+        n = max(self.num_trayectorias, 1)
+        return [
+            ProbabilidadViolacion(
+                nombre=regla.nombre,
+                regla=regla.descripcion(),
+                probabilidad=(self.violaciones[indice] / n).tolist(),
+                probabilidad_acumulada=(self.acumuladas[indice] / n).tolist(),
+                primera_violacion=(self.primeras[indice, :-1] / n).tolist(),
+                sin_violacion=float(self.primeras[indice, -1] / n)
+            )
+            for indice, regla in enumerate(self.reglas)
+        ]
+
+
+def valor_en_riesgo(
+    campo: str,
+    anos: int,
+    niveles: Sequence[float] = NIVELES_VAR,
+    muestras: Optional[np.ndarray] = None,
+    acumulador: Optional[EstadisticasOnline] = None
+) -> List[ValorEnRiesgo]:
+    """
+    VaR y CVaR de la cola superior de una variable por año
+
+    Args:
+        campo: Variable
+        anos: Número de años
+        niveles: Niveles de confianza (p. ej. 0.95)
+        muestras: Trayectorias (N, anos), en modo exacto
+        acumulador: Acumulador en línea de la variable, en modo streaming (tiene prioridad)
+    """
+    if acumulador is not None:
+        var = np.array([acumulador.cuantiles(ano_idx, niveles) for ano_idx in range(anos)]).T
+        cvar = np.array([
+            [
+                np.mean(acumulador.cuantiles(ano_idx, nivel + (1 - nivel) * (np.arange(PUNTOS_CVAR) + 0.5) / PUNTOS_CVAR))
+                for ano_idx in range(anos)
+            ]
+            for nivel in niveles
+        ])
+    else:
+        # (niveles, anos) y máscara de cola (niveles, N, anos)
+        var = np.quantile(muestras, niveles, axis=0)
+        cola = muestras[None] >= var[:, None, :]
+        cvar = np.where(cola, muestras[None], 0.0).sum(axis=1) / cola.sum(axis=1)
+    return [
+        ValorEnRiesgo(variable=campo, nivel=nivel, var=var[indice].tolist(), cvar=cvar[indice].tolist())
+        for indice, nivel in enumerate(niveles)
+    ]
+
+
+def resumir_riesgo(
+    riesgo: AcumuladorRiesgo,
+    muestras: Optional[Dict[str, np.ndarray]] = None,
+    acumuladores: Optional[Dict[str, EstadisticasOnline]] = None,
+    ano_inicial: int = 2020
+) -> ResultadoRiesgo:
+    """
+    ResultadoRiesgo de una corrida: probabilidades del acumulador y VaR/CVaR de VARIABLES_VAR
+
+    Args:
+        riesgo: Acumulador con todas las trayectorias de la corrida
+        muestras: Trayectorias completas por variable, en modo exacto
+        acumuladores: Acumuladores en línea por variable, en modo streaming (tienen prioridad)
+    """
+    return ResultadoRiesgo(
+        anos=list(range(ano_inicial, ano_inicial + riesgo.anos)),
+        violaciones=riesgo.probabilidades(),
+        valor_en_riesgo=[
+            valor
+            for campo in VARIABLES_VAR
+            for valor in valor_en_riesgo(
+                campo, riesgo.anos,
+                muestras=muestras[campo] if acumuladores is None else None,
+                acumulador=acumuladores[campo] if acumuladores is not None else None
+            )
+        ]
+    )
@@ -0,0 +1,53 @@
+"""
+Pools de procesos de Monte Carlo paralelo: una corrida en streaming sigue usando su
+pool aunque otras corridas con otros tamaños lo desalojen.
+"""
+import numpy as np
+import pytest
+import parallel
+from parameters import PARAMETROS_DEFAULT
+from schemas import ParametrosSimulacion
+
+
+@pytest.fixture(autouse=True)
+def pools(monkeypatch):
+    # Tamaños distintos aunque la máquina tenga un solo núcleo
+    monkeypatch.setattr(parallel, 'MAX_PROCESOS', 3)
+    yield
+    parallel.cerrar_executor()
+
+
+def test_streaming_sobrevive_al_desalojo_del_pool():
+    parametros = ParametrosSimulacion(**PARAMETROS_DEFAULT)
+    argumentos = (parametros, 3, 1200, 11, ['deuda_pib_ratio'], 300)
+    bloques = parallel.iterar_bloques(*argumentos, paralelo=True, num_procesos=1)
+    try:
+        paralelos = [next(bloques)]
+        with parallel.usar_executor(1) as executor:
+            pass
+        # Dos pools de otros tamaños desalojan al de la corrida en curso
+        for num_procesos in (2, 3):
+            with parallel.usar_executor(num_procesos):
+                pass
+        assert executor not in parallel._executors.values()
+        paralelos.extend(bloques)
+    finally:
+        bloques.close()
+    # Al terminar la corrida se libera su uso y el pool desalojado se cierra
+    assert executor not in parallel._usos
+    assert executor._shutdown_thread
+
+    serie = list(parallel.iterar_bloques(*argumentos))
+    assert len(paralelos) == len(serie) == 4
+    for bloque_paralelo, bloque_serie in zip(paralelos, serie):
+        np.testing.assert_array_equal(bloque_paralelo['deuda_pib_ratio'], bloque_serie['deuda_pib_ratio'])
+
+
+def test_pool_desalojado_sin_uso_se_cierra():
+    with parallel.usar_executor(1) as executor:
+        pass
+    for num_procesos in (2, 3):
+        with parallel.usar_executor(num_procesos):
+            pass
+    assert executor._shutdown_thread
+    assert len(parallel._executors) == parallel.MAX_POOLS
@@ -0,0 +1,129 @@
+"""
+Reducción de varianza para Monte Carlo: variables antitéticas y variables de control.
+
+Gran parte del modelo es lineal en la Z común del año (los 14 impuestos, el
+gasto corriente y el subsidio de alimentos), y el tipo de cambio y los
+commodities dependen de forma monótona de su propia Z. Esas normales tienen
+media conocida (0), así que sirven directamente como variables de control.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+MODOS_REDUCCION_VARIANZA = ('ninguna', 'antiteticas', 'variables_control')
+
+# Métricas principales para las que se reporta el factor de reducción
+METRICAS_PRINCIPALES = [
+    'ingresos_totales',
+    'gastos_totales',
+    'deficit_superavit',
+    'deuda_total',
+    'deuda_pib_ratio',
+    'rin',
+    'rin_meses_importacion',
+    'deficit_pib_ratio',
+    'presion_tributaria',
+]
+
+# Si la varianza residual es despreciable, la media es exacta y el factor no es finito
+_TOLERANCIA_EXACTA = 1e-12
+
+
+def calcular_controles(Z: np.ndarray) -> np.ndarray:
+    """
+    Variables de control de cada trayectoria y año a partir del bloque de normales
+
+    Para el año t: las normales de todos los factores del año y sus sumas
+    acumuladas hasta t (la deuda y las RIN arrastran los años anteriores).
+    Todas tienen media 0 conocida.
+
+    Args:
+        Z: Normales de forma (N, anos, NUM_FACTORES)
+
+    Returns:
+        np.ndarray: Controles de forma (N, anos, 2 * NUM_FACTORES)
+    """
+    return np.concatenate([Z, np.cumsum(Z, axis=1)], axis=2)
+
+
+def factor_reduccion(varianza_original: float, varianza_reducida: float) -> Optional[float]:
+    """
+    Var(original) / Var(reducida); None si la varianza reducida es despreciable (media exacta)
+    """
+    if varianza_original <= 0:
+        return 1.0
+    if varianza_reducida <= _TOLERANCIA_EXACTA * varianza_original:
+        return None
+    return float(varianza_original / varianza_reducida)
+
+
+def media_variables_control(Y: np.ndarray, C: np.ndarray) -> Tuple[float, Optional[float]]:
+    """
+    Estimador de la media de Y con variables de control de media conocida 0
+
+    Ȳ_cv = Ȳ - β·C̄, con β de la regresión de Y sobre C
+
+    Args:
+        Y: Muestras de la variable, forma (N,)
+        C: Controles, forma (N, k)
+
+    Returns:
+        (media ajustada, factor de reducción de varianza Var(Y) / Var(Y - C·β));
+        el factor es None si los controles explican Y por completo
+    """
+    n, k = C.shape
+    C_centrado = C - C.mean(axis=0)
+    Y_centrado = Y - Y.mean()
+    beta, *_ = np.linalg.lstsq(C_centrado, Y_centrado, rcond=None)
+    media = float(Y.mean() - C.mean(axis=0) @ beta)
+    # Varianza residual corregida por los grados de libertad usados en β
+    residuo = Y_centrado - C_centrado @ beta
+    varianza_residual = float(np.sum(residuo ** 2)) / max(n - 1 - k, 1)
+    return media, factor_reduccion(float(np.var(Y, ddof=1)), varianza_residual)
+
+
+def factor_antiteticas(Y: np.ndarray) -> Optional[float]:
+    """
+    Factor de reducción de varianza logrado por los pares antitéticos (2k, 2k+1)
+
+    Compara la varianza de la media con N muestras independientes, Var(Y)/N,
+    con la de la media de N/2 pares, Var(media del par)/(N/2).
+    """
+    num_pares = len(Y) // 2
+    if num_pares < 2:
+        return None
+    pares = Y[:2 * num_pares].reshape(num_pares, 2)
+    return factor_reduccion(float(np.var(Y[:2 * num_pares])), 2 * float(np.var(pares.mean(axis=1))))
+
+
+def aplicar_reduccion_varianza(
+    modo: str,
+    variables_tracking: Dict[str, np.ndarray],
+    controles: Optional[np.ndarray] = None,
+    metricas: Sequence[str] = METRICAS_PRINCIPALES
+) -> Tuple[Dict[str, np.ndarray], Dict[str, List[Optional[float]]]]:
+    """
+    Calcula las medias por año y los factores de reducción de varianza
+
+    Args:
+        modo: 'antiteticas' o 'variables_control'
+        variables_tracking: Variable -> array (N, anos)
+        controles: Controles (N, anos, k), necesarios con 'variables_control'
+        metricas: Métricas para las que se reporta el factor
+
+    Returns:
+        (medias por variable (anos,), factores por métrica y año)
+    """
+    medias: Dict[str, np.ndarray] = {}
+    factores: Dict[str, List[Optional[float]]] = {}
+    for campo, valores in variables_tracking.items():
+        anos = valores.shape[1]
+        if modo == 'variables_control':
+            resultados = [media_variables_control(valores[:, t], controles[:, t, :]) for t in range(anos)]
+            medias[campo] = np.array([media for media, _ in resultados])
+            factores_campo = [factor for _, factor in resultados]
+        else:
+            medias[campo] = valores.mean(axis=0)
+            factores_campo = [factor_antiteticas(valores[:, t]) for t in range(anos)]
+        if campo in metricas:
+            factores[campo] = factores_campo
+    return medias, factores
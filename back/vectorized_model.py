@@ -0,0 +1,410 @@
+"""
+Motor vectorizado del modelo fiscal.
+
+Evalúa N trayectorias a la vez sobre arrays NumPy de forma (N,), año por año.
+Las funciones escalares de fiscal_model.py siguen siendo la implementación de
+referencia; aquí se reproducen las mismas fórmulas para usarlas en Monte Carlo.
+"""
+from typing import Dict, Optional, Sequence, Union
+import numpy as np
+from schemas import ParametrosSimulacion
+from stochastic import GeneradorNormal, normal_truncada_array
+from columnar import ResultadosColumnares, CAMPOS_RESULTADO_ANUAL
+from commodities import REGISTRO_COMMODITIES, COMMODITIES, INDICE_COMMODITY, calcular_commodities_vectorizado
+from compiled import ParametrosCompilados, TRIBUTARIOS_LINEALES, compilar_parametros
+
+
+# Orden de los factores aleatorios de cada año en el bloque de normales
+# (trayectorias × años × factores): Z común (impuestos y gastos), TC y
+# volumen/precio de cada commodity
+FACTORES = ['comun', 'tc'] + [
+    f"{commodity}_{variable}" for commodity in COMMODITIES for variable in ('volumen', 'precio')
+]
+NUM_FACTORES = len(FACTORES)
+INDICE_FACTOR = {nombre: i for i, nombre in enumerate(FACTORES)}
+_INDICES_VOLUMEN = [INDICE_FACTOR[f"{commodity}_volumen"] for commodity in COMMODITIES]
+_INDICES_PRECIO = [INDICE_FACTOR[f"{commodity}_precio"] for commodity in COMMODITIES]
+_POSICION_IDH = TRIBUTARIOS_LINEALES.index('ice_i') + 1
+_ORDEN_TRIBUTARIOS = TRIBUTARIOS_LINEALES[:_POSICION_IDH] + ('idh',) + TRIBUTARIOS_LINEALES[_POSICION_IDH:]
+# Líneas tributarias que son por sí solas un campo de ResultadoAnual
+_CAMPOS_TRIBUTARIOS = {'iue': 'ing_iue', 'it': 'ing_it', 'itf': 'ing_itf', 'rc_iva': 'ing_rc_iva', 'ga': 'ing_ga'}
+
+
+def calcular_tipo_cambio_vectorizado(compilados: ParametrosCompilados, Z: np.ndarray) -> np.ndarray:
+    """
+    TC = base + coef_z*Z ± Shock% para N trayectorias (truncado en TC > 0)
+    """
+    tc = normal_truncada_array(compilados.tc_base, compilados.tc_coef_z, Z)
+    return tc * compilados.multiplicador_tc
+
+
+def _destino(salida: Dict[str, np.ndarray], campo: str, n: int) -> np.ndarray:
+    """
+    Array (N,) donde se calcula un campo de ResultadoAnual: su columna en el contenedor
+    si el campo se almacena o, si no, un array nuevo que queda en salida
+    """
+    destino = salida.get(campo)
+    if destino is None:
+        destino = salida[campo] = np.empty(n)
+    return destino
+
+
+def calcular_ingresos_vectorizado(
+    compilados: ParametrosCompilados,
+    Z_anio: np.ndarray,
+    salida: Optional[Dict[str, np.ndarray]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Equivalente vectorizado de fiscal_model.calcular_ingresos
+
+    Args:
+        compilados: Parámetros compilados (ver compiled.compilar_parametros)
+        Z_anio: Normales estándar del año, forma (N, NUM_FACTORES)
+        salida: Destinos (N,) de los campos de ResultadoAnual (ver simular_anio_vectorizado);
+            los campos de ingresos se calculan directamente en ellos
+
+    Returns:
+        Dict con las mismas claves que la versión escalar, cada una de forma (N,)
+    """
+    salida = {} if salida is None else salida
+    n = Z_anio.shape[0]
+    Z = Z_anio[:, INDICE_FACTOR['comun']]
+    TC = calcular_tipo_cambio_vectorizado(compilados, Z_anio[:, INDICE_FACTOR['tc']])
+
+    # Todos los commodities en una operación (N, K)
+    commodities = calcular_commodities_vectorizado(
+        compilados.commodities, TC, Z_anio[:, _INDICES_VOLUMEN], Z_anio[:, _INDICES_PRECIO]
+    )
+    gas = INDICE_COMMODITY['gas']
+    gas_brutos = commodities['ingresos_brutos'][:, gas]
+    gas_idh = commodities['idh'][:, gas]
+    gas_regalias = commodities['regalias'][:, gas]
+    gas_total = np.add(gas_idh, gas_regalias, out=_destino(salida, 'ing_gas', n))
+    minerales = {
+        commodity.nombre: np.add(
+            commodities['idh'][:, k], commodities['regalias'][:, k],
+            out=_destino(salida, commodity.campo_resultado, n) if commodity.campo_resultado else None
+        )
+        for k, commodity in enumerate(REGISTRO_COMMODITIES) if commodity.nombre != 'gas'
+    }
+
+    I_EX = commodities['regalias'].sum(axis=1)
+
+    # Tributarios (lineales en Z); las líneas que son un campo se calculan en su columna
+    tributarios = {}
+    for t, nombre in enumerate(TRIBUTARIOS_LINEALES):
+        campo = _CAMPOS_TRIBUTARIOS.get(nombre)
+        linea = np.multiply(Z, compilados.tributarios_coef_z[t], out=_destino(salida, campo, n) if campo else None)
+        tributarios[nombre] = np.add(linea, compilados.tributarios_base[t], out=linea)
+    tributarios['idh'] = gas_idh
+    np.add(tributarios['iva_mi'], tributarios['iva_i'], out=_destino(salida, 'ing_iva', n))
+    np.add(tributarios['ice_mi'], tributarios['ice_i'], out=_destino(salida, 'ing_ice', n))
+    np.copyto(_destino(salida, 'ing_hidrocarburos_total', n), gas_total)
+    np.subtract(I_EX, gas_regalias, out=_destino(salida, 'ing_mineria_total', n))
+    # Suma en el orden de la versión escalar (el IDH va después de ice_i)
+    tributarios_total = np.add(
+        tributarios[_ORDEN_TRIBUTARIOS[0]], tributarios[_ORDEN_TRIBUTARIOS[1]],
+        out=_destino(salida, 'ing_impuestos_total', n)
+    )
+    for nombre in _ORDEN_TRIBUTARIOS[2:]:
+        np.add(tributarios_total, tributarios[nombre], out=tributarios_total)
+
+    total = np.add(I_EX, tributarios_total, out=_destino(salida, 'ingresos_totales', n))
+    np.add(total, gas_idh, out=total)
+
+    return {
+        'z_value': Z,
+        'tipo_cambio': TC,
+        'gas_volumen': commodities['volumen'][:, gas],
+        'gas_precio_usd': commodities['precio_usd'][:, gas],
+        'gas_ingresos_brutos': gas_brutos,
+        'gas_idh': gas_idh,
+        'gas_regalias': gas_regalias,
+        'gas_total': gas_total,
+        **minerales,
+        'exportaciones_total': I_EX,
+        **tributarios,
+        'tributarios_total': tributarios_total,
+        'total': total
+    }
+
+
+def calcular_gastos_vectorizado(
+    compilados: ParametrosCompilados,
+    TC: np.ndarray,
+    Z: np.ndarray,
+    salida: Optional[Dict[str, np.ndarray]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Equivalente vectorizado de fiscal_model.calcular_gastos (los campos de gasto se
+    calculan en sus destinos de salida, como en calcular_ingresos_vectorizado)
+    """
+    salida = {} if salida is None else salida
+    n = Z.shape[0]
+    GC = np.multiply(Z, compilados.corriente_coef_z, out=_destino(salida, 'gasto_inversion', n))
+    np.add(GC, compilados.corriente_base, out=GC)
+
+    if compilados.subsidio_combustibles_activo:
+        combustibles = compilados.combustibles_base + compilados.combustibles_coef_z * Z[:, np.newaxis]
+        PIG, PID, VIG, VID = combustibles.T
+        GSG = (PIG * TC - compilados.subsidio_gasolina_venta) * VIG
+        GSD = (PID * TC - compilados.subsidio_diesel_venta) * VID
+    else:
+        PIG = PID = VIG = VID = GSG = GSD = np.zeros_like(Z)
+    GSH = np.add(GSG, GSD, out=_destino(salida, 'gasto_subsidio_combustibles', n))
+
+    GSA = np.multiply(Z, compilados.subsidio_alimentos_coef_z, out=_destino(salida, 'gasto_subsidio_alimentos', n))
+    np.add(GSA, compilados.subsidio_alimentos_base, out=GSA)
+
+    total = np.add(GC, GSH, out=_destino(salida, 'gastos_totales', n))
+    np.add(total, GSA, out=total)
+
+    return {
+        'corriente': GC,
+        'subsidio_gasolina': GSG,
+        'subsidio_diesel': GSD,
+        'subsidio_hidrocarburos': GSH,
+        'subsidio_alimentos': GSA,
+        'total': total,
+        'precio_importacion_gasolina': PIG,
+        'precio_importacion_diesel': PID,
+        'volumen_importacion_gasolina': VIG,
+        'volumen_importacion_diesel': VID
+    }
+
+
+def _por_pib(valores: np.ndarray, pib: float, destino: np.ndarray) -> np.ndarray:
+    # valores / pib * 100 en destino (ceros si el PIB no es positivo)
+    if pib > 0:
+        np.divide(valores, pib, out=destino)
+        return np.multiply(destino, 100, out=destino)
+    destino.fill(0.0)
+    return destino
+
+
+def _ratio(
+    numerador: np.ndarray,
+    denominador: np.ndarray,
+    valido: np.ndarray,
+    destino: np.ndarray,
+    escala: float = 100,
+    defecto: float = 0.0
+) -> np.ndarray:
+    # numerador / denominador * escala en destino donde valido; defecto en el resto
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(numerador, denominador, out=destino)
+    if escala != 1:
+        np.multiply(destino, escala, out=destino)
+    np.copyto(destino, defecto, where=~valido)
+    return destino
+
+
+def calcular_deficit_deuda_vectorizado(
+    ingresos_totales: np.ndarray,
+    gastos_totales: np.ndarray,
+    deuda_externa_anterior: np.ndarray,
+    deuda_interna_anterior: np.ndarray,
+    tasa_interes_externa: float,
+    tasa_interes_interna: float,
+    exportaciones: np.ndarray,
+    rin_anterior: np.ndarray,
+    tc: np.ndarray,
+    pib: float,
+    salida: Optional[Dict[str, np.ndarray]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Equivalente vectorizado de fiscal_model.calcular_deficit_deuda (los campos de
+    deuda se calculan en sus destinos de salida, como en calcular_ingresos_vectorizado)
+    """
+    salida = {} if salida is None else salida
+    n = ingresos_totales.shape[0]
+    deficit = ingresos_totales - gastos_totales
+
+    intereses_externa = np.multiply(
+        deuda_externa_anterior, tasa_interes_externa, out=_destino(salida, 'intereses_deuda_externa', n)
+    )
+    intereses_interna = np.multiply(
+        deuda_interna_anterior, tasa_interes_interna, out=_destino(salida, 'intereses_deuda_interna', n)
+    )
+    intereses_totales = np.add(intereses_externa, intereses_interna, out=_destino(salida, 'intereses_totales', n))
+
+    proporcion_externa = 0.7
+    deuda_externa = np.multiply(
+        deuda_externa_anterior, 1 + tasa_interes_externa, out=_destino(salida, 'deuda_externa', n)
+    )
+    np.subtract(deuda_externa, deficit * proporcion_externa, out=deuda_externa)
+    deuda_interna = np.multiply(
+        deuda_interna_anterior, 1 + tasa_interes_interna, out=_destino(salida, 'deuda_interna', n)
+    )
+    np.subtract(deuda_interna, deficit * (1 - proporcion_externa), out=deuda_interna)
+    deuda_total = np.add(deuda_externa, deuda_interna, out=_destino(salida, 'deuda_total', n))
+
+    deuda_positiva = deuda_total > 0
+    ingresos_positivos = ingresos_totales > 0
+
+    ajuste_rin = (exportaciones / tc) * 0.3
+    ajuste_rin = np.where(deficit < 0, ajuste_rin - (np.abs(deficit) / tc) * 0.5, ajuste_rin)
+    rin = np.add(rin_anterior, ajuste_rin, out=_destino(salida, 'rin', n))
+    np.maximum(0, rin, out=rin)
+
+    return {
+        'deficit': np.negative(deficit, out=_destino(salida, 'deficit_superavit', n)),
+        'superavit': np.maximum(deficit, 0),
+        'deuda_total': deuda_total,
+        'deuda_externa': deuda_externa,
+        'deuda_interna': deuda_interna,
+        'intereses_externa': intereses_externa,
+        'intereses_interna': intereses_interna,
+        'intereses': intereses_totales,
+        'rin': rin,
+        'delta_deuda_externa': np.subtract(
+            deuda_externa, deuda_externa_anterior, out=_destino(salida, 'delta_deuda_externa', n)
+        ),
+        'delta_deuda_interna': np.subtract(
+            deuda_interna, deuda_interna_anterior, out=_destino(salida, 'delta_deuda_interna', n)
+        ),
+        'deuda_externa_pib': _por_pib(deuda_externa, pib, _destino(salida, 'deuda_externa_pib', n)),
+        'deuda_interna_pib': _por_pib(deuda_interna, pib, _destino(salida, 'deuda_interna_pib', n)),
+        'ratio_externa_total': _ratio(
+            deuda_externa, deuda_total, deuda_positiva, _destino(salida, 'ratio_externa_total', n)
+        ),
+        'ratio_interna_total': _ratio(
+            deuda_interna, deuda_total, deuda_positiva, _destino(salida, 'ratio_interna_total', n)
+        ),
+        'intereses_ingresos_ratio': _ratio(
+            intereses_totales, ingresos_totales, ingresos_positivos, _destino(salida, 'intereses_ingresos_ratio', n)
+        ),
+    }
+
+
+def simular_anio_vectorizado(
+    compilados: ParametrosCompilados,
+    estado_anterior: Optional[Dict[str, np.ndarray]],
+    Z_anio: np.ndarray,
+    salida: Optional[Dict[str, np.ndarray]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Simula un año fiscal para N trayectorias (equivalente a SimuladorFiscalBolivia._simular_anio)
+
+    Args:
+        compilados: Parámetros compilados (ver compiled.compilar_parametros)
+        estado_anterior: Resultado del año previo (None en el primer año)
+        Z_anio: Normales estándar del año, forma (N, NUM_FACTORES)
+        salida: Destinos (N,) por campo, normalmente las vistas ResultadosColumnares.anio(ano_idx):
+            cada campo se calcula directamente en ellos, sin copiarlo después; los campos
+            sin destino se calculan en arrays nuevos que se agregan a salida
+
+    Returns:
+        salida, con un array (N,) por cada campo numérico de ResultadoAnual que no es
+        idénticamente cero (ResultadosColumnares parte de ceros)
+    """
+    salida = {} if salida is None else salida
+    n = Z_anio.shape[0]
+    ingresos = calcular_ingresos_vectorizado(compilados, Z_anio, salida)
+    TC = ingresos['tipo_cambio']
+    gastos = calcular_gastos_vectorizado(compilados, TC, ingresos['z_value'], salida)
+
+    if estado_anterior is None:
+        deuda_externa_anterior = np.full(n, compilados.deuda_externa_inicial)
+        deuda_interna_anterior = np.full(n, compilados.deuda_interna_inicial)
+        rin_anterior = np.full(n, compilados.rin_inicial)
+        pib_anterior = compilados.pib_inicial
+    else:
+        deuda_externa_anterior = estado_anterior['deuda_externa']
+        deuda_interna_anterior = estado_anterior['deuda_interna']
+        rin_anterior = estado_anterior['rin']
+        pib_anterior = float(estado_anterior['pib'][0])
+
+    pib = pib_anterior * compilados.factor_crecimiento_pib
+    exportaciones = np.add(
+        ingresos['gas_ingresos_brutos'], ingresos['exportaciones_total'], out=_destino(salida, 'exportaciones', n)
+    )
+
+    deficit_deuda = calcular_deficit_deuda_vectorizado(
+        ingresos['total'],
+        gastos['total'],
+        deuda_externa_anterior,
+        deuda_interna_anterior,
+        compilados.tasa_interes_externa,
+        compilados.tasa_interes_interna,
+        exportaciones,
+        rin_anterior,
+        TC,
+        pib,
+        salida
+    )
+
+    _por_pib(deficit_deuda['deuda_total'], pib, _destino(salida, 'deuda_pib_ratio', n))
+    _por_pib(deficit_deuda['deficit'], pib, _destino(salida, 'deficit_pib_ratio', n))
+    _por_pib(ingresos['tributarios_total'], pib, _destino(salida, 'presion_tributaria', n))
+
+    importaciones = np.multiply(gastos['total'], 0.25, out=_destino(salida, 'importaciones', n))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        importaciones_mensuales_usd = np.where(TC > 0, (importaciones / TC) / 12, 0.0)
+    _ratio(
+        deficit_deuda['rin'], importaciones_mensuales_usd, importaciones_mensuales_usd > 0,
+        _destino(salida, 'rin_meses_importacion', n), escala=1
+    )
+    _ratio(
+        ingresos['total'], deficit_deuda['intereses'], deficit_deuda['intereses'] > 0,
+        _destino(salida, 'capacidad_pago', n), escala=1, defecto=999.0
+    )
+
+    np.subtract(deficit_deuda['deficit'], deficit_deuda['intereses'], out=_destino(salida, 'resultado_primario', n))
+    np.subtract(exportaciones, importaciones, out=_destino(salida, 'saldo_comercial', n))
+    _destino(salida, 'pib', n).fill(pib)
+    _destino(salida, 'pib_real', n).fill(pib)
+    _destino(salida, 'crecimiento_pib_efectivo', n).fill(compilados.crecimiento_pib)
+    return salida
+
+
+def simular_lote(
+    parametros: Union[ParametrosSimulacion, ParametrosCompilados],
+    anos: int,
+    num_trayectorias: int,
+    generador: Optional[GeneradorNormal] = None
+) -> ResultadosColumnares:
+    """
+    Simula num_trayectorias trayectorias completas en bloque
+
+    Args:
+        parametros: Parámetros de la simulación
+        anos: Número de años a simular
+        num_trayectorias: Número de trayectorias (N)
+        generador: Generador de normales (por defecto uno nuevo sin semilla)
+
+    Returns:
+        ResultadosColumnares con un array (N, anos) por campo
+    """
+    if generador is None:
+        generador = GeneradorNormal()
+
+    # Todas las normales de la corrida en una sola llamada
+    Z = generador.normales((num_trayectorias, anos, NUM_FACTORES))
+    return simular_lote_desde_normales(parametros, Z)
+
+
+def simular_lote_desde_normales(
+    parametros: Union[ParametrosSimulacion, ParametrosCompilados],
+    Z: np.ndarray,
+    campos: Sequence[str] = CAMPOS_RESULTADO_ANUAL
+) -> ResultadosColumnares:
+    """
+    Simula el lote a partir de un bloque de normales ya generado
+
+    Args:
+        parametros: Parámetros de la simulación (se compilan una vez, con caché)
+        Z: Normales estándar de forma (N, anos, NUM_FACTORES)
+        campos: Campos de ResultadoAnual que se almacenan (por defecto, todos)
+
+    Returns:
+        ResultadosColumnares con un array (N, anos) por campo
+    """
+    compilados = compilar_parametros(parametros)
+    num_trayectorias, anos, _ = Z.shape
+    resultados = ResultadosColumnares(num_trayectorias, anos, campos)
+    estado: Optional[Dict[str, np.ndarray]] = None
+    for ano_idx in range(anos):
+        # Cada año se calcula en su columna del contenedor (los campos no almacenados, en arrays temporales)
+        estado = simular_anio_vectorizado(compilados, estado, Z[:, ano_idx, :], resultados.anio(ano_idx))
+    return resultados
@@ -2,10 +2,21 @@ import type {
   ParametrosSimulacion as ParametrosSimulacionType,
   ResultadoSimulacion as ResultadoSimulacionType,
   ResultadoMonteCarloComplete,
+  ProgresoMonteCarlo,
 } from "./types"
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000"
 
+// Id de esta pestaña: el backend cancela la corrida Monte Carlo anterior de la misma sesión
+// cuando llega una nueva (p. ej. al mover un control y volver a simular)
+const ID_SESION =
+  typeof crypto !== "undefined" && "randomUUID" in crypto ? crypto.randomUUID() : Math.random().toString(36).slice(2)
+
+/**
+ * La simulación fue reemplazada por una más reciente de la misma sesión (HTTP 409)
+ */
+export class SimulacionReemplazada extends Error {}
+
 export interface ResultadoAnual {
   ano: number
 
@@ -86,15 +97,21 @@ export interface PasoSimulacion {
 export interface ResultadoSimulacion {
   resultados: ResultadoAnual[]
   pasos: PasoSimulacion[]
+  semilla?: number
 }
 
 /**
  * Ejecuta una simulación fiscal completa llamando al backend Python
+ * (con `semilla` el resultado es reproducible)
  */
-export async function simularFiscal(parametros: ParametrosSimulacionType): Promise<ResultadoSimulacionType> {
+export async function simularFiscal(
+  parametros: ParametrosSimulacionType,
+  semilla?: number,
+): Promise<ResultadoSimulacionType> {
   console.log("[v0] Llamando a API Python:", `${API_BASE_URL}/api/simular`)
 
-  const response = await fetch(`${API_BASE_URL}/api/simular`, {
+  const query = semilla !== undefined ? `?semilla=${semilla}` : ""
+  const response = await fetch(`${API_BASE_URL}/api/simular${query}`, {
     method: "POST",
     headers: {
       "Content-Type": "application/json",
@@ -112,21 +129,29 @@ export async function simularFiscal(parametros: ParametrosSimulacionType): Promi
 
 /**
  * Ejecuta una simulación Monte Carlo con múltiples iteraciones
+ * (con `semilla` el resultado es reproducible)
  */
 export async function simularMonteCarlo(
   parametros: ParametrosSimulacionType,
   numSimulaciones = 1000,
+  semilla?: number,
 ): Promise<ResultadoMonteCarloComplete> {
   console.log("[v0] Llamando a API Monte Carlo:", `${API_BASE_URL}/api/simular-monte-carlo`)
 
-  const response = await fetch(`${API_BASE_URL}/api/simular-monte-carlo?num_simulaciones=${numSimulaciones}`, {
+  const query = new URLSearchParams({ num_simulaciones: String(numSimulaciones) })
+  if (semilla !== undefined) query.set("semilla", String(semilla))
+  const response = await fetch(`${API_BASE_URL}/api/simular-monte-carlo?${query}`, {
     method: "POST",
     headers: {
       "Content-Type": "application/json",
+      "X-Sesion": ID_SESION,
     },
     body: JSON.stringify(parametros),
   })
 
+  if (response.status === 409) {
+    throw new SimulacionReemplazada("Simulación reemplazada por una más reciente")
+  }
   if (!response.ok) {
     const errorData = await response.json().catch(() => ({ detail: "Error desconocido" }))
     throw new Error(errorData.detail || "Error en la simulación Monte Carlo")
@@ -135,6 +160,58 @@ export async function simularMonteCarlo(
   return response.json()
 }
 
+/**
+ * Monte Carlo con avance en línea: `alProgreso` recibe las estadísticas parciales por año
+ * cada `trayectoriasPorEvento` trayectorias; la promesa se resuelve con el resultado final
+ */
+export async function simularMonteCarloStream(
+  parametros: ParametrosSimulacionType,
+  alProgreso: (progreso: ProgresoMonteCarlo) => void,
+  numSimulaciones = 10000,
+  semilla?: number,
+  trayectoriasPorEvento = 2048,
+  signal?: AbortSignal,
+): Promise<ResultadoMonteCarloComplete> {
+  const query = new URLSearchParams({
+    num_simulaciones: String(numSimulaciones),
+    trayectorias_por_evento: String(trayectoriasPorEvento),
+  })
+  if (semilla !== undefined) query.set("semilla", String(semilla))
+  const response = await fetch(`${API_BASE_URL}/api/simular-monte-carlo/stream?${query}`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      "X-Sesion": ID_SESION,
+    },
+    body: JSON.stringify(parametros),
+    signal,
+  })
+
+  if (!response.ok || !response.body) {
+    const errorData = await response.json().catch(() => ({ detail: "Error desconocido" }))
+    throw new Error(errorData.detail || "Error en la simulación Monte Carlo")
+  }
+
+  // Una línea JSON por evento: {"tipo": "progreso" | "resultado" | "error", "datos": ...}
+  const lector = response.body.pipeThrough(new TextDecoderStream()).getReader()
+  let pendiente = ""
+  for (;;) {
+    const { value, done } = await lector.read()
+    if (done) break
+    pendiente += value
+    const lineas = pendiente.split("\n")
+    pendiente = lineas.pop() ?? ""
+    for (const linea of lineas) {
+      if (!linea.trim()) continue
+      const evento = JSON.parse(linea)
+      if (evento.tipo === "progreso") alProgreso(evento.datos)
+      else if (evento.tipo === "resultado") return evento.datos
+      else if (evento.tipo === "error") throw new Error(evento.datos.detalle)
+    }
+  }
+  throw new Error("La conexión terminó antes del resultado de Monte Carlo")
+}
+
 /**
  * Obtiene los parámetros por defecto del backend
  */
@@ -249,6 +249,7 @@ export interface PasoSimulacion {
 export interface ResultadoSimulacion {
   resultados: ResultadoAnual[]
   pasos: PasoSimulacion[]
+  semilla?: number
 }
 
 export interface EstadisticasVariable {
@@ -265,6 +266,7 @@ export interface EstadisticasVariable {
 
 export interface ResultadoMonteCarloAnual {
   ano: number
+  // Sin `variables` en la petición vienen todas; con `variables`, las no pedidas son null
   ingresos_totales: EstadisticasVariable
   gastos_totales: EstadisticasVariable
   deficit_superavit: EstadisticasVariable
@@ -279,9 +281,84 @@ export interface ResultadoMonteCarloAnual {
   ing_iva: EstadisticasVariable
   ing_iue: EstadisticasVariable
   gasto_subsidio_combustibles: EstadisticasVariable
-  distribucion_deficit: number[]
-  distribucion_deuda_pib: number[]
-  distribucion_rin: number[]
+  // Composición de la deuda y carga de intereses
+  delta_deuda_externa: EstadisticasVariable
+  delta_deuda_interna: EstadisticasVariable
+  deuda_externa_pib: EstadisticasVariable
+  deuda_interna_pib: EstadisticasVariable
+  ratio_externa_total: EstadisticasVariable
+  ratio_interna_total: EstadisticasVariable
+  intereses_ingresos_ratio: EstadisticasVariable
+  // Componentes lineales en Z: solo con analitico=true (forma cerrada)
+  ing_it?: EstadisticasVariable | null
+  ing_itf?: EstadisticasVariable | null
+  ing_rc_iva?: EstadisticasVariable | null
+  ing_ice?: EstadisticasVariable | null
+  ing_ga?: EstadisticasVariable | null
+  gasto_inversion?: EstadisticasVariable | null
+  gasto_subsidio_alimentos?: EstadisticasVariable | null
+  tipo_cambio?: EstadisticasVariable | null
+  // Trayectorias completas: solo con distribuciones=muestras
+  distribucion_deficit?: number[] | null
+  distribucion_deuda_pib?: number[] | null
+  distribucion_rin?: number[] | null
+  // Fracción de trayectorias por intervalo (bordes en ResultadoMonteCarloComplete.bordes_histogramas)
+  histogramas?: Record<string, number[]> | null
+  // Valores en ResultadoMonteCarloComplete.probabilidades_cuantiles
+  cuantiles?: Record<string, number[]> | null
+  estadisticas_analiticas?: Record<string, EstadisticasVariable> | null
+}
+
+export interface ResultadoAnalitico {
+  resultados: { ano: number; componentes: Record<string, EstadisticasVariable> }[]
+  metodo: string
+}
+
+export interface ToleranciaMonteCarlo {
+  variable: string
+  estadistico?: "promedio" | "mediana" | "percentil_5" | "percentil_25" | "percentil_75" | "percentil_95"
+  ano?: number | null
+  semiancho: number
+}
+
+export interface IntervaloConfianza {
+  variable: string
+  estadistico: string
+  ano: number
+  estimacion: number
+  semiancho: number
+  objetivo: number
+  cumple: boolean
+}
+
+export interface ResultadoAdaptativo {
+  convergencia: boolean
+  nivel_confianza: number
+  max_simulaciones: number
+  intervalos: IntervaloConfianza[]
+}
+
+// Riesgo de cola: listas alineadas con `anos`
+export interface ProbabilidadViolacion {
+  nombre: string
+  regla: string
+  probabilidad: number[]
+  probabilidad_acumulada: number[]
+  primera_violacion: number[]
+  sin_violacion: number
+}
+
+export interface ValorEnRiesgo {
+  variable: string
+  nivel: number
+  var: number[]
+  cvar: number[]
+}
+
+export interface ResultadoRiesgo {
+  anos: number[]
+  violaciones: ProbabilidadViolacion[]
+  valor_en_riesgo: ValorEnRiesgo[]
 }
 
 export interface ResultadoMonteCarloComplete {
@@ -289,4 +366,68 @@ export interface ResultadoMonteCarloComplete {
   resultados_estadisticos: ResultadoMonteCarloAnual[]
   simulacion_representativa: ResultadoAnual[]
   metodo: string
+  semilla?: number
+  metodo_muestreo?: "pseudo" | "sobol" | "lhs"
+  reduccion_varianza?: {
+    modo: "antiteticas" | "variables_control"
+    factores: Record<string, (number | null)[]>
+  } | null
+  adaptativo?: ResultadoAdaptativo | null
+  id_corrida?: string | null
+  bordes_histogramas?: Record<string, number[]> | null
+  probabilidades_cuantiles?: number[] | null
+  riesgo?: ResultadoRiesgo | null
+  id_trayectorias?: string | null
+}
+
+// Tensor de trayectorias guardado (guardar_trayectorias=true)
+export interface ResumenTrayectorias {
+  id_trayectorias: string
+  campos: string[]
+  anos: number
+  ano_inicial: number
+  num_trayectorias: number
+  semilla?: number | null
+  metodo_muestreo?: string | null
+  reduccion_varianza?: string | null
+  modo_estadisticas?: string | null
+  bytes: number
+  creado: number
+  ultimo_acceso: number
+  expira: number
+}
+
+export interface CuantilesTrayectorias {
+  id_trayectorias: string
+  campo: string
+  anos: number[]
+  probabilidades: number[]
+  cuantiles: number[][]
+  promedio: number[]
+  desviacion_estandar: number[]
+}
+
+export interface EstadoTrabajo {
+  id_trabajo: string
+  estado: "en_cola" | "ejecutando" | "completado" | "fallido" | "cancelado"
+  num_simulaciones: number
+  trayectorias_procesadas: number
+  progreso: number
+  creado: number
+  iniciado?: number | null
+  terminado?: number | null
+  error?: string | null
+  resultado?: ResultadoMonteCarloComplete | null
+}
+
+export interface EstadisticasParcialesAnual {
+  ano: number
+  estadisticas: Record<string, EstadisticasVariable>
+}
+
+export interface ProgresoMonteCarlo {
+  trayectorias_procesadas: number
+  num_simulaciones: number
+  progreso: number
+  resultados_parciales: EstadisticasParcialesAnual[]
 }